@@ -0,0 +1,152 @@
+"""
+Background loading of models on a thread or process pool.
+
+prepare_mesh does everything before the GL upload (parsing, normals, vertex
+cache order, levels of detail, buffer layout) and needs no GL context, so it
+runs on a worker. Finished results are collected in a queue and picked up by
+the render loop with poll(); the upload itself stays on the GL thread.
+
+    loader = AsyncLoader(workers=2)
+    loader.submit('model', prepare_mesh, 'bunny.obj')
+    ...
+    for result in loader.poll():        # every frame, on the GL thread
+        upload(result.value)
+
+Submitting a new job under the same key cancels the previous one. A job that
+is already running cannot be interrupted, its result is discarded.
+"""
+import queue
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+from bvh import build_bvh
+from meshCache import MeshCache
+from meshlets import build_meshlets
+from objReader import calculate_vertex_normals
+from profiler import PROFILER
+from quantize import pack_mesh, interleave
+from simplify import load_lods, concatenate_lods, report as report_lods
+
+DEFAULT_WORKERS = 2
+
+# alles, was für den Upload gebraucht wird; vertices: Position und Normale pro Vertex in einem Buffer,
+# bvh (Picking auf dem vollen Netz) ist None ohne picking, meshlets ohne clusters
+PreparedMesh = namedtuple('PreparedMesh', ['gpu_mesh', 'vertices', 'lod_ranges', 'lod_errors', 'bvh', 'meshlets'])
+
+# value ist None, wenn der Job mit error fehlgeschlagen ist
+LoadResult = namedtuple('LoadResult', ['key', 'generation', 'value', 'error'])
+
+
+def prepare_mesh(file_path, mesh_cache=None, normal_mode='uniform', optimize=True, lod=True, compact=False,
+                 picking=False, clusters=False, cleanup=False):
+    """ everything of Scene.gen_buffers that runs without a GL context; returns a PreparedMesh """
+    if mesh_cache is None:
+        mesh_cache = MeshCache(enabled=False)
+
+    # Vertices, Normalen und Indizes laden (aus dem Cache, falls vorhanden)
+    with PROFILER.stage('load.total'):
+        vertices, normals, indices = mesh_cache.load(file_path, normal_mode=normal_mode, optimize=optimize,
+                                                     cleanup=cleanup)
+
+    tree = None
+    if picking:
+        with PROFILER.stage('load.bvh'):
+            tree = build_bvh(vertices, indices.reshape(-1, 3))
+
+    # Detailstufen laden bzw. erzeugen und an das Original anhängen
+    if lod:
+        with PROFILER.stage('load.lod'):
+            lods = load_lods(file_path, vertices, indices.reshape(-1, 3), optimize=optimize, cleanup=cleanup,
+                             normal_mode=normal_mode)
+        report_lods(lods)
+        vertices, indices, ranges = concatenate_lods(lods)
+        errors = [lod.error for lod in lods]
+        # vereinfachte Stufen haben eigene Vertices, ihre Normalen werden neu berechnet
+        with PROFILER.stage('load.lod_normals'):
+            normals = np.concatenate([normals] + [calculate_vertex_normals(lod.vertices, lod.faces, normal_mode)
+                                                  for lod in lods[1:]]).astype(np.float32)
+    else:
+        ranges = [(0, len(indices))]
+        errors = [0.0]
+
+    # float32-Positionen und uint32-Indizes oder kompaktes Layout (siehe quantize.py)
+    mesh = pack_mesh(vertices, indices, ranges, compact=compact, normals=normals)
+
+    # Meshlets für das Culling pro Frame, die Index-Positionen bleiben beim Packen gleich
+    meshlets = None
+    if clusters:
+        with PROFILER.stage('load.meshlets'):
+            meshlets = build_meshlets(vertices, indices, mesh.draws)
+    # ein Buffer für alle Shading-Modi, die Farbe kommt als Uniform
+    return PreparedMesh(mesh, interleave(mesh.positions, mesh.normals), ranges, errors, tree, meshlets)
+
+
+class AsyncLoader:
+    """
+        Runs load jobs on a worker pool and hands their results to the
+        GL thread. Jobs are identified by a key, e.g. the file path or the
+        slot in the scene; any number of keys can load concurrently.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, processes=False):
+        # Threads teilen sich den Speicher, Prozesse umgehen den GIL beim Parsen in Python
+        executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self.executor = executor_class(max_workers=workers)
+        self.results = queue.Queue()
+        self.jobs = {}                  # key -> (generation, future) der gewünschten Jobs
+        self.generation = 0
+
+    def submit(self, key, function, *args, **kwargs):
+        """ run function(*args, **kwargs) on the pool, replacing a pending job with the same key """
+        self.cancel(key)
+        self.generation += 1
+        generation = self.generation
+        future = self.executor.submit(function, *args, **kwargs)
+        self.jobs[key] = (generation, future)
+        # läuft im Worker- bzw. Verwaltungs-Thread, daher nur in die Queue schreiben
+        future.add_done_callback(lambda done: self._finished(key, generation, done))
+        return generation
+
+    def _finished(self, key, generation, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        self.results.put(LoadResult(key, generation, None if error else future.result(), error))
+
+    def cancel(self, key):
+        """ forget the job of key; it is removed from the pool if it has not started yet """
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            job[1].cancel()
+
+    def cancel_all(self):
+        for key in list(self.jobs):
+            self.cancel(key)
+
+    def poll(self):
+        """ finished results of the wanted jobs, without blocking (call on the GL thread) """
+        finished = []
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            job = self.jobs.get(result.key)
+            if job is None or job[0] != result.generation:
+                # abgebrochen oder durch einen neueren Job ersetzt
+                continue
+            del self.jobs[result.key]
+            finished.append(result)
+        return finished
+
+    def pending(self, key=None):
+        """ number of wanted jobs that have not been returned by poll yet, or whether key is one of them """
+        if key is not None:
+            return key in self.jobs
+        return len(self.jobs)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
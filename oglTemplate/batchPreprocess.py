@@ -0,0 +1,235 @@
+"""
+Batch preprocessing of whole model directories, without GLFW or OpenGL.
+
+Every OBJ (or .omesh) file below the input directory runs through the
+loading pipeline of objReader.load_mesh (parse, center/scale, normals,
+index flattening, optional cleanup and vertex cache order) in a pool of
+worker processes. The GPU-ready arrays are written as .npy files like in
+the mesh cache, one directory per model, mirroring the input tree:
+
+    python batchPreprocess.py ../models out/
+    python batchPreprocess.py assets/ out/ --workers 8 --memory-limit 2048 --cleanup
+
+The largest files are started first, so a big file does not end up alone
+at the end of the run. Outputs whose meta.json matches the source file
+(size, mtime) and the options are skipped; --force rebuilds them. Each
+worker has an address space limit, a file that needs more fails with
+MemoryError instead of pushing the machine into swap, and a worker is
+replaced after a few files so fragmented memory is given back. The run
+writes summary.json with per-file stage times, throughput and failures.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from meshCache import ARRAY_NAMES, META_FILE
+from objReader import NORMAL_MODES, load_mesh
+from profiler import PROFILER
+
+EXTENSIONS = ('.obj', '.omesh')
+OUTPUT_SUFFIX = '.mesh'
+SUMMARY_FILE = 'summary.json'
+
+# bei Änderungen am Ausgabeformat erhöhen, damit alte Ausgaben neu erzeugt werden
+BATCH_VERSION = 1
+
+DEFAULT_MEMORY_LIMIT = 4096         # MB Adressraum pro Worker, 0 = unbegrenzt
+DEFAULT_TASKS_PER_WORKER = 16       # danach wird der Worker-Prozess ersetzt
+
+
+def find_models(root, extensions=EXTENSIONS):
+    """ (relative path, size in bytes) of every model file below root, largest first """
+    models = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.lower().endswith(extensions):
+                path = os.path.join(directory, name)
+                models.append((os.path.relpath(path, root), os.path.getsize(path)))
+    # größte Dateien zuerst, bei gleicher Größe nach Namen (reproduzierbare Reihenfolge)
+    models.sort(key=lambda model: (-model[1], model[0]))
+    return models
+
+
+def output_dir(output_root, relative_path):
+    """ directory of the arrays of one model: out/sub/model.obj -> out/sub/model.mesh """
+    return os.path.join(output_root, os.path.splitext(relative_path)[0] + OUTPUT_SUFFIX)
+
+
+def is_up_to_date(source, target, options):
+    """ whether target was written from the current source with the same options """
+    try:
+        with open(os.path.join(target, META_FILE)) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(source)
+    if (meta.get('version') != BATCH_VERSION or meta.get('options') != options
+            or meta.get('size') != stat.st_size or meta.get('mtime_ns') != stat.st_mtime_ns):
+        return False
+    return all(os.path.exists(os.path.join(target, name + '.npy')) for name in ARRAY_NAMES)
+
+
+def write_output(target, source, arrays, options):
+    # erst in ein temporäres Verzeichnis schreiben, dann umbenennen (wie meshCache)
+    tmp_target = '%s.tmp%d' % (target, os.getpid())
+    os.makedirs(tmp_target, exist_ok=True)
+    for name, array in zip(ARRAY_NAMES, arrays):
+        np.save(os.path.join(tmp_target, name + '.npy'), np.ascontiguousarray(array))
+    stat = os.stat(source)
+    with open(os.path.join(tmp_target, META_FILE), 'w') as file:
+        json.dump({'version': BATCH_VERSION, 'source': os.path.abspath(source), 'size': stat.st_size,
+                   'mtime_ns': stat.st_mtime_ns, 'options': options}, file)
+    if os.path.isdir(target):
+        for name in os.listdir(target):
+            os.remove(os.path.join(target, name))
+        os.rmdir(target)
+    os.replace(tmp_target, target)
+
+
+def init_worker(memory_limit):
+    """ process pool initializer: limit the address space, time the stages """
+    if memory_limit > 0:
+        try:
+            import resource
+            limit = memory_limit * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as error:
+            # z. B. Windows ohne resource-Modul: ohne Grenze weiterrechnen
+            print("Speichergrenze nicht gesetzt: %s" % error, file=sys.stderr)
+    PROFILER.enabled = True
+
+
+def process_file(source, target, options):
+    """ run the pipeline on one file and write its arrays; returns the summary entry """
+    PROFILER.stages = {}
+    start = time.perf_counter()
+    vertices, normals, indices = load_mesh(source, **options)
+    with PROFILER.stage('write'):
+        write_output(target, source, (vertices, normals, indices), options)
+    return {'seconds': time.perf_counter() - start,
+            'stages': {name: total for name, (_, total, _, _) in PROFILER.stages.items()},
+            'vertices': len(vertices), 'triangles': len(indices) // 3}
+
+
+def _run(function, *args):
+    """ call function in the worker; exceptions come back as text, tracebacks do not pickle """
+    try:
+        return function(*args), None
+    except MemoryError:
+        return None, "MemoryError (Speichergrenze pro Worker)"
+    except Exception:
+        return None, traceback.format_exc(limit=-3).strip()
+
+
+def preprocess(input_root, output_root, workers=None, options=None, force=False,
+               memory_limit=DEFAULT_MEMORY_LIMIT, tasks_per_worker=DEFAULT_TASKS_PER_WORKER, verbose=True):
+    """
+    Preprocess every model below input_root into output_root and return the
+    summary (also written to output_root/summary.json).
+    """
+    options = dict(options or {})
+    options.setdefault('normal_mode', 'uniform')
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    files = []
+    jobs = []
+    for relative_path, size in find_models(input_root):
+        source = os.path.join(input_root, relative_path)
+        target = output_dir(output_root, relative_path)
+        entry = {'file': relative_path, 'bytes': size, 'status': 'skipped'}
+        files.append(entry)
+        if force or not is_up_to_date(source, target, options):
+            jobs.append((entry, source, target))
+
+    if jobs:
+        os.makedirs(output_root, exist_ok=True)
+        # Prozesse mit max_tasks_per_child werden per spawn gestartet, Worker erben also keinen Zustand
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=init_worker,
+                                 initargs=(memory_limit,), max_tasks_per_child=tasks_per_worker) as executor:
+            # Reihenfolge der Aufträge = Startreihenfolge, die Liste ist nach Größe sortiert
+            futures = [(entry, executor.submit(_run, process_file, source, target, options))
+                       for entry, source, target in jobs]
+            for entry, future in futures:
+                try:
+                    result, error = future.result()
+                except BrokenProcessPool:
+                    # Worker abgestürzt (z. B. vom OOM-Killer beendet), alle offenen Aufträge sind verloren
+                    result, error = None, "worker process terminated"
+                if error is None:
+                    entry.update(result, status='done')
+                    entry['mb_per_second'] = entry['bytes'] / 1e6 / result['seconds'] if result['seconds'] else 0.0
+                else:
+                    entry.update(status='failed', error=error)
+                if verbose:
+                    print(_format_entry(entry))
+
+    seconds = time.perf_counter() - start
+    done = [entry for entry in files if entry['status'] == 'done']
+    processed_bytes = sum(entry['bytes'] for entry in done)
+    summary = {
+        'input': os.path.abspath(input_root), 'output': os.path.abspath(output_root),
+        'options': options, 'workers': workers, 'memory_limit_mb': memory_limit,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'seconds': seconds,
+        'files': len(files), 'done': len(done),
+        'skipped': sum(entry['status'] == 'skipped' for entry in files),
+        'failed': [entry['file'] for entry in files if entry['status'] == 'failed'],
+        'bytes': processed_bytes,
+        'triangles': sum(entry['triangles'] for entry in done),
+        'mb_per_second': processed_bytes / 1e6 / seconds if done and seconds > 0 else 0.0,
+        'triangles_per_second': sum(entry['triangles'] for entry in done) / seconds if done and seconds > 0 else 0.0,
+        'results': files,
+    }
+    if files:
+        os.makedirs(output_root, exist_ok=True)
+        with open(os.path.join(output_root, SUMMARY_FILE), 'w') as file:
+            json.dump(summary, file, indent=2)
+    return summary
+
+
+def _format_entry(entry):
+    if entry['status'] == 'failed':
+        return "FEHLER %s: %s" % (entry['file'], entry['error'].splitlines()[-1])
+    return "%-40s %9.1f KB %10d Dreiecke %8.2f s %7.1f MB/s" % (
+        entry['file'], entry['bytes'] / 1024, entry['triangles'], entry['seconds'], entry['mb_per_second'])
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="preprocess all models of a directory tree into GPU-ready arrays")
+    parser.add_argument('input', help="directory that is searched for %s files" % '/'.join(EXTENSIONS))
+    parser.add_argument('output', help="directory of the .npy outputs and %s" % SUMMARY_FILE)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT, metavar='MB',
+                        help="address space per worker, larger files fail (0 = unlimited)")
+    parser.add_argument('--tasks-per-worker', type=int, default=DEFAULT_TASKS_PER_WORKER,
+                        help="files per worker process before it is replaced")
+    parser.add_argument('--force', action='store_true', help="rebuild outputs that are up to date")
+    parser.add_argument('--normals', choices=NORMAL_MODES, default='uniform',
+                        help="weighting of computed vertex normals")
+    parser.add_argument('--no-optimize', action='store_true',
+                        help="keep the file order instead of reordering for the vertex cache")
+    parser.add_argument('--cleanup', action='store_true',
+                        help="weld close vertices, drop degenerate and duplicate triangles (see meshCleanup.py)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    options = {'normal_mode': args.normals, 'optimize': not args.no_optimize, 'cleanup': args.cleanup}
+    summary = preprocess(args.input, args.output, args.workers, options, args.force,
+                         args.memory_limit, args.tasks_per_worker)
+    print("%d Dateien: %d verarbeitet, %d aktuell, %d Fehler in %.2f s (%.1f MB/s, %.0f Dreiecke/s)" % (
+        summary['files'], summary['done'], summary['skipped'], len(summary['failed']), summary['seconds'],
+        summary['mb_per_second'], summary['triangles_per_second']))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Regression benchmarks for the loading pipeline, picking and the per-frame matrix chain.
+
+Runs headless (no GLFW / OpenGL needed) on every file in ../models and on
+synthetic meshes:
+    python benchSuite.py --save                 # write benchmark_baseline.json
+    python benchSuite.py                        # compare with the baseline
+    python benchSuite.py --sizes 100000 --threshold 0.5 --baseline other.json
+
+Every stage records the best wall time, the peak traced memory and the
+throughput. The exit code is 1 when a stage got slower or needs more memory
+than the baseline by more than the threshold (relative).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmark import best_time, model_files, write_synthetic_obj
+from bvh import build_bvh, random_rays
+from camera import MatrixBuffers, ViewState, model_view_projection
+from objReader import load_obj, parse_obj, calculate_center, translate_to_center, scale, \
+    calculate_vertex_normals, flatten_faces
+from vertexCache import optimize_mesh
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_SIZES = (100000, 1000000, 10000000)
+DEFAULT_THRESHOLD = 0.25
+
+# Abweichungen unterhalb dieser Grenzen sind Messrauschen und zählen nie als Regression
+MIN_SECONDS = 0.002
+MIN_BYTES = 1024 * 1024
+
+FRAMES = 1000
+RAYS = 1000
+MAX_OPTIMIZE_FACES = 2000000
+
+
+def peak_memory(function, *args):
+    """ peak memory in bytes traced during one call """
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure(function, args, items, unit, repeat):
+    """ best time, peak memory and throughput (items per second) of function(*args) """
+    seconds = best_time(function, *args, repeat=repeat)
+    return {'seconds': seconds, 'peak_bytes': peak_memory(function, *args),
+            'throughput': items / seconds if seconds > 0 else 0.0, 'unit': unit}
+
+
+def bench_mesh(path, repeat=3):
+    """ all stages of the loading pipeline for one OBJ file """
+    with open(path, 'rb') as file:
+        positions = parse_obj(file.read()).positions
+    center = calculate_center(positions)
+    translated = translate_to_center(positions, center)
+    vertices, faces, _, _ = load_obj(None, path)
+    normals = calculate_vertex_normals(vertices, faces)
+    count = len(positions)
+
+    # Funktionen wie in load_obj / load_mesh, jeweils mit den Daten der vorherigen Stufe
+    stages = (
+        ('load_obj', load_obj, (None, path)),
+        ('calculate_center', calculate_center, (positions,)),
+        ('translate_to_center', translate_to_center, (positions, center)),
+        ('scale', scale, (translated,)),
+        ('calculate_vertex_normals', calculate_vertex_normals, (vertices, faces)),
+        ('flatten_faces', flatten_faces, (faces,)),
+    )
+    # Tipsify läuft in Python, sehr große Netze würden den Lauf dominieren
+    if len(faces) <= MAX_OPTIMIZE_FACES:
+        stages += (('optimize_mesh', optimize_mesh, (vertices, normals, flatten_faces(faces))),)
+    results = {}
+    for name, function, args in stages:
+        results[name] = measure(function, args, count, 'vertices/s', repeat)
+        results[name]['vertices'] = count
+
+    # Picking: Aufbau des BVH und Strahlen pro Sekunde
+    if len(faces) <= MAX_OPTIMIZE_FACES:
+        results['build_bvh'] = measure(build_bvh, (vertices, faces), len(faces), 'triangles/s', repeat)
+        tree = build_bvh(vertices, faces)
+        results['bvh_rays'] = measure(tree.intersect, random_rays(RAYS), RAYS, 'rays/s', repeat)
+    return results
+
+
+def bench_frame(repeat=3):
+    """ matrix chain of Scene.draw after a change of the model rotation """
+    state = ViewState(rot_angle_x=30, rot_angle_y=20, rot_angle_z=10, rotation_alpha=15, translation_x=0.1)
+    buffers = MatrixBuffers()
+
+    def frames(count):
+        for _ in range(count):
+            buffers.update_model(state)
+            buffers.combine()
+
+    def frames_mat4(count):
+        for _ in range(count):
+            model_view_projection(state, 4 / 3)
+
+    return {'matrix_chain': measure(frames, (FRAMES,), FRAMES, 'frames/s', repeat),
+            'matrix_chain_mat4': measure(frames_mat4, (FRAMES,), FRAMES, 'frames/s', repeat)}
+
+
+def run(paths=None, sizes=DEFAULT_SIZES, repeat=3):
+    """ results of all benchmarks as {case: {stage: measurement}} """
+    results = {'frame': bench_frame(repeat)}
+    print_case('frame', results['frame'])
+
+    for path in model_files(paths):
+        case = os.path.basename(path)
+        results[case] = bench_mesh(path, repeat)
+        print_case(case, results[case])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for triangles in sizes:
+            path = os.path.join(tmp_dir, 'synthetic_%d.obj' % triangles)
+            write_synthetic_obj(path, triangles)
+            case = 'synthetic_%d' % triangles
+            # große Netze nur einmal messen
+            results[case] = bench_mesh(path, repeat if triangles < 1000000 else 1)
+            print_case(case, results[case])
+            os.remove(path)
+    return results
+
+
+def print_case(case, stages):
+    print(case)
+    for name, result in stages.items():
+        print("    %-26s %10.3f ms %10.1f MB %14.0f %s" % (
+            name, result['seconds'] * 1000, result['peak_bytes'] / 2 ** 20, result['throughput'], result['unit']))
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """ list of regressions against the baseline results as readable strings """
+    regressions = []
+    for case, stages in sorted(results.items()):
+        for name, result in sorted(stages.items()):
+            reference = baseline.get(case, {}).get(name)
+            if reference is None:
+                continue
+            for key, floor, label in (('seconds', MIN_SECONDS, 'time'), ('peak_bytes', MIN_BYTES, 'memory')):
+                old, new = reference[key], result[key]
+                if new > old * (1 + threshold) and new - old > floor:
+                    regressions.append("%s %s: %s %.4g -> %.4g (%+.0f%%)" % (
+                        case, name, label, old, new, (new / old - 1) * 100))
+    return regressions
+
+
+def save_baseline(file_path, results):
+    with open(file_path, 'w') as file:
+        json.dump({'machine': platform.platform(), 'python': platform.python_version(),
+                   'numpy': np.__version__, 'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                   'results': results}, file, indent=2)
+
+
+def load_baseline(file_path):
+    with open(file_path) as file:
+        return json.load(file)['results']
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="regression benchmarks of the OBJ loading pipeline")
+    parser.add_argument('models', nargs='*', help="OBJ files (default: all files in ../models)")
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(DEFAULT_SIZES), metavar='TRIANGLES',
+                        help="triangle counts of the synthetic meshes")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="JSON file with the baseline results")
+    parser.add_argument('--save', action='store_true', help="store the results as new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown / memory growth (default %.2f)" % DEFAULT_THRESHOLD)
+    parser.add_argument('--repeat', type=int, default=3, help="timing repetitions, the best is kept")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    results = run(args.models, args.sizes, args.repeat)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print("Baseline gespeichert in %s" % args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print("keine Baseline %s, zuerst mit --save anlegen" % args.baseline)
+        return 0
+
+    regressions = compare(results, load_baseline(args.baseline), args.threshold)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+    print("%d Regression(en) bei Schwelle %.0f%%" % (len(regressions), args.threshold * 100))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
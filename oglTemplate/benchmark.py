@@ -0,0 +1,274 @@
+"""
+Timing comparisons for the OBJ loading pipeline.
+
+Runs headless (no GLFW / OpenGL needed):
+    python benchmark.py [model.obj ...]
+Without arguments every file in ../models is measured.
+"""
+import glob
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import mat4
+import mat4batch
+from camera import MatrixBuffers, ViewState, model_view_projection
+from objParallel import load_obj_parallel
+from objStream import DEFAULT_CHUNK_SIZE, load_obj_streaming
+from objReader import load_obj, parse_obj, weld_vertices, calculate_center, translate_to_center, scale, \
+    calculate_vertex_normals, NORMAL_MODES
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+# Speichergrenze des Streaming-Loaders: die wachsenden Arrays belegen beim Verdoppeln bzw. beim
+# Kürzen höchstens das 3-fache der Ausgabe, dazu der Arbeitsspeicher von parse_obj für einen Block
+STREAMING_OUTPUT_FACTOR = 3
+STREAMING_BLOCK_FACTOR = 12         # Bytes pro Byte des Blocks
+
+
+def load_obj_per_line(file_path):
+    """ previous line-by-line loader, kept as reference for the timings """
+    vertices = []
+    normals = []
+    faces = []
+
+    with open(file_path, 'r') as file:
+        colors = []
+
+        for line in file:
+            if line.startswith('#') or line in ['\n', '\r\n']:
+                continue
+            stripped_line = line.strip()
+            if stripped_line.startswith('v '):
+                vertex = list(map(float, stripped_line[2:].split()))
+                colors.append([0.0, 1.0, 1.0,
+                               0.0, 1.0, 1.0,
+                               0.0, 1.0, 1.0])
+                vertices.append(vertex)
+            elif stripped_line.startswith('f '):
+                face = stripped_line[2:].split()
+                face_indices = [int(index.split('/')[0]) - 1 for index in face]
+                faces.append(face_indices)
+            elif stripped_line.startswith('vn '):
+                normal = list(map(float, stripped_line[3:].split()))
+                normals.append(normal)
+
+    vertices = np.array(vertices, dtype=np.float32)
+    center = calculate_center(vertices)
+    vertices = scale(translate_to_center(vertices, center)).tolist()
+    faces = np.array(faces, dtype=np.int32)
+
+    return vertices, faces, normals, colors
+
+
+def calculate_vertex_normals_per_face(vertices, faces):
+    """ previous per-face normal computation, kept as reference for the timings """
+    normals = np.zeros((len(vertices), 3), dtype=np.float32)
+
+    for face in faces:
+        a_index, b_index, c_index = face
+        a = np.array(vertices[a_index])
+        b = np.array(vertices[b_index])
+        c = np.array(vertices[c_index])
+
+        normal = np.cross(b - a, c - a)
+        normal /= np.linalg.norm(normal)
+
+        normals[a_index] += normal
+        normals[b_index] += normal
+        normals[c_index] += normal
+
+    normals = np.array([normal / np.linalg.norm(normal) for normal in normals])
+
+    return normals
+
+
+def best_time(function, *args, repeat=3):
+    """ smallest wall time of 'repeat' calls in seconds """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def write_synthetic_obj(file_path, triangles):
+    """ write a wavy grid with about 'triangles' triangles as OBJ file """
+    n = max(int(np.sqrt(triangles / 2.0)) + 1, 2)
+    x, y = np.meshgrid(np.linspace(-1, 1, n), np.linspace(-1, 1, n))
+    z = 0.1 * np.sin(4 * x) * np.cos(4 * y)
+
+    # zwei Dreiecke pro Gitterzelle, 1-basierte Indizes
+    corner = (np.arange(n - 1)[:, None] * n + np.arange(n - 1)[None, :]).ravel() + 1
+    faces = np.concatenate((np.stack((corner, corner + 1, corner + n), axis=1),
+                            np.stack((corner + 1, corner + n + 1, corner + n), axis=1)))
+
+    with open(file_path, 'w') as file:
+        np.savetxt(file, np.stack((x.ravel(), y.ravel(), z.ravel()), axis=1), fmt='v %.6f %.6f %.6f')
+        np.savetxt(file, faces, fmt='f %d %d %d')
+    return len(faces)
+
+
+def model_files(paths=None):
+    if paths:
+        return paths
+    return sorted(glob.glob(os.path.join(MODELS_DIR, '*.obj')))
+
+
+def bench_load_obj(paths=None):
+    """ compare the block parser with the per-line reference loader """
+    print("%-18s %10s %12s %12s %8s" % ("model", "faces", "per-line ms", "block ms", "speedup"))
+    for path in model_files(paths):
+        # Ergebnisse beider Loader müssen übereinstimmen
+        vertices, faces, _, _ = load_obj(None, path)
+        ref_vertices, ref_faces, _, _ = load_obj_per_line(path)
+        ref_vertices = np.array(ref_vertices, dtype=np.float32)
+        # geschweißte Vertices zeigen auf dieselben Positionen wie vorher
+        assert np.allclose(vertices[faces], ref_vertices[ref_faces])
+
+        per_line = best_time(load_obj_per_line, path)
+        block = best_time(load_obj, None, path)
+        print("%-18s %10d %12.1f %12.1f %7.1fx" % (os.path.basename(path), len(faces),
+                                                   per_line * 1000, block * 1000, per_line / block))
+
+
+def bench_vertex_normals(paths=None):
+    """ compare the vectorized normals (all weightings) with the per-face loop """
+    print("%-18s %10s %8s %12s" % ("model", "faces", "differ", "per-face ms") +
+          "".join(" %10s %8s" % (mode + " ms", "speedup") for mode in NORMAL_MODES))
+    for path in model_files(paths):
+        vertices, faces, _, _ = load_obj(None, path)
+
+        # Referenz liefert für entartete Dreiecke NaN und für Vertices, deren Normalen sich
+        # (fast) aufheben, z.B. bei doppelseitigen Flächen, Rauschen -> Abweichungen nur zählen
+        with np.errstate(invalid='ignore', divide='ignore'):
+            reference = calculate_vertex_normals_per_face(vertices, faces)
+            per_face = best_time(calculate_vertex_normals_per_face, vertices, faces, repeat=1)
+        normals = calculate_vertex_normals(vertices, faces)
+        assert np.all(np.isfinite(normals))
+        differing = np.count_nonzero(~np.all(np.isclose(normals, reference, atol=1e-4), axis=1))
+
+        row = "%-18s %10d %8d %12.1f" % (os.path.basename(path), len(faces), differing, per_face * 1000)
+        for mode in NORMAL_MODES:
+            vectorized = best_time(calculate_vertex_normals, vertices, faces, mode)
+            row += " %10.2f %7.0fx" % (vectorized * 1000, per_face / vectorized)
+        print(row)
+
+
+def report_welding(paths=None):
+    """ vertex count and GPU memory after welding (position, normal[, texcoord]) combinations """
+    print("%-18s %9s %9s %9s %7s %12s %12s" % ("model", "corners", "positions", "vertices", "ratio",
+                                                "indexed KB", "unindexed KB"))
+    for path in model_files(paths):
+        with open(path, 'rb') as file:
+            obj = parse_obj(file.read())
+        if obj.face_normals is None:
+            # Normalen werden pro Position berechnet, der Vertex bleibt unverändert
+            obj = obj._replace(normals=np.zeros((len(obj.positions), 3), np.float32),
+                               face_normals=obj.face_positions)
+        stats = weld_vertices(obj).stats
+        print("%-18s %9d %9d %9d %7.3f %12.1f %12.1f" % (
+            os.path.basename(path), stats['corners'], stats['positions'], stats['vertices'],
+            stats['duplication_ratio'], (stats['vertex_bytes'] + stats['index_bytes']) / 1024,
+            stats['unindexed_bytes'] / 1024))
+
+
+def bench_streaming_memory(triangles=5000000, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    peak traced memory of the streaming loader relative to the size of its
+    output; raises AssertionError above the limit (see STREAMING_OUTPUT_FACTOR)
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.obj')
+        triangles = write_synthetic_obj(path, triangles)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        obj = load_obj_streaming(path, chunk_size)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        output = sum(array.nbytes for array in obj if array is not None)
+        limit = STREAMING_OUTPUT_FACTOR * output + STREAMING_BLOCK_FACTOR * chunk_size
+        print("streaming: %d triangles, %.1f MB file, %.2f s, output %.1f MB, peak %.1f MB (%.2fx, limit %.1f MB)" % (
+            triangles, os.path.getsize(path) / 2 ** 20, elapsed, output / 2 ** 20, peak / 2 ** 20, peak / output,
+            limit / 2 ** 20))
+        assert peak <= limit, "streaming loader peak %.1f MB above the limit of %.1f MB" % (
+            peak / 2 ** 20, limit / 2 ** 20)
+        return peak / output
+
+
+def bench_parallel_scaling(triangles=5000000, worker_counts=(1, 2, 4, 8)):
+    """ parse time of load_obj_parallel for several worker counts """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic = os.path.join(tmp_dir, 'synthetic.obj')
+        write_synthetic_obj(synthetic, triangles)
+
+        print("parallel parsing (%d CPUs)" % (os.cpu_count() or 1))
+        print("%-18s %10s" % ("model", "MB") + "".join(" %7s" % ("%d proc" % count) for count in worker_counts))
+        for path in (synthetic, os.path.join(MODELS_DIR, 'squirrel_ar.obj')):
+            row = "%-18s %10.1f" % (os.path.basename(path), os.path.getsize(path) / 2 ** 20)
+            for count in worker_counts:
+                row += " %6.2fs" % best_time(load_obj_parallel, path, count, 0, repeat=1)
+            print(row)
+
+
+def bench_mat4(instances=10000, repeat=200):
+    """ per-frame matrix chain and instance matrices: mat4 vs. mat4batch """
+    state = ViewState(rot_angle_x=30, rot_angle_y=20, rot_angle_z=10, rotation_alpha=15, translation_x=0.1)
+    buffers = MatrixBuffers()
+
+    def chain(count, matrix_buffers):
+        for _ in range(count):
+            model_view_projection(state, 4 / 3, matrix_buffers)
+
+    single = best_time(chain, repeat, None) / repeat
+    batched = best_time(chain, repeat, buffers) / repeat
+    print("MVP chain, 1 matrix:      mat4 %8.1f us   mat4batch(out=) %8.1f us   %5.1fx" % (
+        single * 1e6, batched * 1e6, single / batched))
+
+    angles = np.linspace(0, 360, instances)
+    offsets = np.random.default_rng(0).uniform(-1, 1, (instances, 3))
+    projection, view = mat4.perspective(45, 4 / 3, 1.0, 5.0), mat4.look_at(0, 0, 2, 0, 0, 0, 0, 1, 0)
+
+    def per_instance():
+        return [projection @ view @ mat4.translate(*offset) @ mat4.rotate_y(angle) @ mat4.rotate_x(angle)
+                for angle, offset in zip(angles, offsets)]
+
+    models, rot_y, rot_x = (np.empty((instances, 4, 4), np.float32) for _ in range(3))
+    mvps, work = np.empty((instances, 4, 4), np.float32), np.empty((4, 4), np.float32)
+    projection32, view32 = projection.astype(np.float32), view.astype(np.float32)
+
+    def batched_instances():
+        mat4batch.translate(offsets[:, 0], offsets[:, 1], offsets[:, 2], out=models)
+        mat4batch.rotate_y(angles, out=rot_y)
+        mat4batch.rotate_x(angles, out=rot_x)
+        np.matmul(rot_y, rot_x, out=mvps)
+        np.matmul(models, mvps, out=rot_y)
+        return mat4batch.model_view_projection(projection32, view32, rot_y, out=mvps, work=work)
+
+    assert np.allclose(np.array(per_instance()), batched_instances(), atol=1e-4)
+    loop = best_time(per_instance, repeat=1)
+    batch = best_time(batched_instances)
+    print("MVP, %d instances:     mat4 %8.1f ms   mat4batch(out=) %8.2f ms   %5.0fx" % (
+        instances, loop * 1000, batch * 1000, loop / batch))
+
+
+if __name__ == '__main__':
+    bench_mat4()
+    print()
+    bench_load_obj(sys.argv[1:])
+    print()
+    bench_vertex_normals(sys.argv[1:])
+    print()
+    report_welding(sys.argv[1:])
+    print()
+    bench_streaming_memory()
+    print()
+    bench_parallel_scaling()
@@ -0,0 +1,150 @@
+"""
+Projection, view and model matrices of the viewer scene.
+
+Kept free of OpenGL and GLFW, so the same transformation chain is used by
+Scene.draw and by headless tools (software renderer, benchmarks).
+"""
+from mat4 import *
+import mat4batch
+
+
+def projection_matrix(projection_type, fovy, aspect):
+    """ perspective or orthographic projection as used by the viewer """
+    if projection_type == 'perspective':
+        return perspective(fovy, aspect, 1.0, 5.0)
+    return ortho(-1.0, 1.0, -1.0, 1.0, -1.0, 5.0)
+
+
+def view_matrix():
+    """ camera at (0, 0, 2) looking at the origin """
+    return look_at(0, 0, 2, 0, 0, 0, 0, 1, 0)
+
+
+def model_matrix(translation_x, rotation_alpha, rotation_v, rot_angle_x, rot_angle_y, rot_angle_z,
+                 pivot=(0, 0, 0), pivot_offset=(0, 0, 0)):
+    """
+    translation, arcball rotation and rotations around the x, y and z axis;
+    the rotations turn the model around pivot (model coordinates)
+    """
+    # Modell-Rotations-Transformationen
+    model_rotation_x_y_z = rotate_x(rot_angle_x) @ rotate_y(rot_angle_y) @ rotate_z(rot_angle_z)
+    rotation = rotate(rotation_alpha, rotation_v) @ model_rotation_x_y_z
+
+    # Modell Translation und Rotation basierend auf Mausbewegungen, um den Drehpunkt
+    shift = np.array([translation_x, 0, 0]) + np.asarray(pivot_offset) + np.asarray(pivot)
+    return translate(*shift) @ rotation @ translate(*-np.asarray(pivot))
+
+
+def pivot_offset_for(state, pivot):
+    """
+    pivot_offset that keeps the model in place when the rotation center of
+    state moves to pivot: R p + t stays the same for every model point p
+    """
+    rotation = model_matrix(0, state.rotation_alpha, state.rotation_v,
+                            state.rot_angle_x, state.rot_angle_y, state.rot_angle_z)[:3, :3]
+    moved = np.asarray(state.pivot, dtype=np.float64) - np.asarray(pivot, dtype=np.float64)
+    return np.asarray(state.pivot_offset, dtype=np.float64) + moved - rotation @ moved
+
+
+def pixels_per_unit(state, height):
+    """
+    screen pixels covered by one model unit at the origin of the model, for
+    choosing a level of detail (perspective: depends on fovy and distance)
+    """
+    if state.projection_type != 'perspective':
+        return height / 2.0         # ortho(-1, 1, -1, 1, ...) bildet 2 Einheiten auf die Bildhöhe ab
+    # Abstand der Kamera (0, 0, 2) zum verschobenen Modellursprung
+    distance = np.hypot(2.0, state.translation_x)
+    return height / (2.0 * distance * np.tan(np.radians(state.fovy) / 2.0))
+
+
+def model_view_projection(state, aspect, buffers=None):
+    """
+    MVP matrix for an object with the view attributes of Scene (see ViewState);
+    with buffers (MatrixBuffers) it is built in float32 into preallocated arrays
+    """
+    if buffers is not None:
+        return buffers.model_view_projection(state, aspect)
+
+    projection = projection_matrix(state.projection_type, state.fovy, aspect)
+    model = model_matrix(state.translation_x, state.rotation_alpha, state.rotation_v,
+                         state.rot_angle_x, state.rot_angle_y, state.rot_angle_z, state.pivot, state.pivot_offset)
+    return projection @ view_matrix() @ model
+
+
+class ViewState:
+    """
+        View attributes of Scene with their initial values, for use without a window
+    """
+
+    def __init__(self, **attributes):
+        self.projection_type = 'perspective'
+        self.fovy = 45.0
+        self.translation_x = 0
+        self.rotation_alpha = 0.0
+        self.rotation_v = np.array([1, 1, 1])
+        self.rot_angle_x = 0
+        self.rot_angle_y = 0
+        self.rot_angle_z = 0
+        self.pivot = np.zeros(3)
+        self.pivot_offset = np.zeros(3)
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
+
+class MatrixBuffers:
+    """
+        Preallocated float32 matrices for building the MVP matrix (and the
+        modelview and normal matrices of the lighting) every frame with
+        mat4batch; only the arcball rotation needs a few small temporaries.
+        dequantize maps quantized vertex positions to model coordinates
+        (identity for float positions, see quantize.py).
+    """
+
+    def __init__(self):
+        self.projection, self.view, self.arcball, self.translation, self.rot_x, self.rot_y, self.rot_z, \
+            self.dequantize, self.work, self.model, self.mvp, self.modelview, self.normal = \
+            np.zeros((13, 1, 4, 4), np.float32)
+        mat4batch.look_at((0, 0, 2), (0, 0, 0), (0, 1, 0), out=self.view)
+        mat4batch.identity(out=self.dequantize)
+
+    def model_view_projection(self, state, aspect):
+        self.update_projection(state, aspect)
+        self.update_model(state)
+        return self.combine()
+
+    def update_projection(self, state, aspect):
+        if state.projection_type == 'perspective':
+            mat4batch.perspective(state.fovy, aspect, 1.0, 5.0, out=self.projection)
+        else:
+            mat4batch.ortho(-1.0, 1.0, -1.0, 1.0, -1.0, 5.0, out=self.projection)
+
+    def update_model(self, state):
+        mat4batch.rotate_x(state.rot_angle_x, out=self.rot_x)
+        mat4batch.rotate_y(state.rot_angle_y, out=self.rot_y)
+        mat4batch.rotate_z(state.rot_angle_z, out=self.rot_z)
+        mat4batch.rotate(state.rotation_alpha, state.rotation_v, out=self.arcball)
+
+        # R = arcball @ rot_x @ rot_y @ rot_z, abwechselnd in model und work
+        np.matmul(self.rot_y, self.rot_z, out=self.model)
+        np.matmul(self.rot_x, self.model, out=self.work)
+        np.matmul(self.arcball, self.work, out=self.model)
+
+        # Drehung um den Drehpunkt p: translate(t + offset + p - R p) @ R
+        pivot = np.asarray(state.pivot, dtype=np.float32)
+        shift = np.asarray(state.pivot_offset, dtype=np.float32) + pivot - self.model[0, :3, :3] @ pivot
+        mat4batch.translate(state.translation_x + shift[0], shift[1], shift[2], out=self.translation)
+
+        # translate @ R @ dequantize
+        np.matmul(self.translation, self.model, out=self.work)
+        np.matmul(self.work, self.dequantize, out=self.model)
+
+        # für die Beleuchtung: Normalen ohne Dequantisierung drehen (nur Rotationen, keine inverse
+        # Transponierte nötig), Positionen in Kamerakoordinaten
+        np.matmul(self.view, self.work, out=self.normal)
+        np.matmul(self.view, self.model, out=self.modelview)
+
+    def combine(self):
+        """ projection @ view @ model from the current matrices """
+        mat4batch.model_view_projection(self.projection, self.view, self.model, out=self.mvp, work=self.work)
+        return self.mvp[0]
@@ -0,0 +1,24 @@
+#version 330
+
+uniform vec3 base_color;
+in vec3 v2f_position;
+flat in vec3 v2f_normal;
+out vec4 f_color;
+
+// Licht aus Richtung der Kamera (Kamerakoordinaten), Blinn-Phong
+const vec3 light_direction = normalize(vec3(0.3, 0.5, 1.0));
+const float ambient = 0.15;
+const float shininess = 32.0;
+
+void main()
+{
+    vec3 normal = normalize(v2f_normal);
+    vec3 view_direction = normalize(-v2f_position);
+    // Rückseiten offener Modelle wie Vorderseiten beleuchten
+    if (dot(normal, view_direction) < 0.0)
+        normal = -normal;
+    float diffuse = max(dot(normal, light_direction), 0.0);
+    // Glanzlicht nur auf beleuchteten Flächen
+    float specular = diffuse > 0.0 ? pow(max(dot(normal, normalize(light_direction + view_direction)), 0.0), shininess) : 0.0;
+    f_color = vec4(base_color * (ambient + diffuse) + vec3(0.3) * specular, 1.0);
+}
\ No newline at end of file
@@ -0,0 +1,309 @@
+"""
+Frame pacing: time steps, FPS cap, frame budget and arcball inertia.
+
+Animation advances by the elapsed time of a monotonic clock instead of a
+fixed step per frame, so the model turns equally fast at 30 and at 144
+frames per second. The loop of objViewer.RenderWindow uses one FramePacer:
+
+    pacer = FramePacer(fps_cap=60, budget=frame_budget(refresh_rate, swap_interval=1))
+    while ...:
+        if idle:
+            pacer.idle()            # nächster Frame beginnt ohne großen Zeitsprung
+            continue
+        dt = pacer.begin_frame()    # Sekunden seit dem letzten Frame
+        scene.advance(dt)
+        ...                         # zeichnen, Puffer tauschen
+        pacer.end_frame()           # Budget prüfen, bis zum nächsten Frame-Termin warten
+
+The clock (and sleep) are passed in, with FakeClock the whole timing runs
+without a window and without waiting:
+
+    python framePacing.py           # simulated frame rates, FPS cap, missed frames, inertia
+"""
+import math
+import time
+
+# größter Zeitschritt pro Frame, z. B. nach dem Verschieben des Fensters (Sekunden)
+MAX_STEP = 0.1
+
+# den Rest der Wartezeit aktiv warten, time.sleep wacht bis zu einigen ms zu spät auf (Sekunden)
+SPIN_MARGIN = 0.002
+
+# Bildwiederholrate, wenn der Monitor sie nicht meldet
+DEFAULT_REFRESH_RATE = 60.0
+
+# Frames, die länger als Budget * (1 + Toleranz) dauern, zählen als verpasst
+BUDGET_TOLERANCE = 0.5
+# höchstens eine Warnung pro Intervall (Sekunden)
+REPORT_INTERVAL = 1.0
+
+# Nachdrehen des Arcballs nach dem Loslassen
+INERTIA_HALF_LIFE = 0.35        # Sekunden, bis sich die Drehgeschwindigkeit halbiert
+INERTIA_SMOOTHING = 0.05        # Zeitkonstante der Geschwindigkeitsschätzung beim Ziehen (Sekunden)
+INERTIA_MIN_SPEED = 1.0         # darunter hält die Drehung an (Winkeleinheiten pro Sekunde)
+
+
+def frame_budget(refresh_rate=DEFAULT_REFRESH_RATE, swap_interval=1, fps_cap=0):
+    """ seconds per frame the loop aims for, from vsync (swap interval) and FPS cap """
+    rates = []
+    if swap_interval > 0:
+        rates.append(refresh_rate / swap_interval)
+    if fps_cap > 0:
+        rates.append(fps_cap)
+    return 1.0 / min(rates) if rates else 1.0 / refresh_rate
+
+
+class FakeClock:
+    """
+        Stand-in for time.perf_counter and time.sleep: time only moves on
+        advance() and sleep(), which can oversleep like the real one
+    """
+
+    def __init__(self, start=0.0, oversleep=0.0):
+        self.now = start
+        self.oversleep = oversleep      # Sekunden, die jeder sleep() zu lang dauert
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds + self.oversleep
+
+
+class FrameClock:
+    """
+        Time step between frames from a monotonic clock, limited to max_step
+    """
+
+    def __init__(self, clock=time.perf_counter, max_step=MAX_STEP):
+        self.clock = clock
+        self.max_step = max_step
+        self.last = None                # Zeitpunkt des letzten tick()
+        self.interval = 0.0             # ungekürzter Abstand der letzten beiden tick()
+
+    def tick(self):
+        """ seconds since the previous tick, 0 for the first one after reset() """
+        now = self.clock()
+        self.interval = now - self.last if self.last is not None else 0.0
+        self.last = now
+        return min(self.interval, self.max_step)
+
+    def reset(self):
+        self.last = None
+
+
+class FrameLimiter:
+    """
+        Caps the frame rate: sleeps until shortly before the next frame time
+        and waits the rest actively (only with time.perf_counter, an injected
+        clock just sleeps). Frame times follow a fixed grid, a late frame does
+        not shift the following ones unless it is a whole frame late.
+    """
+
+    def __init__(self, fps=0, clock=time.perf_counter, sleep=time.sleep, spin_margin=SPIN_MARGIN):
+        self.clock = clock
+        self.sleep = sleep
+        self.spin_margin = spin_margin
+        # aktiv warten nur mit der echten Uhr, eine eingesetzte (z. B. FakeClock) steht zwischen den Aufrufen still
+        self.spin = clock is time.perf_counter
+        self.period = 1.0 / fps if fps > 0 else 0.0
+        self.next_frame = None          # frühester Beginn des nächsten Frames
+
+    def wait(self):
+        """ block until the next frame may start; returns the waited seconds """
+        if self.period <= 0:
+            return 0.0
+        now = self.clock()
+        target = self.next_frame
+        if target is None or now - target > self.period:
+            # erster Frame oder mehr als einen Frame im Rückstand: nicht aufholen, neu einrasten
+            target = now
+        remaining = target - now
+        margin = self.spin_margin if self.spin else 0.0
+        if remaining > margin:
+            self.sleep(remaining - margin)
+        while self.spin and self.clock() < target:
+            pass
+        self.next_frame = target + self.period
+        return max(remaining, 0.0)
+
+    def reset(self):
+        self.next_frame = None
+
+
+class FrameBudget:
+    """
+        Counts frames whose interval misses the budget (seconds per frame)
+    """
+
+    def __init__(self, budget, tolerance=BUDGET_TOLERANCE, report_interval=REPORT_INTERVAL):
+        self.budget = budget
+        self.tolerance = tolerance
+        self.report_interval = report_interval
+        self.frames = 0
+        self.missed = 0
+        self.worst = 0.0                # längster Abstand zweier Frames
+        self._pending = []              # verpasste Frames seit der letzten Warnung: (Abstand, Arbeitszeit)
+        self._last_report = None
+
+    def record(self, interval, work, now):
+        """
+            interval: seconds since the previous frame, work: seconds the
+            previous frame spent before waiting; True if the deadline was missed
+        """
+        self.frames += 1
+        self.worst = max(self.worst, interval)
+        if interval <= self.budget * (1.0 + self.tolerance):
+            return False
+        self.missed += 1
+        self._pending.append((interval, work))
+        if self._last_report is None or now - self._last_report >= self.report_interval:
+            self._last_report = now
+            longest, longest_work = max(self._pending)
+            print("%d Frame(s) über dem Budget von %.1f ms, längster %.1f ms (davon Arbeit %.1f ms)" % (
+                len(self._pending), self.budget * 1000, longest * 1000, longest_work * 1000))
+            self._pending = []
+        return True
+
+    def summary(self):
+        if self.frames == 0:
+            return "Frame-Budget: keine Frames gemessen"
+        return "Frame-Budget %.1f ms: %d von %d Frames verpasst (%.1f%%), längster Abstand %.1f ms" % (
+            self.budget * 1000, self.missed, self.frames, 100.0 * self.missed / self.frames, self.worst * 1000)
+
+
+class FramePacer:
+    """
+        Time step, budget check and FPS cap of the render loop
+    """
+
+    def __init__(self, fps_cap=0, budget=None, clock=time.perf_counter, sleep=time.sleep,
+                 spin_margin=SPIN_MARGIN):
+        self.clock = FrameClock(clock)
+        self.limiter = FrameLimiter(fps_cap, clock, sleep, spin_margin)
+        self.budget = FrameBudget(budget if budget is not None else frame_budget(fps_cap=fps_cap))
+        self.frame_start = None
+        self.work = 0.0                 # Sekunden des letzten Frames bis end_frame()
+
+    def begin_frame(self):
+        """ time step of the frame in seconds """
+        dt = self.clock.tick()
+        if self.frame_start is not None:
+            self.budget.record(self.clock.interval, self.work, self.clock.last)
+        self.frame_start = self.clock.last
+        return dt
+
+    def end_frame(self):
+        """ after swapping the buffers: measure the frame, wait for the FPS cap """
+        self.work = self.clock.clock() - self.frame_start
+        self.limiter.wait()
+
+    def idle(self):
+        """ nothing drawn this loop iteration, the pause is no missed frame """
+        self.clock.reset()
+        self.limiter.reset()
+        self.frame_start = None
+
+
+class Inertia:
+    """
+        Keeps the arcball turning after the mouse is released: the angular
+        velocity is estimated while dragging and decays exponentially
+    """
+
+    def __init__(self, clock=time.perf_counter, half_life=INERTIA_HALF_LIFE, smoothing=INERTIA_SMOOTHING,
+                 min_speed=INERTIA_MIN_SPEED):
+        self.clock = clock
+        self.time_constant = half_life / math.log(2.0)
+        self.smoothing = smoothing
+        self.min_speed = min_speed
+        self.velocity = 0.0             # Winkeleinheiten pro Sekunde
+        self.previous = None            # (Zeit, Winkel) der letzten Mausposition beim Ziehen
+
+    @property
+    def active(self):
+        return abs(self.velocity) >= self.min_speed
+
+    def track(self, angle):
+        """ arcball angle of the current mouse position while dragging """
+        now = self.clock()
+        if self.previous is not None:
+            dt = now - self.previous[0]
+            if dt > 0:
+                # geglättet, damit ein einzelner ruckartiger Frame das Nachdrehen nicht bestimmt
+                weight = 1.0 - math.exp(-dt / self.smoothing)
+                self.velocity += ((angle - self.previous[1]) / dt - self.velocity) * weight
+        self.previous = (now, angle)
+
+    def step(self, dt):
+        """ change of the angle over dt seconds after the release """
+        self.previous = None
+        if not self.active:
+            self.velocity = 0.0
+            return 0.0
+        decay = math.exp(-dt / self.time_constant)
+        # Integral der abklingenden Geschwindigkeit über dt
+        delta = self.velocity * self.time_constant * (1.0 - decay)
+        self.velocity *= decay
+        return delta
+
+    def stop(self):
+        """ new drag: forget the previous motion """
+        self.velocity = 0.0
+        self.previous = None
+
+
+def simulate(frame_seconds, duration=1.0, fps_cap=0, budget=None, speed=300.0, oversleep=0.0):
+    """
+    run a pacer for duration seconds of simulated time with frames that take
+    frame_seconds (a number or a function of the frame number); returns
+    (frames, animation angle, missed frames, waited seconds)
+    """
+    clock = FakeClock(oversleep=oversleep)
+    pacer = FramePacer(fps_cap, budget, clock=clock, sleep=clock.sleep, spin_margin=0.0)
+    angle = 0.0
+    frames = 0
+    while clock() < duration:
+        angle += speed * pacer.begin_frame()
+        clock.advance(frame_seconds(frames) if callable(frame_seconds) else frame_seconds)
+        pacer.end_frame()
+        frames += 1
+    return frames, angle, pacer.budget.missed, sum(clock.sleeps)
+
+
+def main():
+    print("Animation mit 300 Grad/s über 1 s simulierter Zeit:")
+    for fps in (30, 60, 144, 1000):
+        frames, angle, _, _ = simulate(1.0 / fps, budget=1.0 / fps)
+        print("  %5d FPS: %5d Frames, Winkel %6.1f Grad" % (fps, frames, angle))
+
+    frames, _, missed, waited = simulate(0.002, fps_cap=60)
+    print("FPS-Begrenzung auf 60 bei 2 ms pro Frame: %d Frames, %.0f ms gewartet, %d verpasst" % (
+        frames, waited * 1000, missed))
+    frames, _, missed, _ = simulate(0.002, fps_cap=60, oversleep=0.004)
+    print("  mit 4 ms zu langem sleep(): %d Frames (Takt bleibt erhalten)" % frames)
+    frames, _, missed, _ = simulate(lambda frame: 0.05 if frame % 20 == 0 else 0.01, fps_cap=60)
+    print("jeder 20. Frame 50 ms: %d Frames, %d verpasst" % (frames, missed))
+
+    clock = FakeClock()
+    inertia = Inertia(clock)
+    for angle in range(0, 50, 5):
+        inertia.track(float(angle))
+        clock.advance(1.0 / 60)
+    speed = inertia.velocity
+    turned = 0.0
+    steps = 0
+    while inertia.active:
+        turned += inertia.step(1.0 / 60)
+        steps += 1
+    print("Arcball: %.0f Einheiten/s beim Loslassen, dreht %.1f weiter, steht nach %.2f s" % (
+        speed, turned, steps / 60.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+State cache in front of the OpenGL module.
+
+GLState forwards every gl* call to the OpenGL module and counts the calls
+that reach the driver. Calls that only set state (program, vertex array,
+polygon mode, capabilities, viewport, uniforms and constant vertex
+attributes) are skipped when the value is already current, each of them
+is a ctypes round trip in PyOpenGL.
+
+    gl = GLState()                      # or GLState(RecordingGL()) without a context
+    gl.glBindVertexArray(vertex_array)  # only reaches the driver if another array is bound
+    gl.set_uniforms(shader, {'modelview_projection_matrix': mvp})
+    gl.glDrawElements(...)              # forwarded and counted
+    calls = gl.end_frame()              # driver calls of the frame
+
+With enabled=False every call is forwarded, the counters stay the same, so
+the saving can be measured by switching the cache off. State changed
+directly on the OpenGL module is unknown to the cache: afterwards call
+invalidate().
+"""
+import zlib
+from collections import Counter
+
+import numpy as np
+
+
+class GLState:
+    """
+        Forwards GL calls, skips the redundant ones and counts the others per frame
+    """
+
+    def __init__(self, gl=None, enabled=True):
+        if gl is None:
+            from OpenGL import GL as gl
+        self.gl = gl
+        self.enabled = enabled
+        self.calls = Counter()          # Name -> Aufrufe an den Treiber im laufenden Frame
+        self.skipped = 0                # übersprungene Aufrufe im laufenden Frame
+        self.frames = 0
+        self.total_calls = 0
+        self.total_skipped = 0
+        self.invalidate()
+
+    def invalidate(self):
+        """ forget the tracked state, the next call of each kind reaches the driver """
+        self.program = None
+        self.vertex_array = None
+        self.viewport = None
+        self.polygon_modes = {}         # Seite -> Modus
+        self.capabilities = {}          # z. B. GL_CULL_FACE -> an/aus
+        self.attributes = {}            # Index -> Wert des konstanten Vertex-Attributs
+        self.uniforms = {}              # (Programm, Location) -> Wert als Bytes
+
+    def set_enabled(self, enabled):
+        """ switch the cache on or off and restart the counters """
+        self.enabled = enabled
+        self.invalidate()
+        self.calls = Counter()
+        self.skipped = self.frames = self.total_calls = self.total_skipped = 0
+
+    def __getattr__(self, name):
+        # nur für Namen, die GLState nicht selbst hat: Konstanten durchreichen, Funktionen zählen
+        if name.startswith('__') or name == 'gl':
+            raise AttributeError(name)
+        value = getattr(self.gl, name)
+        # nicht vorhandene Funktionen von PyOpenGL sind False und bleiben es
+        if name.startswith('gl') and callable(value) and value:
+            function = value
+
+            def counted(*args, **kwargs):
+                self.calls[name] += 1
+                return function(*args, **kwargs)
+            value = counted
+        self.__dict__[name] = value
+        return value
+
+    def _issue(self, name, *args):
+        self.calls[name] += 1
+        return getattr(self.gl, name)(*args)
+
+    def _current(self, value, current):
+        """ whether the call can be skipped """
+        if self.enabled and value == current:
+            self.skipped += 1
+            return True
+        return False
+
+    def glUseProgram(self, program):
+        if not self._current(program, self.program):
+            self.program = program
+            self._issue('glUseProgram', program)
+
+    def glBindVertexArray(self, vertex_array):
+        if not self._current(vertex_array, self.vertex_array):
+            self.vertex_array = vertex_array
+            self._issue('glBindVertexArray', vertex_array)
+
+    def glDeleteVertexArrays(self, count, vertex_arrays):
+        # gelöschtes gebundenes Vertex-Array: GL bindet 0
+        if self.vertex_array in list(vertex_arrays):
+            self.vertex_array = 0
+        self._issue('glDeleteVertexArrays', count, vertex_arrays)
+
+    def glViewport(self, x, y, width, height):
+        if not self._current((x, y, width, height), self.viewport):
+            self.viewport = (x, y, width, height)
+            self._issue('glViewport', x, y, width, height)
+
+    def glPolygonMode(self, face, mode):
+        if not self._current(mode, self.polygon_modes.get(face)):
+            self.polygon_modes[face] = mode
+            self._issue('glPolygonMode', face, mode)
+
+    def glEnable(self, capability):
+        if not self._current(True, self.capabilities.get(capability)):
+            self.capabilities[capability] = True
+            self._issue('glEnable', capability)
+
+    def glDisable(self, capability):
+        if not self._current(False, self.capabilities.get(capability)):
+            self.capabilities[capability] = False
+            self._issue('glDisable', capability)
+
+    def glVertexAttrib3f(self, index, x, y, z):
+        if not self._current((x, y, z), self.attributes.get(index)):
+            self.attributes[index] = (x, y, z)
+            self._issue('glVertexAttrib3f', index, x, y, z)
+
+    def _uniform(self, name, location, value, *args):
+        # Wert des aktuellen Programms, Arrays als Kopie ihrer Bytes (Matrizen werden in-place überschrieben)
+        key = (self.program, location)
+        data = (name, np.asarray(value).tobytes()) + args
+        if not self._current(data, self.uniforms.get(key)):
+            self.uniforms[key] = data
+            return True
+        return False
+
+    def glUniformMatrix4fv(self, location, count, transpose, value):
+        if self._uniform('glUniformMatrix4fv', location, value, count, transpose):
+            self._issue('glUniformMatrix4fv', location, count, transpose, value)
+
+    def glUniform3fv(self, location, count, value):
+        if self._uniform('glUniform3fv', location, value, count):
+            self._issue('glUniform3fv', location, count, value)
+
+    def glUniform1f(self, location, value):
+        if self._uniform('glUniform1f', location, value):
+            self._issue('glUniform1f', location, value)
+
+    def glUniform1i(self, location, value):
+        if self._uniform('glUniform1i', location, value):
+            self._issue('glUniform1i', location, value)
+
+    def set_uniforms(self, shader, values):
+        """
+            bind shader (a ShaderProgram, see shaderManager.py) and set the
+            uniforms {name: value}; 4x4 matrices (row-major like mat4.py),
+            vec3 and float values, only the changed ones reach the driver;
+            uniforms the program does not use are skipped
+        """
+        self.glUseProgram(shader.program)
+        for name, value in values.items():
+            location = shader.location(name)
+            if location == -1:
+                continue
+            value = np.asarray(value, dtype=np.float32)
+            if value.shape == (4, 4):
+                self.glUniformMatrix4fv(location, 1, self.gl.GL_TRUE, value)
+            elif value.shape == (3,):
+                self.glUniform3fv(location, 1, value)
+            elif value.ndim == 0:
+                self.glUniform1f(location, float(value))
+            else:
+                raise ValueError("uniform %s: unsupported shape %s" % (name, value.shape))
+
+    def end_frame(self):
+        """ number of driver calls of the finished frame, counting starts again for the next one """
+        calls = sum(self.calls.values())
+        self.frames += 1
+        self.total_calls += calls
+        self.total_skipped += self.skipped
+        self.calls = Counter()
+        self.skipped = 0
+        return calls
+
+    def summary(self):
+        if self.frames == 0:
+            return "GL-Aufrufe: keine Frames gezeichnet"
+        return "GL-Aufrufe pro Frame (State-Cache %s): %.1f, übersprungen %.1f" % (
+            'an' if self.enabled else 'aus', self.total_calls / self.frames, self.total_skipped / self.frames)
+
+
+class RecordingGL:
+    """
+        Stand-in for the OpenGL module without a context: records every
+        call, GL_* constants are distinct integers and glGen*/glCreate*
+        return new names
+    """
+
+    def __init__(self):
+        self.log = []                   # [(Name, Argumente), ...]
+        self.names = 0
+
+    def __getattr__(self, name):
+        if name.startswith('GL_'):
+            value = zlib.crc32(name.encode('ascii'))
+        elif name.startswith('gl'):
+            def record(*args):
+                self.log.append((name, args))
+                if name.startswith(('glGen', 'glCreate')):
+                    self.names += 1
+                    return self.names
+                return None
+            value = record
+        else:
+            raise AttributeError(name)
+        self.__dict__[name] = value
+        return value
+
+    def called(self, name):
+        """ argument tuples of all recorded calls of name """
+        return [args for called, args in self.log if called == name]
@@ -0,0 +1,28 @@
+#version 330
+
+layout (location=0) in vec4 v_position;
+layout (location=1) in vec3 v_normal;
+uniform mat4 modelview_projection_matrix;
+uniform mat4 modelview_matrix;
+uniform mat4 normal_matrix;
+uniform vec3 base_color;
+out vec3 v2f_color;             // pro Vertex beleuchtet, über das Dreieck interpoliert
+
+// Licht aus Richtung der Kamera (Kamerakoordinaten), Blinn-Phong
+const vec3 light_direction = normalize(vec3(0.3, 0.5, 1.0));
+const float ambient = 0.15;
+const float shininess = 32.0;
+
+void main()
+{
+    vec3 normal = normalize(mat3(normal_matrix) * v_normal);
+    vec3 view_direction = normalize(-(modelview_matrix * v_position).xyz);
+    // Rückseiten offener Modelle wie Vorderseiten beleuchten
+    if (dot(normal, view_direction) < 0.0)
+        normal = -normal;
+    float diffuse = max(dot(normal, light_direction), 0.0);
+    // Glanzlicht nur auf beleuchteten Flächen
+    float specular = diffuse > 0.0 ? pow(max(dot(normal, normalize(light_direction + view_direction)), 0.0), shininess) : 0.0;
+    v2f_color = base_color * (ambient + diffuse) + vec3(0.3) * specular;
+    gl_Position = modelview_projection_matrix * v_position;
+}
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Viewer for many instances of several OBJ models.
+
+    python instancedViewer.py ../models/bunny.obj ../models/cow.obj --count 2000
+
+The instances are placed on a grid and distributed over the models in turn;
+mouse and keys rotate the whole scene like in objViewer.
+"""
+import argparse
+
+from OpenGL.GL import *
+
+import objViewer
+from instancing import InstanceRenderer, grid_transforms
+from meshCache import MeshCache, DEFAULT_CACHE_DIR
+from objViewer import Scene, RenderWindow
+from profiler import PROFILER
+
+DEFAULT_INSTANCE_COUNT = 1000
+
+
+class InstancedScene(Scene):
+    """
+        Scene with instanced meshes: each model is uploaded once and drawn
+        with one glDrawElementsInstanced call
+    """
+
+    def __init__(self, width, height, objectPaths, count=DEFAULT_INSTANCE_COUNT, scenetitle="Computergrafik",
+                 mesh_cache=None, cleanup=False):
+        # jedes Modell nur einmal hochladen
+        self.objectPaths = list(dict.fromkeys(objectPaths))
+        super().__init__(width, height, self.objectPaths[0], scenetitle, mesh_cache, lod=False, cleanup=cleanup)
+        self.count = count
+        self.renderer = None
+
+    def init_GL(self):
+        self.renderer = InstanceRenderer(gl=self.gl_state, shader_manager=self.shader_manager)
+        # poll_shaders() lädt dann auch die Shader der Instanzen neu
+        self.shader_manager = self.renderer.shader_manager
+        self.gen_buffers()
+        self.renderer.init_GL()
+
+    def gen_buffers(self):
+        transforms = grid_transforms(self.count)
+        for index, path in enumerate(self.objectPaths):
+            with PROFILER.stage('load.total'):
+                # dieselben Optionen wie asyncLoader.prepare_mesh, damit beide Viewer dieselben Cache-Einträge nutzen
+                vertices, _, indices = self.mesh_cache.load(path, normal_mode=self.normal_mode,
+                                                            optimize=self.optimize, cleanup=self.cleanup)
+            self.renderer.add_mesh(path, vertices, indices)
+            # Instanzen reihum auf die Modelle verteilen
+            with PROFILER.stage('upload.instances'):
+                self.renderer.set_instances(path, transforms[index::len(self.objectPaths)])
+        print("%d Instanzen, %d Dreiecke, %d Draw-Calls pro Frame" % (
+            self.renderer.instance_count(), self.renderer.triangle_count(), len(self.objectPaths)))
+
+    def set_instances(self, path, transforms):
+        """ new (N, 4, 4) model matrices for all instances of a model """
+        self.renderer.set_instances(path, transforms)
+        self.dirty = True
+
+    def draw(self):
+        gl = self.gl_state
+        gl.glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        with PROFILER.stage('frame.matrices'):
+            mvp_matrix = self.update_matrices()
+
+        with PROFILER.stage('frame.draw'):
+            self.renderer.draw(mvp_matrix)
+            gl.glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
+
+        self.end_frame()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="instanced OBJ viewer")
+    parser.add_argument('objectPaths', nargs='+', help="OBJ files")
+    parser.add_argument('--count', type=int, default=DEFAULT_INSTANCE_COUNT, help="total number of instances")
+    parser.add_argument('--no-cache', action='store_true', help="bypass the binary mesh cache")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="directory of the mesh cache")
+    parser.add_argument('--continuous', action='store_true',
+                        help="redraw every loop iteration instead of only after changes")
+    parser.add_argument('--cleanup', action='store_true',
+                        help="weld close vertices, drop degenerate and duplicate triangles (see meshCleanup.py)")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+
+    width, height = 640, 480
+    scene = InstancedScene(width, height, args.objectPaths, args.count,
+                           mesh_cache=MeshCache(args.cache_dir, enabled=not args.no_cache), cleanup=args.cleanup)
+
+    # Arcball und Projektionswechsel in objViewer greifen auf diese globalen Variablen zu
+    objViewer.width, objViewer.height, objViewer.scene = width, height, scene
+
+    rw = RenderWindow(scene, on_demand=not args.continuous)
+    rw.run()
@@ -0,0 +1,168 @@
+"""
+Instanced drawing of many copies of several meshes.
+
+Every mesh is uploaded once. The model matrices of its instances live in an
+instance buffer (one mat4 per instance, glVertexAttribDivisor 1) and the mesh
+is drawn with a single glDrawElementsInstanced call. The OpenGL module is
+passed in (default: OpenGL.GL), so the buffer handling also runs against a
+recording stand-in without a GL context.
+
+    renderer = InstanceRenderer()
+    renderer.init_GL()
+    renderer.add_mesh('bunny', vertices, indices)
+    renderer.set_instances('bunny', transforms)     # (N, 4, 4) float
+    renderer.draw(view_projection)
+"""
+import ctypes
+
+import numpy as np
+
+import mat4batch
+from shaderManager import ShaderManager
+
+# Attribut-Locations wie in shader_instanced.vert, die mat4 belegt 4 Locations
+POSITION_LOCATION = 0
+COLOR_LOCATION = 1
+INSTANCE_LOCATION = 2
+
+# Farben der Meshes der Reihe nach
+MESH_COLORS = ((0.0, 1.0, 1.0), (1.0, 0.6, 0.0), (0.5, 1.0, 0.3), (1.0, 0.3, 0.6), (0.6, 0.6, 1.0))
+
+
+def instance_data(transforms):
+    """
+    (N, 4, 4) model matrices (mat4 convention, column vectors) as float32 rows
+    of 16 values in column-major order, as a GLSL mat4 attribute expects them
+    """
+    transforms = np.asarray(transforms, dtype=np.float32).reshape(-1, 4, 4)
+    return np.ascontiguousarray(transforms.transpose(0, 2, 1)).reshape(-1, 16)
+
+
+def grid_transforms(count, seed=0):
+    """ 'count' instances on a square grid in the xy plane, scaled to fit and randomly rotated """
+    side = max(int(np.ceil(np.sqrt(count))), 1)
+    cells = np.arange(count)
+    spacing = 2.0 / side
+    x = (cells % side - (side - 1) / 2.0) * spacing
+    y = (cells // side - (side - 1) / 2.0) * spacing
+    angles = np.random.default_rng(seed).uniform(0.0, 360.0, count)
+
+    # Modelle sind auf etwa [-0.67, 0.67] skaliert (objReader.scale), eine Zelle ist spacing breit
+    size = np.full(count, 0.7 * spacing)
+    transforms = mat4batch.translate(x, y, np.zeros(count))
+    np.matmul(transforms, mat4batch.rotate_y(angles), out=transforms)
+    np.matmul(transforms, mat4batch.scale(size, size, size), out=transforms)
+    return transforms
+
+
+class InstancedMesh:
+    """
+        GL objects of one mesh: vertex array, index count and instance buffer
+    """
+
+    def __init__(self, vertex_array, index_count, instance_buffer, color):
+        self.vertex_array = vertex_array
+        self.index_count = index_count
+        self.instance_buffer = instance_buffer
+        self.color = color
+        self.capacity = 0               # Anzahl Instanzen, für die der Buffer Platz hat
+        self.count = 0                  # Anzahl gezeichneter Instanzen
+
+
+class InstanceRenderer:
+    """
+        Uploads each mesh once and draws all its instances with one call
+    """
+
+    def __init__(self, gl=None, shader_manager=None):
+        if gl is None:
+            from OpenGL import GL as gl
+        self.gl = gl
+        self.meshes = {}                # Name -> InstancedMesh, in Einfügereihenfolge
+        self.shader_manager = shader_manager if shader_manager is not None else ShaderManager(gl)
+        self.shader = None
+
+    def init_GL(self):
+        self.shader = self.shader_manager.load('shader_instanced.vert', 'shader.frag')
+
+    def add_mesh(self, name, vertices, indices, color=None):
+        """ upload vertices (V, 3) and the flat index buffer of a mesh """
+        gl = self.gl
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        indices = np.ascontiguousarray(indices, dtype=np.uint32).ravel()
+        if color is None:
+            color = MESH_COLORS[len(self.meshes) % len(MESH_COLORS)]
+
+        vertex_array = gl.glGenVertexArrays(1)
+        gl.glBindVertexArray(vertex_array)
+
+        # Vertex positions
+        position_buffer = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, position_buffer)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, vertices.nbytes, vertices, gl.GL_STATIC_DRAW)
+        gl.glVertexAttribPointer(POSITION_LOCATION, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, None)
+        gl.glEnableVertexAttribArray(POSITION_LOCATION)
+
+        # Instanz-Matrizen: 4 Spalten à vec4, pro Instanz (Divisor 1) weitergeschaltet
+        instance_buffer = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, instance_buffer)
+        for column in range(4):
+            location = INSTANCE_LOCATION + column
+            gl.glVertexAttribPointer(location, 4, gl.GL_FLOAT, gl.GL_FALSE, 16 * 4,
+                                     ctypes.c_void_p(column * 4 * 4))
+            gl.glEnableVertexAttribArray(location)
+            gl.glVertexAttribDivisor(location, 1)
+
+        # Index buffer
+        index_buffer = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, index_buffer)
+        gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, gl.GL_STATIC_DRAW)
+
+        # Element-Buffer bleibt am VAO gebunden
+        gl.glBindVertexArray(0)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+        mesh = InstancedMesh(vertex_array, len(indices), instance_buffer, color)
+        self.meshes[name] = mesh
+        return mesh
+
+    def set_instances(self, name, transforms):
+        """ replace all instance matrices of a mesh with one upload """
+        gl = self.gl
+        mesh = self.meshes[name]
+        data = instance_data(transforms)
+
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, mesh.instance_buffer)
+        if len(data) > mesh.capacity:
+            # Buffer vergrößern (neuer Speicher), sonst nur den Inhalt überschreiben
+            gl.glBufferData(gl.GL_ARRAY_BUFFER, data.nbytes, data, gl.GL_DYNAMIC_DRAW)
+            mesh.capacity = len(data)
+        elif len(data):
+            gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0, data.nbytes, data)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        mesh.count = len(data)
+
+    def draw(self, mvp_matrix):
+        """ one glDrawElementsInstanced per mesh; mvp_matrix is applied to all instances """
+        gl = self.gl
+        gl.glUseProgram(self.shader.program)
+        location = self.shader.location('modelview_projection_matrix')
+        gl.glUniformMatrix4fv(location, 1, gl.GL_TRUE, mvp_matrix)
+
+        draw_calls = 0
+        for mesh in self.meshes.values():
+            if mesh.count == 0:
+                continue
+            gl.glBindVertexArray(mesh.vertex_array)
+            gl.glVertexAttrib3f(COLOR_LOCATION, *mesh.color)
+            gl.glDrawElementsInstanced(gl.GL_TRIANGLES, mesh.index_count, gl.GL_UNSIGNED_INT, None, mesh.count)
+            draw_calls += 1
+
+        # Programm und Vertex-Array bleiben gebunden, Scene.end_frame löst sie ohne State-Cache
+        return draw_calls
+
+    def instance_count(self):
+        return sum(mesh.count for mesh in self.meshes.values())
+
+    def triangle_count(self):
+        return sum(mesh.count * mesh.index_count // 3 for mesh in self.meshes.values())
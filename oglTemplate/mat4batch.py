@@ -0,0 +1,147 @@
+"""
+Batched float32 variants of the mat4 functions.
+
+Every function takes scalars or arrays of N parameters and returns a (N, 4, 4)
+float32 stack in the same convention as mat4 (column vectors, row-major).
+With out= the result is written into an existing (N, 4, 4) float32 buffer;
+rotate_x/y/z, scale, translate, perspective and ortho then allocate no
+NumPy arrays at all.
+"""
+import numpy as np
+
+
+def _output(out, *params):
+    """ (N, 4, 4) float32 buffer, cleared to zero """
+    if out is None:
+        count = max([np.size(param) for param in params if np.ndim(param) > 0] + [1])
+        out = np.empty((count, 4, 4), dtype=np.float32)
+    out[...] = 0.0
+    return out
+
+
+def identity(count=1, out=None):
+    if out is None:
+        out = np.empty((count, 4, 4), dtype=np.float32)
+    out[...] = 0.0
+    for i in range(4):
+        out[:, i, i] = 1.0
+    return out
+
+
+def _rotation(angles, out, i, j, axis):
+    """ rotation in the (i, j) plane, 'axis' keeps its coordinate """
+    out = _output(out, angles)
+    sin, cos = out[:, j, i], out[:, i, i]
+    sin[...] = angles
+    np.radians(sin, out=sin)
+    np.cos(sin, out=cos)
+    np.sin(sin, out=sin)
+    out[:, j, j] = cos
+    np.negative(sin, out=out[:, i, j])
+    out[:, axis, axis] = 1.0
+    out[:, 3, 3] = 1.0
+    return out
+
+
+def rotate_x(angles, out=None):
+    return _rotation(angles, out, 1, 2, 0)
+
+
+def rotate_y(angles, out=None):
+    return _rotation(angles, out, 2, 0, 1)
+
+
+def rotate_z(angles, out=None):
+    return _rotation(angles, out, 0, 1, 2)
+
+
+def rotate(angles, axes, out=None):
+    """ rotation by angles (degrees) around axes (N, 3) or (3,) """
+    axes = np.asarray(axes, dtype=np.float32).reshape(-1, 3)
+    out = _output(out, angles, axes[:, 0])
+    angles = np.radians(np.asarray(angles, dtype=np.float32)).reshape(-1)
+    c, s = np.cos(angles), np.sin(angles)
+    mc = 1 - c
+    x, y, z = (axes / np.linalg.norm(axes, axis=1, keepdims=True)).T
+    out[:, 0, 0], out[:, 0, 1], out[:, 0, 2] = x * x * mc + c, x * y * mc - z * s, x * z * mc + y * s
+    out[:, 1, 0], out[:, 1, 1], out[:, 1, 2] = x * y * mc + z * s, y * y * mc + c, y * z * mc - x * s
+    out[:, 2, 0], out[:, 2, 1], out[:, 2, 2] = x * z * mc - y * s, y * z * mc + x * s, z * z * mc + c
+    out[:, 3, 3] = 1.0
+    return out
+
+
+def scale(sx, sy, sz, out=None):
+    out = _output(out, sx, sy, sz)
+    out[:, 0, 0], out[:, 1, 1], out[:, 2, 2], out[:, 3, 3] = sx, sy, sz, 1.0
+    return out
+
+
+def translate(x, y, z, out=None):
+    out = _output(out, x, y, z)
+    for i in range(4):
+        out[:, i, i] = 1.0
+    out[:, 0, 3], out[:, 1, 3], out[:, 2, 3] = x, y, z
+    return out
+
+
+def look_at(eye, center, up, out=None):
+    """ view matrices for eye, center and up positions of shape (N, 3) or (3,) """
+    eye, center, up = (np.asarray(value, dtype=np.float32).reshape(-1, 3) for value in (eye, center, up))
+    out = _output(out, eye[:, 0], center[:, 0], up[:, 0])
+    up = up / np.linalg.norm(up, axis=1, keepdims=True)
+    f = (center - eye) / np.linalg.norm(center - eye, axis=1, keepdims=True)
+    s = np.cross(f, up)
+    s /= np.linalg.norm(s, axis=1, keepdims=True)
+    u = np.cross(s, f)
+    out[:, 0, :3], out[:, 1, :3], out[:, 2, :3] = s, u, -f
+    # gleiche Translationsspalte wie mat4.look_at
+    out[:, 0, 3] = np.einsum('ij,ij->i', s, eye)
+    out[:, 1, 3] = -np.einsum('ij,ij->i', u, eye)
+    out[:, 2, 3] = np.einsum('ij,ij->i', f, eye)
+    out[:, 3, 3] = 1.0
+    return out
+
+
+def ortho(l, r, b, t, n, f, out=None):
+    out = _output(out, l, r, b, t, n, f)
+    out[:, 0, 0], out[:, 0, 3] = 2 / (r - l), -(r + l) / (r - l)
+    out[:, 1, 1], out[:, 1, 3] = 2 / (t - b), -(t + b) / (t - b)
+    out[:, 2, 2], out[:, 2, 3] = -2 / (f - n), -(f + n) / (f - n)
+    out[:, 3, 3] = 1.0
+    return out
+
+
+def frustum(l, r, b, t, n, f, out=None):
+    out = _output(out, l, r, b, t, n, f)
+    out[:, 0, 0], out[:, 0, 2] = 2 * n / (r - l), (r + l) / (r - l)
+    out[:, 1, 1], out[:, 1, 2] = 2 * n / (t - b), (t + b) / (t - b)
+    out[:, 2, 2], out[:, 2, 3] = -(f + n) / (f - n), -2 * f * n / (f - n)
+    out[:, 3, 2] = -1.0
+    return out
+
+
+def perspective(fovy, aspect, zNear, zFar, out=None):
+    out = _output(out, fovy, aspect, zNear, zFar)
+    f = out[:, 1, 1]
+    f[...] = fovy
+    np.radians(f, out=f)
+    f *= 0.5
+    np.tan(f, out=f)
+    np.reciprocal(f, out=f)      # cotan(fovy/2)
+    np.divide(f, aspect, out=out[:, 0, 0])
+    out[:, 2, 2] = (zFar + zNear) / (zNear - zFar)
+    out[:, 2, 3] = (2 * zFar * zNear) / (zNear - zFar)
+    out[:, 3, 2] = -1.0
+    return out
+
+
+def model_view_projection(projection, view, model, out=None, work=None):
+    """
+    projection @ view @ model for stacks of matrices; projection and view are
+    usually single matrices and model a (N, 4, 4) stack. work is an optional
+    buffer of the shape of projection @ view for an allocation-free call.
+    """
+    view_projection = np.matmul(projection, view, out=work)
+    if out is None:
+        return np.matmul(view_projection, model).astype(np.float32, copy=False)
+    return np.matmul(view_projection, model, out=out)
@@ -0,0 +1,155 @@
+"""
+Binary cache for preprocessed meshes.
+
+After the first load of an OBJ file the GPU-ready arrays (vertices, normals,
+indices) are written as .npy files into a cache directory. Later loads
+memory-map these files and skip parsing entirely.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from objReader import load_mesh
+
+DEFAULT_CACHE_DIR = os.environ.get('OGL_MESH_CACHE',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'oglTemplate', 'meshes'))
+DEFAULT_SIZE_LIMIT = 512 * 1024 * 1024      # 512 MB
+
+# bei Änderungen am Ladevorgang erhöhen, damit alte Einträge ungültig werden
+CACHE_VERSION = 2
+
+ARRAY_NAMES = ('vertices', 'normals', 'indices')
+META_FILE = 'meta.json'
+
+
+def file_hash(file_path):
+    """ SHA-1 of the file content """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MeshCache:
+    """
+        Cache of loaded meshes, invalidated when size, mtime or content of
+        the OBJ file change. The least recently used entries are evicted
+        when the cache directory grows beyond size_limit bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, size_limit=DEFAULT_SIZE_LIMIT, enabled=True):
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, file_path, loader=load_mesh, **options):
+        """
+        return (vertices, normals, indices) for file_path, from the cache if possible;
+        options are passed to the loader and are part of the cache key
+        """
+        if not self.enabled:
+            return loader(file_path, **options)
+
+        entry = self._entry_dir(file_path, options)
+        if self._is_valid(entry, file_path):
+            self.hits += 1
+            # Zugriffszeit für LRU aktualisieren
+            os.utime(os.path.join(entry, META_FILE))
+            return tuple(np.load(os.path.join(entry, name + '.npy'), mmap_mode='r') for name in ARRAY_NAMES)
+
+        self.misses += 1
+        arrays = loader(file_path, **options)
+        try:
+            self._store(entry, file_path, arrays)
+            self._evict()
+        except OSError as error:
+            # Cache ist nur eine Beschleunigung, Fehler beim Schreiben sind nicht fatal
+            print("mesh cache not written: %s" % error)
+        return arrays
+
+    def clear(self):
+        """ remove all cache entries """
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+
+    def size(self):
+        """ total size of the cache directory in bytes """
+        return sum(size for _, size, _ in self._entries())
+
+    def _entry_dir(self, file_path, options):
+        source = os.path.abspath(file_path) + json.dumps(options, sort_keys=True)
+        key = hashlib.sha1(source.encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.cache_dir, key)
+
+    def _is_valid(self, entry, file_path):
+        try:
+            with open(os.path.join(entry, META_FILE), 'r') as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        stat = os.stat(file_path)
+        if meta.get('version') != CACHE_VERSION or meta.get('size') != stat.st_size:
+            return False
+        if meta.get('mtime_ns') != stat.st_mtime_ns:
+            # nur der Zeitstempel hat sich geändert -> Inhalt vergleichen
+            if meta.get('sha1') != file_hash(file_path):
+                return False
+            meta['mtime_ns'] = stat.st_mtime_ns
+            self._write_meta(entry, meta)
+        return all(os.path.exists(os.path.join(entry, name + '.npy')) for name in ARRAY_NAMES)
+
+    def _store(self, entry, file_path, arrays):
+        # erst in ein temporäres Verzeichnis schreiben, dann umbenennen
+        tmp_entry = '%s.tmp%d' % (entry, os.getpid())
+        os.makedirs(tmp_entry, exist_ok=True)
+        for name, array in zip(ARRAY_NAMES, arrays):
+            np.save(os.path.join(tmp_entry, name + '.npy'), np.ascontiguousarray(array))
+
+        stat = os.stat(file_path)
+        self._write_meta(tmp_entry, {'version': CACHE_VERSION,
+                                     'source': os.path.abspath(file_path),
+                                     'size': stat.st_size,
+                                     'mtime_ns': stat.st_mtime_ns,
+                                     'sha1': file_hash(file_path)})
+        if os.path.isdir(entry):
+            shutil.rmtree(entry)
+        os.replace(tmp_entry, entry)
+
+    @staticmethod
+    def _write_meta(entry, meta):
+        with open(os.path.join(entry, META_FILE), 'w') as file:
+            json.dump(meta, file)
+
+    def _entries(self):
+        """ (path, size in bytes, last use) of every cache entry """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(entry):
+                continue
+            files = [os.path.join(entry, file) for file in os.listdir(entry)]
+            size = sum(os.path.getsize(file) for file in files)
+            meta = os.path.join(entry, META_FILE)
+            last_use = os.path.getmtime(meta) if os.path.exists(meta) else time.time()
+            entries.append((entry, size, last_use))
+        return entries
+
+    def _evict(self):
+        """ remove least recently used entries until the size limit is met """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.size_limit:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
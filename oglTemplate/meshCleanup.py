@@ -0,0 +1,357 @@
+"""
+Validation and cleanup of triangle meshes.
+
+clean_mesh welds vertices closer than epsilon, removes degenerate and
+duplicate triangles and drops vertices no triangle references. Welding uses
+a uniform grid with cells of CELL_FACTOR * epsilon: the vertices are sorted
+by their packed cell key and by x within the cell, exact duplicates are
+merged first, and each vertex is compared with the vertices of its own cell
+that lie less than epsilon further in x; only vertices within epsilon of a
+cell wall are also compared with the cell behind it (13 "forward" neighbour
+cells, so every pair is visited once). The work grows with the number of
+vertices instead of its square, also for many coincident vertices. Welding
+is transitive (a chain of close vertices becomes one vertex); the first
+vertex of a group is kept.
+
+    cleaned = clean_mesh(vertices, faces)
+    print(format_report(cleaned.stats))
+    python meshCleanup.py [model.obj ...] [--epsilon 1e-6]
+
+objReader.load_mesh(..., cleanup=True) runs it after loading (objViewer --cleanup).
+"""
+import argparse
+import glob
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# Abstand, unter dem Vertices zusammengelegt werden (Einheiten nach objReader.scale, Modell in [-2/3, 2/3])
+DEFAULT_EPSILON = 1e-6
+# Vertices mit verschiedenen Normalen (harte Kanten) bleiben getrennt
+NORMAL_TOLERANCE = 1e-3
+# Dreiecke mit doppelter Fläche unter diesem Anteil der quadrierten Ausdehnung gelten als entartet
+AREA_TOLERANCE = 1e-14
+
+# ungerade 64-Bit-Faktoren für den Hash der Dreiecke (Überlauf ist gewollt)
+HASH_FACTORS = (np.int64(-7046029254386353131), np.int64(-4658895280553007687), np.int64(6364136223846793005))
+
+CELL_BITS = 21                  # Bits pro Achse im gepackten Zellschlüssel
+# Zellgröße in epsilon: nur Vertices näher als epsilon an einer Zellwand suchen in der Nachbarzelle
+CELL_FACTOR = 8
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+# remap: alter Vertex -> neuer Vertex (-1 = entfernt), stats: was sich geändert hat (siehe format_report)
+CleanMesh = namedtuple('CleanMesh', ['vertices', 'faces', 'normals', 'remap', 'stats'])
+
+
+def _neighbour_offsets():
+    """ the 13 neighbour cells with a larger key, so every pair of cells is visited once """
+    offsets = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)]
+    return [offset for offset in offsets if offset > (0, 0, 0)]
+
+
+def _range_pairs(first_starts, first_counts, second_starts, second_counts):
+    """ all pairs (i, j) with i in range k of the first and j in range k of the second ranges """
+    sizes = first_counts * second_counts
+    pair_range = np.repeat(np.arange(len(sizes)), sizes)
+    # laufende Nummer innerhalb des Bereichspaars -> (i, j)
+    within = np.arange(len(pair_range)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    second_count = second_counts[pair_range]
+    return (first_starts[pair_range] + within // second_count,
+            second_starts[pair_range] + within % second_count)
+
+
+def identical_rows(columns):
+    """ smallest index of the row with exactly the same values in all columns, for every row """
+    count = len(columns[0])
+    labels = np.arange(count)
+    # 64-Bit-Hash der Bitmuster, nur Zeilen mit mehrfach vorkommendem Hash werden genau verglichen
+    hashes = np.zeros(count, dtype=np.int64)
+    for column in columns:
+        column = np.ascontiguousarray(column)
+        bits = column.view(np.int32 if column.itemsize == 4 else np.int64)
+        hashes = (hashes ^ bits) * HASH_FACTORS[0]
+    sorted_hashes = np.sort(hashes)
+    repeated_hashes = np.unique(sorted_hashes[1:][sorted_hashes[1:] == sorted_hashes[:-1]])
+    if len(repeated_hashes) == 0:
+        return labels
+    position = np.minimum(np.searchsorted(repeated_hashes, hashes), len(repeated_hashes) - 1)
+    candidates = np.flatnonzero(repeated_hashes[position] == hashes)
+
+    order = candidates[np.lexsort([column[candidates] for column in columns[::-1]])]
+    same = np.ones(len(order) - 1, dtype=bool)
+    for column in columns:
+        same &= column[order[1:]] == column[order[:-1]]
+    starts = np.flatnonzero(np.concatenate(([True], ~same)))
+    labels[order] = np.repeat(np.minimum.reduceat(order, starts), np.diff(np.append(starts, len(order))))
+    return labels
+
+
+def weld_groups(vertices, epsilon=DEFAULT_EPSILON, normals=None):
+    """
+    representative of every vertex: the smallest index of its group of
+    vertices closer than epsilon (and with equal normals, if given)
+    """
+    vertices = np.asarray(vertices)
+    count = len(vertices)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if normals is not None:
+        normals = np.asarray(normals)
+
+    # Zellgröße CELL_FACTOR * epsilon, mindestens so groß, dass jede Achse in CELL_BITS - 1 Bits passt
+    # (Rand für die Nachbarzellen, damit sich beim Addieren der Offsets keine Felder überlagern)
+    # spaltenweise ist deutlich schneller als min(axis=0) auf (V, 3)
+    low = np.array([vertices[:, axis].min() for axis in range(3)], dtype=np.float64)
+    extent = max(float(vertices[:, axis].max()) - low[axis] for axis in range(3))
+    cell_size = max(CELL_FACTOR * epsilon, extent / (2 ** (CELL_BITS - 1) - 2), 1e-300)
+    margin = epsilon / cell_size
+    keys = np.zeros(count, dtype=np.int64)
+    # Bit axis: näher als epsilon an der unteren Zellwand, Bit 3 + axis: an der oberen
+    walls = np.zeros(count, dtype=np.uint8)
+    for axis in range(3):
+        scaled = (vertices[:, axis] - low[axis]) / cell_size
+        cells = np.floor(scaled)
+        scaled -= cells
+        walls |= (scaled <= margin).astype(np.uint8) << axis
+        walls |= (scaled >= 1.0 - margin).astype(np.uint8) << (3 + axis)
+        keys |= (cells.astype(np.int64) + 1) << ((2 - axis) * CELL_BITS)
+        if axis == 0:
+            # x innerhalb der Zelle, in [0, 1)
+            local_x = scaled
+
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    cell_starts = np.flatnonzero(np.diff(sorted_keys, prepend=-1))
+    cell_keys = sorted_keys[cell_starts]
+    cell_counts = np.diff(np.append(cell_starts, count))
+    # Sweep-Wert 2 * Nummer der Zelle + x in der Zelle: danach sortiert liegen die Vertices jeder Zelle
+    # nach x geordnet hintereinander, ein Fenster von margin < 1 bleibt in einer Zelle
+    # (zwei argsort sind deutlich schneller als lexsort)
+    sweep = 2.0 * np.repeat(np.arange(len(cell_starts)), cell_counts) + local_x[order]
+    by_sweep = np.argsort(sweep)
+    order = order[by_sweep]
+    sweep = sweep[by_sweep]
+
+    # exakt gleiche Vertices haben denselben Sweep-Wert und werden vorab zusammengefasst, sonst ergäbe
+    # ein Haufen gleicher Positionen quadratisch viele Paare; weiter nur mit dem ersten jeder Gruppe
+    identical = np.arange(count)
+    equal = np.flatnonzero(sweep[1:] == sweep[:-1])
+    if len(equal):
+        runs = np.union1d(equal, equal + 1)
+        same_sweep = np.sort(order[runs])
+        columns = [vertices[same_sweep, axis] for axis in range(3)]
+        if normals is not None:
+            columns += [normals[same_sweep, axis] for axis in range(3)]
+        identical[same_sweep] = same_sweep[identical_rows(columns)]
+        removed = runs[identical[order[runs]] != order[runs]]
+        # jede Zelle behält mindestens einen Vertex, ihre Nummern im Sweep-Wert bleiben gültig
+        cell_counts = cell_counts - np.bincount((sweep[removed] // 2.0).astype(np.int64), minlength=len(cell_keys))
+        cell_starts = np.cumsum(cell_counts) - cell_counts
+        order, sweep = np.delete(order, removed), np.delete(sweep, removed)
+    sorted_keys = keys[order]
+    walls = walls[order]
+
+    # Kandidaten: Paare in derselben Zelle (meist genau zwei Vertices), in größeren Zellen jeder Vertex
+    # mit den folgenden, die in x höchstens epsilon weiter liegen ...
+    pairs = cell_starts[cell_counts == 2]
+    candidates = [(pairs, pairs + 1)]
+    positions = np.flatnonzero(np.repeat(cell_counts > 2, cell_counts))
+    window_sizes = np.searchsorted(sweep, sweep[positions] + margin, side='right') - positions - 1
+    candidates.append(_range_pairs(positions, np.ones(len(positions), dtype=np.int64), positions + 1, window_sizes))
+
+    # ... und Vertices nahe einer Zellwand mit den Vertices der Zelle dahinter im selben x-Fenster
+    for offset in _neighbour_offsets():
+        required = 0
+        for axis, step in enumerate(offset):
+            if step:
+                required |= 1 << (axis + 3 if step > 0 else axis)
+        near = np.flatnonzero((walls & required) == required)
+        neighbour_keys = sorted_keys[near] + ((offset[0] << (2 * CELL_BITS)) + (offset[1] << CELL_BITS) + offset[2])
+        found = np.minimum(np.searchsorted(cell_keys, neighbour_keys), len(cell_keys) - 1)
+        occupied = cell_keys[found] == neighbour_keys
+        near, found = near[occupied], found[occupied]
+        # x des Vertex in der Nachbarzelle gemessen
+        center = 2.0 * found + local_x[order[near]] - offset[0]
+        window_starts = np.searchsorted(sweep, center - margin, side='left')
+        window_ends = np.searchsorted(sweep, center + margin, side='right')
+        candidates.append(_range_pairs(near, np.ones(len(near), dtype=np.int64),
+                                       window_starts, window_ends - window_starts))
+    first = order[np.concatenate([pair[0] for pair in candidates])]
+    second = order[np.concatenate([pair[1] for pair in candidates])]
+
+    # echte Abstände prüfen
+    difference = vertices[first].astype(np.float64) - vertices[second]
+    close = np.einsum('ij,ij->i', difference, difference) <= epsilon * epsilon
+    if normals is not None:
+        close &= np.abs(normals[first] - normals[second]).max(axis=1) <= NORMAL_TOLERANCE
+    first, second = first[close], second[close]
+
+    # Zusammenhangskomponenten: kleinsten Index über die Paare weitergeben und Zeiger verkürzen, bis beide
+    # Enden jedes Paars dasselbe Label haben, dann ist es in jeder Komponente ihr kleinster Index
+    labels = np.arange(count)
+    while len(first):
+        smaller = np.minimum(labels[first], labels[second])
+        np.minimum.at(labels, first, smaller)
+        np.minimum.at(labels, second, smaller)
+        labels = labels[labels]
+        if np.array_equal(labels[first], labels[second]):
+            break
+    # der erste Vertex jeder Gruppe gleicher Vertices ist ihr kleinster Index
+    return labels[identical]
+
+
+def duplicate_faces(faces):
+    """ mask of the faces that repeat an earlier face with the same corners, in any order or winding """
+    corner_a, corner_b, corner_c = np.asarray(faces, dtype=np.int64).T
+    low = np.minimum(np.minimum(corner_a, corner_b), corner_c)
+    high = np.maximum(np.maximum(corner_a, corner_b), corner_c)
+    middle = corner_a + corner_b + corner_c - low - high
+
+    # nur Dreiecke, deren 64-Bit-Hash der sortierten Ecken mehrfach vorkommt, werden genau verglichen;
+    # np.sort ist viel schneller als argsort und Duplikate sind selten
+    hashes = (low * HASH_FACTORS[0]) ^ (middle * HASH_FACTORS[1]) ^ (high * HASH_FACTORS[2])
+    sorted_hashes = np.sort(hashes)
+    repeated_hashes = np.unique(sorted_hashes[1:][sorted_hashes[1:] == sorted_hashes[:-1]])
+    repeated = np.zeros(len(hashes), dtype=bool)
+    if len(repeated_hashes) == 0:
+        return repeated
+    position = np.minimum(np.searchsorted(repeated_hashes, hashes), len(repeated_hashes) - 1)
+    candidates = np.flatnonzero(repeated_hashes[position] == hashes)
+
+    order = candidates[np.lexsort((high[candidates], middle[candidates], low[candidates]))]
+    same = np.ones(len(order) - 1, dtype=bool)
+    for column in (low, middle, high):
+        same &= column[order[1:]] == column[order[:-1]]
+
+    # in jeder Gruppe gleicher Dreiecke bleibt das mit dem kleinsten Index
+    starts = np.flatnonzero(np.concatenate(([True], ~same)))
+    repeated[order] = True
+    repeated[np.minimum.reduceat(order, starts)] = False
+    return repeated
+
+
+def _squared_doubled_areas(vertices, faces, block_size=1 << 20):
+    """ |cross product of the edges|^2 in float64, in blocks to limit the temporary memory """
+    areas = np.empty(len(faces))
+    for first in range(0, len(faces), block_size):
+        block = faces[first:first + block_size]
+        origin = vertices[block[:, 0]].astype(np.float64)
+        edge1 = vertices[block[:, 1]] - origin
+        edge2 = vertices[block[:, 2]] - origin
+        cross_x = edge1[:, 1] * edge2[:, 2] - edge1[:, 2] * edge2[:, 1]
+        cross_y = edge1[:, 2] * edge2[:, 0] - edge1[:, 0] * edge2[:, 2]
+        cross_z = edge1[:, 0] * edge2[:, 1] - edge1[:, 1] * edge2[:, 0]
+        areas[first:first + block_size] = cross_x * cross_x + cross_y * cross_y + cross_z * cross_z
+    return areas
+
+
+def clean_mesh(vertices, faces, epsilon=DEFAULT_EPSILON, normals=None):
+    """
+    weld, remove degenerate and duplicate faces (also with opposite winding)
+    and unreferenced vertices; returns a CleanMesh with float32 vertices,
+    int32 (F, 3) faces and the normals (None if not given) of the kept vertices
+    """
+    start = time.perf_counter()
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if normals is not None and len(normals) != len(vertices):
+        normals = None
+
+    labels = weld_groups(vertices, epsilon, normals)
+    welded = int(np.count_nonzero(labels != np.arange(len(labels))))
+    faces = labels[faces]
+
+    # entartet: zwei gleiche Ecken oder (fast) keine Fläche
+    repeated = (faces[:, 0] == faces[:, 1]) | (faces[:, 1] == faces[:, 2]) | (faces[:, 0] == faces[:, 2])
+    extent = max(float(np.ptp(vertices[:, axis])) for axis in range(3)) if len(vertices) else 0.0
+    tolerance = AREA_TOLERANCE * extent * extent
+    degenerate = repeated | (_squared_doubled_areas(vertices, faces) <= tolerance * tolerance)
+    faces = faces[~degenerate]
+
+    # doppelte Dreiecke: das erste Vorkommen bleibt, die Reihenfolge der übrigen auch
+    repeat = duplicate_faces(faces)
+    faces = faces[~repeat]
+
+    # nur referenzierte Vertices behalten und neu nummerieren
+    used = np.zeros(len(vertices), dtype=bool)
+    used[faces.ravel()] = True
+    new_index = np.cumsum(used) - 1
+    remap = np.where(used[labels], new_index[labels], -1)
+    kept_vertices = np.ascontiguousarray(vertices[used], dtype=np.float32)
+    kept_normals = np.ascontiguousarray(normals[used], dtype=np.float32) if normals is not None else None
+
+    stats = {
+        'vertices_in': len(vertices),
+        'vertices_out': len(kept_vertices),
+        'welded_vertices': welded,
+        'unreferenced_vertices': len(vertices) - welded - len(kept_vertices),
+        'faces_in': len(degenerate),
+        'faces_out': len(faces),
+        'degenerate_faces': int(np.count_nonzero(degenerate)),
+        'duplicate_faces': int(np.count_nonzero(repeat)),
+        'seconds': time.perf_counter() - start,
+    }
+    return CleanMesh(kept_vertices, new_index[faces].astype(np.int32), kept_normals, remap, stats)
+
+
+def format_report(stats):
+    return ("%d -> %d vertices (%d welded, %d unreferenced), %d -> %d faces (%d degenerate, %d duplicate), "
+            "%.2f s" % (stats['vertices_in'], stats['vertices_out'], stats['welded_vertices'],
+                        stats['unreferenced_vertices'], stats['faces_in'], stats['faces_out'],
+                        stats['degenerate_faces'], stats['duplicate_faces'], stats['seconds']))
+
+
+def noisy_grid(vertex_count, epsilon=DEFAULT_EPSILON, seed=0):
+    """
+    grid mesh with about vertex_count vertices in which every vertex is
+    stored twice, the copy moved by less than epsilon, plus one degenerate
+    face per row; for timing large inputs
+    """
+    rng = np.random.default_rng(seed)
+    side = max(int(np.sqrt(vertex_count / 2)), 2)
+    x, y = np.meshgrid(np.linspace(-0.6, 0.6, side), np.linspace(-0.6, 0.6, side))
+    grid = np.stack((x.ravel(), y.ravel(), 0.1 * np.sin(8.0 * x.ravel()) * np.cos(8.0 * y.ravel())), axis=1)
+    copies = grid + rng.uniform(-0.5, 0.5, grid.shape) * epsilon / np.sqrt(3)
+    vertices = np.concatenate((grid, copies))
+    cell = np.arange(side - 1)[None, :] + side * np.arange(side - 1)[:, None]
+    cell = cell.ravel()
+    # jedes zweite Dreieck verwendet die verschobenen Kopien
+    faces = np.concatenate((np.stack((cell, cell + 1, cell + side), axis=1),
+                            np.stack((cell + 1, cell + side + 1, cell + side), axis=1) + side * side))
+    rows = np.arange(side - 1) * side
+    faces = np.concatenate((faces, np.stack((rows, rows, rows + 1), axis=1)))
+    return vertices.astype(np.float32), faces
+
+
+def report(file_path, epsilon=DEFAULT_EPSILON):
+    """ clean one OBJ file (as loaded by the viewer) and print what changed """
+    from objReader import load_obj
+    vertices, faces, normals, _ = load_obj(None, file_path)
+    cleaned = clean_mesh(vertices, faces, epsilon, normals if len(normals) else None)
+    print("%-18s %s" % (os.path.basename(file_path), format_report(cleaned.stats)))
+    return cleaned.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="weld vertices and remove degenerate/duplicate faces")
+    parser.add_argument('models', nargs='*', help="OBJ files (default: all bundled models)")
+    parser.add_argument('--epsilon', type=float, default=DEFAULT_EPSILON, help="welding distance")
+    parser.add_argument('--synthetic', type=int, nargs='*', default=[], metavar='VERTICES',
+                        help="also clean noisy grids of this size (e.g. 10000000)")
+    args = parser.parse_args()
+
+    for path in args.models or sorted(glob.glob(os.path.join(MODELS_DIR, '*.obj'))):
+        report(path, args.epsilon)
+    for vertex_count in args.synthetic:
+        vertices, faces = noisy_grid(vertex_count, args.epsilon)
+        cleaned = clean_mesh(vertices, faces, args.epsilon)
+        print("%-18s %s" % ("grid %d" % len(vertices), format_report(cleaned.stats)))
+
+
+if __name__ == '__main__':
+    main()
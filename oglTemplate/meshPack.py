@@ -0,0 +1,362 @@
+"""
+Compressed binary mesh format for distributing models (.omesh).
+
+Positions are quantized to a grid over the bounding box (16 bits per axis
+by default), normals are stored octahedral as 2x int16 (see quantize.py).
+Each stream is delta coded, zigzag mapped to unsigned values and written
+as varints, so small steps between neighbouring vertices and indices take
+one byte each; the result is compressed with zlib or lzma in independent
+blocks of BLOCK_SIZE vertices or triangles, which can be decoded in
+parallel or on demand. The header stores the bounds and the normalization
+(center and scaling factor of objReader.calculate_center / scale), so
+loading needs neither.
+
+    python meshPack.py pack model.obj [-o model.omesh] [--compression lzma]
+    python meshPack.py unpack model.omesh [-o model.obj]
+    python meshPack.py report [model.obj ...]   # ratio, decode MB/s, round-trip error
+
+objReader.load_mesh reads .omesh files with load_packed instead of load_obj,
+so the viewer, the mesh cache and the background loader accept them as well.
+"""
+import argparse
+import glob
+import json
+import lzma
+import os
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from objReader import VERTEX_COLOR, has_face_normals, parse_obj, weld_vertices, calculate_center, translate_to_center, load_obj
+from profiler import PROFILER
+from quantize import encode_octahedral, decode_octahedral, angle_error
+
+PACKED_EXTENSION = '.omesh'
+MAGIC = b'OGLMESH\0'
+FORMAT_VERSION = 1
+
+DEFAULT_BITS = 16                   # Bits pro Achse der quantisierten Positionen
+BLOCK_SIZE = 65536                  # Vertices bzw. Dreiecke pro Block
+
+# (komprimieren(Daten, Stufe), dekomprimieren, Standardstufe)
+COMPRESSORS = {
+    'zlib': (lambda data, level: zlib.compress(data, level), zlib.decompress, 9),
+    'lzma': (lambda data, level: lzma.compress(data, preset=level), lzma.decompress, 6),
+}
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+
+def encode_varints(values):
+    """ unsigned integers -> LEB128 bytes (7 bits per byte, high bit = more bytes follow) """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for byte in range(1, 10):
+        lengths += values >= np.uint64(1 << (7 * byte))
+    starts = np.cumsum(lengths) - lengths
+    encoded = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for byte in range(int(lengths.max()) if len(values) else 0):
+        selected = lengths > byte
+        payload = (values[selected] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+        more = (lengths[selected] > byte + 1).astype(np.uint64) << np.uint64(7)
+        encoded[starts[selected] + byte] = payload | more
+    return encoded.tobytes()
+
+
+def decode_varints(data, count):
+    """ count unsigned integers (uint64) from LEB128 bytes; raises ValueError if the data does not fit """
+    data = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(data < 0x80)
+    if len(ends) != count or (count and ends[-1] != len(data) - 1):
+        raise ValueError("corrupt block: %d values expected, %d found" % (count, len(ends)))
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # Position jedes Bytes innerhalb seines Werts -> Verschiebung um 7 Bit pro Byte
+    shifts = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    payload = (data & 0x7F).astype(np.uint64) << (7 * shifts).astype(np.uint64)
+    return np.bitwise_or.reduceat(payload, starts)
+
+
+def encode_deltas(values):
+    """ signed integer stream -> varints of the zigzag mapped differences """
+    deltas = np.diff(np.asarray(values, dtype=np.int64), prepend=0)
+    return encode_varints(((deltas << 1) ^ (deltas >> 63)).view(np.uint64))
+
+
+def decode_deltas(data, count):
+    zigzag = decode_varints(data, count)
+    deltas = (zigzag >> np.uint64(1)).view(np.int64) ^ -(zigzag & np.uint64(1)).view(np.int64)
+    return np.cumsum(deltas)
+
+
+def normalization(positions):
+    """ center and scaling factor as in objReader.load_obj (calculate_center, scale) """
+    center = calculate_center(positions)
+    translated = translate_to_center(positions, center)
+    scaling_factor = float(np.max(np.abs(translated))) * 1.5 if len(translated) else 1.0
+    return center, scaling_factor
+
+
+def write_packed(file_path, positions, faces, normals=None, center=None, scaling_factor=None,
+                 bits=DEFAULT_BITS, compression='zlib', level=None, block_size=BLOCK_SIZE):
+    """
+    write positions (V, 3) in source coordinates, faces (F, 3) and optional
+    normals (V, 3) to file_path; returns the header
+    """
+    compress, _, default_level = COMPRESSORS[compression]
+    level = default_level if level is None else level
+    positions = np.asarray(positions, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if center is None:
+        center, scaling_factor = normalization(positions)
+
+    # Gitter über der Bounding-Box, Fehler höchstens eine halbe Stufe pro Achse
+    low = positions.min(axis=0) if len(positions) else np.zeros(3)
+    high = positions.max(axis=0) if len(positions) else np.zeros(3)
+    step = np.maximum(high - low, 1e-30) / (2 ** bits - 1)
+    quantized = np.round((positions - low) / step).astype(np.int64)
+
+    streams = [('positions', quantized, len(positions))]
+    if normals is not None and len(normals):
+        streams.append(('normals', encode_octahedral(normals).astype(np.int64), len(positions)))
+    streams.append(('faces', faces, len(faces)))
+
+    blocks, chunks, offset = [], [], 0
+    for stream, values, count in streams:
+        for first in range(0, count, block_size):
+            # Komponenten nacheinander (x x x ... y y y ...), jeder Block beginnt bei 0
+            block = values[first:first + block_size]
+            data = compress(encode_deltas(block.T.ravel() if stream != 'faces' else block.ravel()), level)
+            blocks.append({'stream': stream, 'first': first, 'count': len(block), 'offset': offset,
+                           'size': len(data)})
+            chunks.append(data)
+            offset += len(data)
+
+    header = {'version': FORMAT_VERSION, 'vertices': len(positions), 'faces': len(faces),
+              'normals': any(stream == 'normals' for stream, _, _ in streams), 'bits': bits,
+              'bounds': [low.tolist(), high.tolist()], 'center': [float(value) for value in center],
+              'scaling_factor': scaling_factor, 'compression': compression, 'blocks': blocks}
+    encoded_header = json.dumps(header).encode('utf-8')
+    # erst vollständig schreiben, dann umbenennen
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(encoded_header).to_bytes(4, 'little'))
+        file.write(encoded_header)
+        for data in chunks:
+            file.write(data)
+    os.replace(tmp_path, file_path)
+    return header
+
+
+class PackedMesh:
+    """
+        Header of a packed mesh file; the blocks are read and decoded only
+        when their stream is requested
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a packed mesh" % file_path)
+            length = int.from_bytes(file.read(4), 'little')
+            self.header = json.loads(file.read(length).decode('utf-8'))
+        if self.header['version'] != FORMAT_VERSION:
+            raise ValueError("%s: unsupported version %d" % (file_path, self.header['version']))
+        self.data_offset = len(MAGIC) + 4 + length
+        self.vertex_count = self.header['vertices']
+        self.face_count = self.header['faces']
+        self.has_normals = self.header['normals']
+        self.bounds = np.array(self.header['bounds'])
+        self.center = np.array(self.header['center'])
+        self.scaling_factor = self.header['scaling_factor']
+
+    def blocks(self, stream):
+        return [block for block in self.header['blocks'] if block['stream'] == stream]
+
+    def decode_block(self, block):
+        """ integer values of one block: (count, 3) grid positions, (count, 2) octahedral normals or faces """
+        with open(self.file_path, 'rb') as file:
+            file.seek(self.data_offset + block['offset'])
+            data = file.read(block['size'])
+        width = 2 if block['stream'] == 'normals' else 3
+        values = decode_deltas(COMPRESSORS[self.header['compression']][1](data), block['count'] * width)
+        if block['stream'] == 'faces':
+            return values.reshape(-1, 3)
+        return values.reshape(width, -1).T
+
+    def decode(self, stream, workers=1):
+        """ all blocks of a stream in order; zlib and lzma release the GIL, so threads decode in parallel """
+        blocks = self.blocks(stream)
+        width = 2 if stream == 'normals' else 3
+        if not blocks:
+            return np.zeros((0, width), dtype=np.int64)
+        if workers > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                parts = list(executor.map(self.decode_block, blocks))
+        else:
+            parts = [self.decode_block(block) for block in blocks]
+        return np.concatenate(parts)
+
+    def positions(self, normalized=True, workers=1):
+        """ float32 positions, normalized like load_obj or in source coordinates """
+        low, high = self.bounds
+        step = np.maximum(high - low, 1e-30) / (2 ** self.header['bits'] - 1)
+        offset = low
+        if normalized:
+            # Dequantisierung und Normalisierung in einem Schritt
+            step, offset = step / self.scaling_factor, (low - self.center) / self.scaling_factor
+        return (self.decode('positions', workers) * step + offset).astype(np.float32)
+
+    def normals(self, workers=1):
+        """ float32 unit normals or an empty (0, 3) array if the file has none """
+        if not self.has_normals:
+            return np.zeros((0, 3), dtype=np.float32)
+        return decode_octahedral(self.decode('normals', workers)).astype(np.float32)
+
+    def faces(self, workers=1):
+        return self.decode('faces', workers).astype(np.int32)
+
+
+def load_packed(self, file_path, workers=1):
+    """
+    counterpart of objReader.load_obj for packed files: normalized vertices,
+    faces, normals (empty if the file has none) and colors
+    """
+    with PROFILER.stage('load.decode'):
+        mesh = PackedMesh(file_path)
+        vertices = mesh.positions(workers=workers)
+        normals = mesh.normals(workers)
+        faces = mesh.faces(workers)
+    colors = np.tile(VERTEX_COLOR, (len(vertices), 1))
+    return vertices, faces, normals, colors
+
+
+def read_obj(file_path, optimize=True):
+    """
+    positions in source coordinates, faces, normals (or None) and the
+    normalization of an OBJ file, welded like load_obj; with optimize in
+    vertex cache order, which also makes the index deltas small
+    """
+    with open(file_path, 'rb') as file:
+        obj = parse_obj(file.read())
+    center, scaling_factor = normalization(obj.positions)
+    positions, faces, normals = obj.positions, obj.face_positions, None
+    if has_face_normals(obj):
+        welded = weld_vertices(obj._replace(face_texcoords=None))
+        positions, normals, faces = welded.vertices[:, 0:3], welded.vertices[:, 3:6], welded.faces
+    if optimize:
+        from vertexCache import optimize_mesh
+        positions, reordered, indices = optimize_mesh(positions, normals if normals is not None else [], faces)
+        normals = reordered if normals is not None else None
+        faces = indices.reshape(-1, 3)
+    return positions, faces, normals, center, scaling_factor
+
+
+def pack_obj(obj_path, packed_path=None, optimize=True, **options):
+    """ convert an OBJ file, options are passed to write_packed; returns the output path """
+    if packed_path is None:
+        packed_path = os.path.splitext(obj_path)[0] + PACKED_EXTENSION
+    positions, faces, normals, center, scaling_factor = read_obj(obj_path, optimize)
+    write_packed(packed_path, positions, faces, normals, center, scaling_factor, **options)
+    return packed_path
+
+
+def unpack_obj(packed_path, obj_path=None):
+    """ write a packed mesh as OBJ in source coordinates; returns the output path """
+    if obj_path is None:
+        obj_path = os.path.splitext(packed_path)[0] + '.unpacked.obj'
+    mesh = PackedMesh(packed_path)
+    faces = mesh.faces() + 1
+    with open(obj_path, 'w') as file:
+        file.write("# %s\n" % os.path.basename(packed_path))
+        np.savetxt(file, mesh.positions(normalized=False), fmt='v %.7g %.7g %.7g')
+        if mesh.has_normals:
+            np.savetxt(file, mesh.normals(), fmt='vn %.6f %.6f %.6f')
+            np.savetxt(file, np.repeat(faces, 2, axis=1), fmt='f %d//%d %d//%d %d//%d')
+        else:
+            np.savetxt(file, faces, fmt='f %d %d %d')
+    return obj_path
+
+
+def report(file_path, directory, bits=DEFAULT_BITS, compression='zlib', workers=1):
+    """ size, decode speed and round-trip error of one OBJ file packed into directory; True if within the bound """
+    packed_path = os.path.join(directory, os.path.splitext(os.path.basename(file_path))[0] + PACKED_EXTENSION)
+    start = time.perf_counter()
+    positions, faces, normals, center, scaling_factor = read_obj(file_path)
+    write_packed(packed_path, positions, faces, normals, center, scaling_factor, bits, compression)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_obj(None, file_path)
+    obj_time = time.perf_counter() - start
+    start = time.perf_counter()
+    vertices, decoded_faces, decoded_normals, _ = load_packed(None, packed_path, workers)
+    decode_time = time.perf_counter() - start
+    decoded_bytes = vertices.nbytes + decoded_faces.nbytes + decoded_normals.nbytes
+
+    # Fehler in den Einheiten des Viewers (nach der Normalisierung) gegen eine halbe Gitterstufe
+    expected = (np.asarray(positions, dtype=np.float64) - center) / scaling_factor
+    error = float(np.abs(vertices - expected).max()) if len(vertices) else 0.0
+    mesh = PackedMesh(packed_path)
+    bound = float((0.5 * (mesh.bounds[1] - mesh.bounds[0]) / (2 ** bits - 1)).max() / scaling_factor)
+    bound += float(np.finfo(np.float32).eps)        # Rundung auf float32
+    normal_error = angle_error(normals, decoded_normals) if normals is not None else 0.0
+    faces_ok = np.array_equal(decoded_faces, faces)
+    ok = error <= bound and faces_ok
+
+    obj_size, packed_size = os.path.getsize(file_path), os.path.getsize(packed_path)
+    print("%-18s %9.1f %9.1f %7.1fx %8.2f %9.1f %9.1f %9.1f %11.2e %9.4f %s" % (
+        os.path.basename(file_path), obj_size / 1024, packed_size / 1024, obj_size / packed_size, encode_time,
+        1000 * obj_time, 1000 * decode_time, decoded_bytes / decode_time / 1e6, error, normal_error,
+        'ok' if ok else 'FAILED'))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="convert between OBJ and the packed mesh format")
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help="OBJ -> %s" % PACKED_EXTENSION)
+    pack.add_argument('objectPath')
+    pack.add_argument('-o', '--output')
+    pack.add_argument('--bits', type=int, default=DEFAULT_BITS, choices=range(8, 25), metavar='8..24',
+                      help="bits per axis of the quantized positions")
+    pack.add_argument('--compression', choices=sorted(COMPRESSORS), default='zlib')
+    pack.add_argument('--level', type=int, help="compression level (default: zlib 9, lzma 6)")
+    pack.add_argument('--no-optimize', action='store_true',
+                      help="keep the file order instead of the vertex cache order")
+    unpack = commands.add_parser('unpack', help="%s -> OBJ" % PACKED_EXTENSION)
+    unpack.add_argument('packedPath')
+    unpack.add_argument('-o', '--output')
+    compare = commands.add_parser('report', help="compression ratio, decode speed and error per model")
+    compare.add_argument('models', nargs='*', help="OBJ files (default: all bundled models)")
+    compare.add_argument('--bits', type=int, default=DEFAULT_BITS, choices=range(8, 25), metavar='8..24')
+    compare.add_argument('--compression', choices=sorted(COMPRESSORS), default='zlib')
+    compare.add_argument('--workers', type=int, default=1, help="threads decoding the blocks")
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        start = time.perf_counter()
+        path = pack_obj(args.objectPath, args.output, optimize=not args.no_optimize, bits=args.bits,
+                        compression=args.compression, level=args.level)
+        print("%s: %.1f KB -> %.1f KB in %.2f s" % (path, os.path.getsize(args.objectPath) / 1024,
+                                                    os.path.getsize(path) / 1024, time.perf_counter() - start))
+    elif args.command == 'unpack':
+        print(unpack_obj(args.packedPath, args.output))
+    else:
+        models = args.models or sorted(glob.glob(os.path.join(MODELS_DIR, '*.obj')))
+        print("%-18s %9s %9s %8s %8s %9s %9s %9s %11s %9s" % (
+            "model", "OBJ KB", "packed KB", "ratio", "encode s", "OBJ ms", "decode ms", "MB/s", "pos. error",
+            "normal"))
+        with tempfile.TemporaryDirectory() as directory:
+            ok = all([report(path, directory, args.bits, args.compression, args.workers) for path in models])
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
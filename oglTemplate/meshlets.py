@@ -0,0 +1,286 @@
+"""
+Meshlets: small clusters of triangles that are culled on the CPU every frame.
+
+The index buffer (already in vertex cache order, see vertexCache.py) is cut
+into consecutive runs of at most 64 vertices and 124 triangles, so every
+meshlet is an index range and nothing has to be reordered. Each meshlet
+stores a bounding sphere and a cone containing its triangle normals. With
+the MVP matrix all meshlets are tested against the frustum planes and, if
+back faces are culled, against the view direction in a few numpy
+operations; the visible ranges are merged and drawn with glMultiDrawElements.
+
+    python meshlets.py model.obj [--views 50]   # culled fraction and culling time
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+MAX_VERTICES = 64
+MAX_TRIANGLES = 124
+
+# Cutoff für Kegel, die mehr als eine Halbkugel abdecken: nie als Rückseite verwerfen
+NO_CONE = 2.0
+
+
+class Meshlets:
+    """
+        Meshlets of all levels of detail as flat arrays. Meshlet i draws the
+        indices first[i]:first[i] + count[i] with base_vertex[i]; the
+        meshlets of level l are level_first[l]:level_first[l + 1].
+    """
+
+    def __init__(self, first, count, base_vertex, center, radius, cone_axis, cone_cutoff, level_first):
+        self.first = first
+        self.count = count
+        self.base_vertex = base_vertex
+        self.center = center
+        self.radius = radius
+        self.cone_axis = cone_axis
+        self.cone_cutoff = cone_cutoff
+        self.level_first = level_first
+
+    def __len__(self):
+        return len(self.first)
+
+    def level(self, level):
+        """ slice of the meshlets of one level of detail """
+        return slice(self.level_first[level], self.level_first[level + 1])
+
+
+def _ranges(starts, counts):
+    """ concatenation of arange(start, start + count) for all pairs """
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+
+def split_range(faces, max_vertices=MAX_VERTICES, max_triangles=MAX_TRIANGLES):
+    """ first triangle of every meshlet when the triangles (F, 3) are cut greedily in order """
+    starts = [0] if len(faces) else []
+    used = set()
+    size = 0
+    for index, triangle in enumerate(faces.tolist()):
+        new = len(set(triangle) - used)
+        if size == max_triangles or len(used) + new > max_vertices:
+            starts.append(index)
+            used = set()
+            size = 0
+        used.update(triangle)
+        size += 1
+    return np.array(starts, dtype=np.int64)
+
+
+def build_meshlets(vertices, indices, draws, max_vertices=MAX_VERTICES, max_triangles=MAX_TRIANGLES):
+    """
+    meshlets for the flat index buffer indices into vertices (V, 3);
+    draws[level] = [(first, count, base_vertex), ...] as in quantize.GpuMesh.
+    Meshlets never cross a draw range, so they keep its base vertex.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    indices = np.asarray(indices, dtype=np.int64).ravel()
+    first, count, base_vertex, level_first = [], [], [], [0]
+    for level in draws:
+        for start, length, base in level:
+            starts = split_range(indices[start:start + length].reshape(-1, 3), max_vertices, max_triangles)
+            first.append(start + 3 * starts)
+            count.append(3 * np.diff(np.append(starts, length // 3)))
+            base_vertex.append(np.full(len(starts), base, dtype=np.int32))
+        level_first.append(sum(len(part) for part in first))
+    first = np.concatenate(first) if first else np.zeros(0, np.int64)
+    count = np.concatenate(count) if count else np.zeros(0, np.int64)
+    base_vertex = np.concatenate(base_vertex) if base_vertex else np.zeros(0, np.int32)
+    if len(first) == 0:
+        return Meshlets(first, count, base_vertex, np.zeros((0, 3), np.float32), np.zeros(0, np.float32),
+                        np.zeros((0, 3), np.float32), np.zeros(0, np.float32),
+                        np.array(level_first, dtype=np.int64))
+
+    # alle Dreiecke der Meshlets liegen hintereinander: Reduktion pro Meshlet mit reduceat
+    triangle_starts = np.cumsum(count // 3) - count // 3
+    positions = _ranges(first, count)
+    corners = vertices[indices[positions]].reshape(-1, 3, 3)
+
+    # Bounding-Sphere: Mittelpunkt der Box, Radius bis zur entferntesten Ecke
+    low = np.minimum.reduceat(corners.min(axis=1), triangle_starts)
+    high = np.maximum.reduceat(corners.max(axis=1), triangle_starts)
+    center = (low + high) / 2.0
+    owner = np.repeat(np.arange(len(first)), count // 3)
+    distance = np.linalg.norm(corners - center[owner, None], axis=2).max(axis=1)
+    radius = np.maximum.reduceat(distance, triangle_starts)
+
+    # Normalenkegel: Achse = mittlere Dreiecksnormale, Öffnung = größter Winkel zur Achse
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    normals = normals / np.where(lengths > 0.0, lengths, 1.0)[:, None]
+    axis = np.add.reduceat(normals, triangle_starts)
+    axis_lengths = np.linalg.norm(axis, axis=1)
+    axis = axis / np.where(axis_lengths > 0.0, axis_lengths, 1.0)[:, None]
+    cosine = np.einsum('ij,ij->i', normals, axis[owner])
+    # degenerierte Dreiecke haben keine Richtung
+    cosine[lengths <= 0.0] = 1.0
+    min_cosine = np.minimum.reduceat(cosine, triangle_starts)
+    # alle Normalen innerhalb des Winkels a um die Achse: Rückseite, wenn cos(Sicht, Achse) >= sin(a)
+    cutoff = np.where((min_cosine > 0.0) & (axis_lengths > 0.0),
+                      np.sqrt(np.maximum(1.0 - min_cosine ** 2, 0.0)), NO_CONE)
+
+    return Meshlets(first, count, base_vertex, center.astype(np.float32), radius.astype(np.float32),
+                    axis.astype(np.float32), cutoff.astype(np.float32), np.array(level_first, dtype=np.int64))
+
+
+def frustum_planes(mvp):
+    """ the 6 clipping planes (a, b, c, d) of mvp in model coordinates, normalized (Gribb/Hartmann) """
+    mvp = np.asarray(mvp, dtype=np.float64)
+    planes = np.array([mvp[3] + mvp[0], mvp[3] - mvp[0], mvp[3] + mvp[1],
+                       mvp[3] - mvp[1], mvp[3] + mvp[2], mvp[3] - mvp[2]])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def cull(meshlets, mvp, selection=slice(None), backfaces=False):
+    """
+    visibility of meshlets[selection] for the model-view-projection matrix
+    mvp (model coordinates of the meshlets); with backfaces also meshlets
+    whose triangles all face away from the camera are dropped
+    """
+    center = meshlets.center[selection]
+    radius = meshlets.radius[selection]
+    # in float32 wie die Meshlet-Daten, das spart die Umwandlung der Arrays
+    planes = frustum_planes(mvp).astype(np.float32)
+    # Kugel liegt nicht vollständig außerhalb einer Ebene
+    distance = center @ planes[:, :3].T
+    distance += planes[:, 3]
+    distance += radius[:, None]
+    visible = np.all(distance >= 0.0, axis=1)
+
+    if backfaces:
+        axis = meshlets.cone_axis[selection]
+        cutoff = meshlets.cone_cutoff[selection]
+        # Kamera in Modellkoordinaten: Augpunkt (perspektivisch) oder Blickrichtung (w = 0, orthographisch)
+        eye = np.linalg.inv(np.asarray(mvp, dtype=np.float64)) @ np.array([0.0, 0.0, -1.0, 0.0])
+        if abs(eye[3]) > 1e-12:
+            view = center - (eye[:3] / eye[3]).astype(np.float32)
+            length = np.sqrt(np.einsum('ij,ij->i', view, view))
+            back = np.einsum('ij,ij->i', view, axis) >= cutoff * length + radius
+        else:
+            back = axis @ (-eye[:3] / np.linalg.norm(eye[:3])).astype(np.float32) >= cutoff
+        visible &= ~back
+    return visible
+
+
+def visible_ranges(meshlets, visible, selection=slice(None)):
+    """ (first, count, base_vertex) arrays of the visible meshlets, adjacent meshlets merged """
+    ids = np.flatnonzero(visible) + (selection.start or 0)
+    first, count, base = meshlets.first[ids], meshlets.count[ids], meshlets.base_vertex[ids]
+    if len(ids) == 0:
+        return first, count, base
+    # neuer Bereich, wo ein Meshlet nicht direkt an das vorherige anschließt
+    starts = np.flatnonzero(np.concatenate(([True], (first[1:] != first[:-1] + count[:-1]) |
+                                            (base[1:] != base[:-1]))))
+    return first[starts], np.add.reduceat(count, starts), base[starts]
+
+
+def gather_indices(indices, first, count):
+    """ index buffer with only the given ranges, for drawing without glMultiDrawElements """
+    return np.asarray(indices)[_ranges(first, count)]
+
+
+class CullStatistics:
+    """
+        Culled fraction and CPU time of the per-frame culling
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.meshlets = 0
+        self.culled = 0
+        self.seconds = 0.0
+
+    def add(self, meshlets, culled, seconds):
+        self.frames += 1
+        self.meshlets += meshlets
+        self.culled += culled
+        self.seconds += seconds
+
+    def culled_fraction(self):
+        return self.culled / self.meshlets if self.meshlets else 0.0
+
+    def summary(self):
+        if not self.frames:
+            return "keine Meshlets verworfen"
+        return "Meshlets verworfen: %.1f%%, Culling %.3f ms pro Frame (%d Frames)" % (
+            self.culled_fraction() * 100, self.seconds / self.frames * 1000, self.frames)
+
+
+def _view_matrices(views, seed=0):
+    """ model-view-projection matrices of random rotations and zoom levels of the viewer """
+    from camera import ViewState, model_view_projection
+    rng = np.random.default_rng(seed)
+    for view in range(views):
+        state = ViewState(rot_angle_x=rng.uniform(0, 360), rot_angle_y=rng.uniform(0, 360),
+                          fovy=(45.0, 20.0, 8.0)[view % 3], translation_x=rng.uniform(-0.3, 0.3),
+                          projection_type='perspective' if view % 4 else 'orthographic')
+        yield model_view_projection(state, 4 / 3)
+
+
+def _check_culled(meshlets, vertices, indices, mvp, visible, backfaces):
+    """ no triangle of a culled meshlet may be inside the frustum and facing the camera """
+    ids = np.flatnonzero(~visible)
+    if len(ids) == 0:
+        return True
+    corners = np.asarray(vertices, dtype=np.float64)[np.asarray(indices)[_ranges(meshlets.first[ids],
+                                                                                meshlets.count[ids])]]
+    corners = corners.reshape(-1, 3, 3)
+    homogeneous = np.concatenate((corners, np.ones(corners.shape[:2] + (1,))), axis=2) @ mvp.T
+    x, y, z, w = np.moveaxis(homogeneous, 2, 0)
+    # alle drei Ecken hinter derselben Ebene
+    outside = np.zeros(len(corners), dtype=bool)
+    for value in (x, -x, y, -y, z, -z):
+        outside |= np.all(value > w, axis=1)
+    if backfaces:
+        eye = np.linalg.inv(mvp) @ np.array([0.0, 0.0, -1.0, 0.0])
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        if abs(eye[3]) > 1e-12:
+            view = corners[:, 0] - eye[:3] / eye[3]
+        else:
+            view = np.broadcast_to(-eye[:3], normals.shape)
+        outside |= np.einsum('ij,ij->i', normals, view) >= -1e-9
+    return bool(np.all(outside))
+
+
+def report(file_path, views=50):
+    from objReader import load_mesh
+    vertices, _, indices = load_mesh(file_path, optimize=True)
+    start = time.perf_counter()
+    meshlets = build_meshlets(vertices, indices, [[(0, len(indices), 0)]])
+    elapsed = time.perf_counter() - start
+    triangles = meshlets.count / 3
+    print("%s: %d triangles in %d meshlets (%.1f triangles each), built in %.2f s" % (
+        os.path.basename(file_path), len(indices) // 3, len(meshlets), triangles.mean(), elapsed))
+    print("meshlets with a usable normal cone: %.1f%%" % (np.mean(meshlets.cone_cutoff < 1.0) * 100))
+
+    ok = True
+    print("%-18s %10s %12s" % ("", "culled", "us per cull"))
+    for backfaces, name in ((False, "frustum"), (True, "frustum + cones")):
+        culled, seconds = [], 0.0
+        for mvp in _view_matrices(views):
+            start = time.perf_counter()
+            visible = cull(meshlets, mvp, backfaces=backfaces)
+            visible_ranges(meshlets, visible)
+            seconds += time.perf_counter() - start
+            culled.append(1.0 - np.mean(visible))
+            ok &= _check_culled(meshlets, vertices, indices, mvp, visible, backfaces)
+        print("%-18s %9.1f%% %12.1f" % (name, np.mean(culled) * 100, seconds / views * 1e6))
+    print("culling conservative: %s" % ok)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="meshlet culling statistics over random views")
+    parser.add_argument('models', nargs='+')
+    parser.add_argument('--views', type=int, default=50)
+    args = parser.parse_args()
+    ok = all([report(path, args.views) for path in args.models])
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
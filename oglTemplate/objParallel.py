@@ -0,0 +1,141 @@
+"""
+Multi-process OBJ parsing by byte range.
+
+The file is split into byte ranges that end on line breaks. Every range is
+parsed in a worker process with objReader.parse_obj, and the resulting arrays
+are handed back through multiprocessing.shared_memory instead of pickling.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from objReader import ObjData, count_records, parse_obj
+
+# kleinere Dateien lohnen den Start der Prozesse nicht
+DEFAULT_MIN_PARALLEL_SIZE = 16 * 1024 * 1024    # 16 MB
+
+
+def load_obj_parallel(file_path, workers=None, min_size=DEFAULT_MIN_PARALLEL_SIZE):
+    """
+    Parse an OBJ file with 'workers' processes (default: number of CPUs) and
+    return the same ObjData as objReader.parse_obj. Files smaller than
+    min_size bytes, or workers=1, are parsed in the calling process.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(file_path)
+    if workers == 1 or size < min_size:
+        with open(file_path, 'rb') as file:
+            return parse_obj(file.read())
+
+    ranges = split_ranges(file_path, workers)
+
+    # Worker sollen ihre Shared-Memory-Blöcke beim Tracker dieses Prozesses anmelden,
+    # der sie nach dem unlink() hier wieder freigibt
+    resource_tracker.ensure_running()
+    memories = []       # Blöcke aller erfolgreich geparsten Bereiche
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # 1. Durchlauf: v/vt/vn-Sätze pro Bereich zählen -> Startindizes für negative Indizes
+            counts = list(executor.map(_count_records, [file_path] * len(ranges), *zip(*ranges)))
+            base_counts = np.cumsum([(0, 0, 0)] + counts[:-1], axis=0)
+
+            # 2. Durchlauf: Bereiche parsen, Ergebnisse liegen im Shared Memory
+            futures = [executor.submit(_parse_range, file_path, start, end, tuple(int(c) for c in base))
+                       for (start, end), base in zip(ranges, base_counts)]
+            parts = []
+            error = None
+            for future in futures:
+                try:
+                    parts.append(_attach(future.result(), memories))
+                except Exception as exception:
+                    # die übrigen Bereiche trotzdem abholen, damit auch ihre Blöcke freigegeben werden
+                    error = error or exception
+            if error is not None:
+                raise error
+        return _concatenate(parts)
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+def split_ranges(file_path, parts):
+    """ split the file into at most 'parts' byte ranges that end on a line break """
+    size = os.path.getsize(file_path)
+    bounds = [0]
+    with open(file_path, 'rb') as file:
+        for part in range(1, parts):
+            position = max(size * part // parts, bounds[-1])
+            file.seek(position)
+            # bis zum nächsten Zeilenumbruch weiterlesen
+            while True:
+                block = file.read(4096)
+                newline = block.find(b'\n')
+                if newline >= 0:
+                    position += newline + 1
+                    break
+                if not block:
+                    position = size
+                    break
+                position += len(block)
+            bounds.append(position)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _read_range(file_path, start, end):
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        return file.read(end - start)
+
+
+def _count_records(file_path, start, end):
+    """ number of v, vt and vn records in the byte range (indented records included, like parse_obj) """
+    return count_records(_read_range(file_path, start, end))
+
+
+def _parse_range(file_path, start, end, base_counts):
+    """ worker: parse a byte range and store the arrays in shared memory """
+    obj = parse_obj(_read_range(file_path, start, end), base_counts)
+    shared = []
+    for array in obj:
+        if array is None:
+            shared.append(None)
+            continue
+        memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[...] = array
+        shared.append((memory.name, array.shape, array.dtype.str))
+        memory.close()
+    return shared
+
+
+def _attach(shared, memories):
+    """ map the arrays of a worker from shared memory, the blocks are collected in memories """
+    arrays = []
+    for entry in shared:
+        if entry is None:
+            arrays.append(None)
+            continue
+        name, shape, dtype = entry
+        memory = shared_memory.SharedMemory(name=name)
+        memories.append(memory)
+        arrays.append(np.ndarray(shape, dtype=dtype, buffer=memory.buf))
+    return ObjData(*arrays)
+
+
+def _concatenate(parts):
+    """ join the parts in file order, faces without vt/vn indices get -1 """
+    def faces(field):
+        if all(getattr(part, field) is None for part in parts):
+            return None
+        return np.concatenate([getattr(part, field) if getattr(part, field) is not None
+                               else np.full(part.face_positions.shape, -1, dtype=np.int32)
+                               for part in parts])
+
+    return ObjData(np.concatenate([part.positions for part in parts]),
+                   np.concatenate([part.texcoords for part in parts]),
+                   np.concatenate([part.normals for part in parts]),
+                   np.concatenate([part.face_positions for part in parts]),
+                   faces('face_texcoords'), faces('face_normals'))
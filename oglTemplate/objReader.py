@@ -1,89 +1,454 @@
+from collections import namedtuple
+
 import numpy as np
 
+from profiler import PROFILER
+
+# Farbe, die jedem Vertex zugewiesen wird (3x cyan, wie bisher)
+VERTEX_COLOR = np.array([0.0, 1.0, 1.0,
+                         0.0, 1.0, 1.0,
+                         0.0, 1.0, 1.0], dtype=np.float32)
+
+# Gewichtungen für calculate_vertex_normals
+NORMAL_MODES = ('uniform', 'area', 'angle')
+
+# Satztypen einer OBJ-Datei, die ausgewertet werden
+_POSITION, _TEXCOORD, _NORMAL, _FACE = 1, 2, 3, 4
+
+ObjData = namedtuple('ObjData', ['positions', 'texcoords', 'normals',
+                                 'face_positions', 'face_texcoords', 'face_normals'])
+ObjData.__doc__ = """ raw content of an OBJ file, all face indices 0-based (-1 = not given) """
 
-def load_obj(self, file_path):
+WeldedMesh = namedtuple('WeldedMesh', ['vertices', 'faces', 'stride', 'stats'])
+WeldedMesh.__doc__ = """ interleaved vertex array (position, normal[, texcoord]) with remapped faces """
+
+
+def load_obj(self, file_path, workers=1):
     """
     Simple function to load an OBJ file and preprocess its vertices,
-    returning vertices, faces, and vertex normals.
-    """
-    vertices = []                           # Liste der Vertices
-    normals = []                            # Liste der Normalen
-    faces = []                              # Liste der Dreiecke
-
-    with open(file_path, 'r') as file:      # Datei im Lesemodus öffnen
-        colors = []
-
-        for line in file:
-            if line.startswith('#') or line in ['\n', '\r\n']:
-                continue
-            stripped_line = line.strip()
-            if stripped_line.startswith('v '):
-                vertex = list(map(float, stripped_line[2:].split()))
-                colors.append([0.0, 1.0, 1.0,
-                               0.0, 1.0, 1.0,
-                               0.0, 1.0, 1.0])
-                vertices.append(vertex)
-            elif stripped_line.startswith('f '):
-                face = stripped_line[2:].split()
-                face_indices = [int(index.split('/')[0]) - 1 for index in face]
-                faces.append(face_indices)
-            elif stripped_line.startswith('vn '):
-                normal = list(map(float, stripped_line[3:].split()))
-                normals.append(normal)
-
-    # Liste der Vertices in Numpy Array konvertieren
-    vertices = np.array(vertices, dtype=np.float32) # Standardtyp für Indizes in OpenGL
-
-    # Mittelpunkt der Vertices berechnen und skalieren
-    center = calculate_center(vertices)
+    returning vertices, faces, vertex normals and colors.
+    With workers != 1 large files are parsed by several processes.
+    """
+    with PROFILER.stage('load.parse'):
+        if workers != 1:
+            from objParallel import load_obj_parallel
+            obj = load_obj_parallel(file_path, workers)
+        else:
+            # ganze Datei auf einmal einlesen
+            with open(file_path, 'rb') as file:
+                obj = parse_obj(file.read())
+
+    with PROFILER.stage('load.center_scale'):
+        # Mittelpunkt der Vertices berechnen und skalieren
+        center = calculate_center(obj.positions)
+
+        # Vertices zum Mittelpunkt verschieben
+        vertices = translate_to_center(obj.positions, center)
+
+        # Vertices
+        vertices = scale(vertices).astype(np.float32)
+    faces = obj.face_positions
+    normals = np.zeros((0, 3), dtype=np.float32)
+
+    # getrennt indizierte Normalen: (Position, Normale)-Paare zu Vertices zusammenfassen
+    if has_face_normals(obj):
+        with PROFILER.stage('load.weld'):
+            welded = weld_vertices(obj._replace(positions=vertices, face_texcoords=None))
+        vertices = np.ascontiguousarray(welded.vertices[:, 0:3])
+        normals = np.ascontiguousarray(welded.vertices[:, 3:6])
+        faces = welded.faces
+
+    # eine Farbe (3x RGB) pro Vertex
+    colors = np.tile(VERTEX_COLOR, (len(vertices), 1))
 
-    # Vertices zum Mittelpunkt verschieben
-    vertices = translate_to_center(vertices, center)
+    return vertices, faces, normals, colors
 
-    # Vertices
-    vertices = scale(vertices)
 
-    # Vertex-Normalen berechnen
-    # normals = calculate_vertex_normals(vertices, faces)
+def load_mesh(file_path, normal_mode='uniform', workers=1, optimize=False, cleanup=False):
+    """
+    Load an OBJ file and return the GPU-ready arrays:
+    float32 vertices and normals and the flat int32 index buffer.
+    With cleanup close vertices are welded and degenerate, duplicate faces
+    and unused vertices removed (see meshCleanup.py); with optimize the
+    triangles and vertices are reordered for the vertex caches.
+    """
+    if file_path.endswith('.omesh'):
+        # gepacktes Format (siehe meshPack.py), Normalisierung steht schon in der Datei
+        from meshPack import load_packed
+        vertices, faces, normals, _ = load_packed(None, file_path, workers)
+    else:
+        vertices, faces, normals, _ = load_obj(None, file_path, workers)
+    if cleanup:
+        from meshCleanup import clean_mesh, format_report
+        with PROFILER.stage('load.cleanup'):
+            cleaned = clean_mesh(vertices, faces, normals=normals if len(normals) else None)
+        print("%s: %s" % (file_path, format_report(cleaned.stats)))
+        vertices, faces = cleaned.vertices, cleaned.faces
+        normals = cleaned.normals if cleaned.normals is not None else np.zeros((0, 3), dtype=np.float32)
+    if len(normals) == 0:
+        with PROFILER.stage('load.normals'):
+            normals = calculate_vertex_normals(vertices, faces, normal_mode)
+
+    normals = np.asarray(normals, dtype=np.float32)
+    with PROFILER.stage('load.flatten'):
+        indices = flatten_faces(faces)
+
+    if optimize:
+        from vertexCache import optimize_mesh
+        with PROFILER.stage('load.optimize'):
+            vertices, normals, indices = optimize_mesh(vertices, normals, indices)
+    return vertices, normals, indices
+
+
+def has_face_normals(obj):
+    """
+    whether every face corner has a normal index; otherwise (no 'vn' or
+    records without them in a mixed file) the vertex normals are computed
+    """
+    return obj.face_normals is not None and not np.any(obj.face_normals < 0)
 
-    # Faces als Array
-    faces = np.array(faces, dtype=np.int32)
 
-    return vertices, faces, normals, colors
+def flatten_faces(faces):
+    """ (F, 3) faces as flat int32 index buffer for glDrawElements """
+    return np.ascontiguousarray(faces, dtype=np.int32).ravel()
+
+
+def weld_vertices(obj):
+    """
+    Build one vertex per distinct (position, normal[, texcoord]) index combination
+    of the face corners. Returns a WeldedMesh with the interleaved float32 vertex
+    array, the remapped (F, 3) faces, the number of floats per vertex and a dict
+    of statistics (duplication ratio, bytes on the GPU).
+    """
+    corner_positions = obj.face_positions.ravel().astype(np.int64)
+    streams = [(obj.positions, corner_positions)]
+    for attributes, face_indices in ((obj.normals, obj.face_normals), (obj.texcoords, obj.face_texcoords)):
+        if face_indices is not None:
+            streams.append((attributes, face_indices.ravel().astype(np.int64)))
+
+    if all(indices is corner_positions or np.array_equal(indices, corner_positions) for _, indices in streams):
+        # alle Attribute gleich indiziert (z.B. "f 1//1 2//2 3//3") -> nur unbenutzte Positionen entfernen
+        used = np.zeros(len(obj.positions), dtype=bool)
+        used[corner_positions] = True
+        vertex_sources = np.flatnonzero(used)
+        inverse = (np.cumsum(used) - 1)[corner_positions]
+        vertex_indices = [vertex_sources for _ in streams]
+    else:
+        # Attribute mit gleichen Werten auf einen Index zusammenlegen
+        streams = [streams[0]] + [_merge_equal_attributes(attributes, indices) for attributes, indices in streams[1:]]
+
+        # Indizes aller Attribute in einen int64-Schlüssel packen (-1 = fehlt -> 0)
+        key_range = int(np.prod([len(attributes) + 1 for attributes, _ in streams], dtype=object))
+        if key_range < 2 ** 63:
+            keys = np.zeros(len(corner_positions), dtype=np.int64)
+            for attributes, indices in streams:
+                keys = keys * (len(attributes) + 1) + (indices + 1)
+            _, first_corner, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        else:
+            # zu viele Kombinationen für einen Schlüssel -> zeilenweise vergleichen
+            keys = np.stack([indices for _, indices in streams], axis=1)
+            _, first_corner, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        vertex_indices = [indices[first_corner] for _, indices in streams]
+
+    # kompaktes, verschachteltes Vertex-Array aufbauen
+    columns = []
+    for (attributes, _), indices in zip(streams, vertex_indices):
+        column = np.zeros((len(indices), attributes.shape[1]), dtype=np.float32)
+        given = indices >= 0
+        column[given] = attributes[indices[given]]
+        columns.append(column)
+    vertices = np.concatenate(columns, axis=1)
+    faces = inverse.reshape(-1, 3).astype(np.int32)
+
+    stride = vertices.shape[1]
+    used_positions = len(np.unique(corner_positions))
+    stats = {
+        'corners': len(corner_positions),
+        'positions': used_positions,
+        'vertices': len(vertices),
+        'duplication_ratio': len(vertices) / used_positions if used_positions else 1.0,
+        'vertex_bytes': vertices.nbytes,
+        'index_bytes': faces.nbytes,
+        'unindexed_bytes': len(corner_positions) * stride * 4,
+    }
+    return WeldedMesh(vertices, faces, stride, stats)
+
+
+def _merge_equal_attributes(attributes, indices):
+    """ map indices of attribute rows with identical values to one row """
+    unique_rows, row_map = np.unique(attributes, axis=0, return_inverse=True)
+    row_map = np.append(row_map.ravel(), -1)  # Index -1 (fehlt) bleibt -1
+    return unique_rows, row_map[indices]
+
+
+def parse_obj(data, base_counts=(0, 0, 0)):
+    """
+    Parse the content of an OBJ file (bytes). The records are grouped by
+    their prefix and every group is converted by NumPy in one block.
+    base_counts are the numbers of v/vt/vn records before data, needed
+    for negative indices when only a part of a file is parsed.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if len(buffer) == 0:
+        return _empty_obj()
+    kinds, line_starts, line_ends, record_starts = _record_kinds(buffer)
+
+    # Satztyp pro Byte, das Präfix ("v", "vt", "vn", "f") selbst wird ausgeblendet
+    byte_kinds = np.repeat(kinds, line_ends - line_starts)
+    byte_kinds[record_starts] = 0
+    byte_kinds[record_starts[kinds == _TEXCOORD] + 1] = 0
+    byte_kinds[record_starts[kinds == _NORMAL] + 1] = 0
+
+    def block(kind):
+        return buffer[byte_kinds == kind].tobytes()
+
+    positions = _parse_floats(block(_POSITION), np.count_nonzero(kinds == _POSITION), 3, 'v')
+    texcoords = _parse_floats(block(_TEXCOORD), np.count_nonzero(kinds == _TEXCOORD), 2, 'vt')
+    normals = _parse_floats(block(_NORMAL), np.count_nonzero(kinds == _NORMAL), 3, 'vn')
+
+    # Anzahl der vorher definierten v/vt/vn-Sätze für negative (relative) Indizes
+    face_lines = np.flatnonzero(kinds == _FACE)
+    preceding = [np.cumsum(kinds == kind)[face_lines] + base
+                 for kind, base in zip((_POSITION, _TEXCOORD, _NORMAL), base_counts)]
+    face_positions, face_texcoords, face_normals = _parse_faces(block(_FACE), preceding)
+
+    return ObjData(positions, texcoords, normals, face_positions, face_texcoords, face_normals)
+
+
+def count_records(data):
+    """ number of v, vt and vn records in data (bytes), counted like parse_obj """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if len(buffer) == 0:
+        return 0, 0, 0
+    kinds = _record_kinds(buffer)[0]
+    return tuple(int(np.count_nonzero(kinds == kind)) for kind in (_POSITION, _TEXCOORD, _NORMAL))
+
+
+def _record_kinds(buffer):
+    """
+    Record type of every line of a non-empty buffer, decided by the first
+    characters after the indentation. Returns kinds, line_starts, line_ends
+    and record_starts (index of the first non-blank byte of every line).
+    """
+    # Zeilenanfänge und -längen (inkl. Zeilenumbruch) bestimmen
+    line_ends = np.flatnonzero(buffer == ord('\n')) + 1
+    if len(line_ends) == 0 or line_ends[-1] != len(buffer):
+        line_ends = np.append(line_ends, len(buffer))
+    line_starts = np.concatenate(([0], line_ends[:-1]))
+
+    # Satzanfang: erstes Zeichen jeder Zeile, das kein Leerzeichen oder Tab ist (eingerückte Sätze),
+    # eine Runde pro Einrückungszeichen und nur für die noch eingerückten Zeilen
+    record_starts = line_starts.copy()
+    indented = np.arange(len(line_starts))
+    while len(indented):
+        starts = record_starts[indented]
+        blank_start = (buffer[starts] == ord(' ')) | (buffer[starts] == ord('\t'))
+        indented = indented[blank_start & (starts + 1 < line_ends[indented])]
+        record_starts[indented] += 1
+
+    # Satztyp anhand der ersten beiden Zeichen bestimmen
+    first = buffer[record_starts]
+    second = buffer[np.minimum(record_starts + 1, len(buffer) - 1)]
+    blank = (second == ord(' ')) | (second == ord('\t'))
+    kinds = np.zeros(len(line_starts), dtype=np.uint8)
+    kinds[(first == ord('v')) & blank] = _POSITION
+    kinds[(first == ord('v')) & (second == ord('t'))] = _TEXCOORD
+    kinds[(first == ord('v')) & (second == ord('n'))] = _NORMAL
+    kinds[(first == ord('f')) & blank] = _FACE
+    return kinds, line_starts, line_ends, record_starts
+
+
+def _empty_obj():
+    no_faces = np.zeros((0, 3), dtype=np.int32)
+    return ObjData(np.zeros((0, 3), dtype=np.float32), np.zeros((0, 2), dtype=np.float32),
+                   np.zeros((0, 3), dtype=np.float32), no_faces, None, None)
+
+
+def _parse_floats(text, count, width, prefix):
+    """ convert a block of 'count' records to a (count, width) float32 array """
+    values = np.fromstring(text, dtype=np.float64, sep=' ') if count else np.zeros(0)
+    if count and len(values) % count != 0:
+        raise ValueError("inconsistent number of values in '%s' records" % prefix)
+    columns = len(values) // count if count else width
+    if columns < width:
+        raise ValueError("'%s' records need at least %d values" % (prefix, width))
+    # zusätzliche Spalten (z.B. w oder Vertexfarben) werden ignoriert
+    return values.reshape(count, columns)[:, :width].astype(np.float32)
+
+
+def _parse_faces(text, preceding):
+    """
+    Convert the block of 'f' records ("a", "a/t", "a//n" or "a/t/n" per corner)
+    to 0-based (F, 3) index arrays. Polygons are split into triangle fans.
+    Records with different corner formats are parsed group by group, missing
+    texture or normal indices are -1.
+    """
+    count = len(preceding[0])
+    if count == 0:
+        return np.zeros((0, 3), dtype=np.int32), None, None
+
+    # Format der Ecken am ersten Eintrag erkennen
+    corner = text.split(None, 1)[0]
+    has_texcoord = b'/' in corner and b'//' not in corner
+    has_normal = corner.count(b'/') == 2
+
+    # alle Zeilen im selben Format: insgesamt passende Anzahl '/' und '//'
+    corners = _count_corners(text, count)
+    total = int(corners.sum())
+    if (text.count(b'/') == total * (2 if has_normal else int(has_texcoord))
+            and text.count(b'//') == total * int(has_normal and not has_texcoord)):
+        return _parse_face_group(text, preceding, corners, has_texcoord, has_normal)
+    return _parse_mixed_faces(text, preceding, corners)
+
+
+def _parse_face_group(text, preceding, corners, has_texcoord, has_normal):
+    """ _parse_faces for records that all have the same corner format """
+    count = len(corners)
+    components = 1 + has_texcoord + has_normal
+    text = text.replace(b'/', b' ')
+    values = np.fromstring(text, dtype=np.int64, sep=' ')
+    if len(values) != corners.sum() * components or np.any(_count_corners(text, count) != corners * components):
+        raise ValueError("inconsistent corner format in 'f' records")
+    values = values.reshape(-1, components)
+    if np.any(corners < 3):
+        raise ValueError("'f' records need at least 3 corners")
+
+    # Polygone als Dreiecksfächer (0, k, k+1) zerlegen
+    if np.all(corners == 3):
+        triangles = np.arange(len(values)).reshape(-1, 3)
+    else:
+        fans = corners - 2
+        first_corner = np.cumsum(corners) - corners
+        face_of_triangle = np.repeat(np.arange(count), fans)
+        k = np.arange(len(face_of_triangle)) - np.repeat(np.cumsum(fans) - fans, fans) + 1
+        base = first_corner[face_of_triangle]
+        triangles = np.stack((base, base + k, base + k + 1), axis=1)
+
+    def resolve(column, before):
+        indices = values[:, column] - 1
+        # negative Indizes zählen ab dem letzten vor der Fläche definierten Satz
+        negative = indices < -1
+        if np.any(negative):
+            indices[negative] += np.repeat(before, corners)[negative] + 1
+        return indices[triangles].astype(np.int32)
+
+    face_positions = resolve(0, preceding[0])
+    face_texcoords = resolve(1, preceding[1]) if has_texcoord else None
+    face_normals = resolve(components - 1, preceding[2]) if has_normal else None
+    return face_positions, face_texcoords, face_normals
+
+
+def _parse_mixed_faces(text, preceding, corners):
+    """ records in several corner formats: parse each format separately and merge in file order """
+    chars = np.frombuffer(text, dtype=np.uint8)
+    line_ends = np.flatnonzero(chars == ord('\n'))
+    if len(line_ends) < len(corners):
+        line_ends = np.append(line_ends, len(chars))
+    line_ends = line_ends[:len(corners)]
+    # Bytes pro Zeile mit Zeilenumbruch, die letzte Zeile kann ohne enden
+    line_lengths = np.diff(np.minimum(line_ends, len(chars) - 1), prepend=-1)
+
+    def per_line(mask):
+        return np.diff(np.searchsorted(np.flatnonzero(mask), line_ends), prepend=0)
+
+    slash = chars == ord('/')
+    slashes = per_line(slash)
+    double_slashes = per_line(np.append(slash[1:] & slash[:-1], False))
+    # Format pro Zeile: 0 = v, 1 = v/vt, 2 = v//vn, 3 = v/vt/vn
+    formats = np.full(len(corners), -1)
+    formats[slashes == 0] = 0
+    formats[(slashes == corners) & (double_slashes == 0)] = 1
+    formats[(slashes == 2 * corners) & (double_slashes == corners)] = 2
+    formats[(slashes == 2 * corners) & (double_slashes == 0)] = 3
+    if np.any(formats < 0):
+        raise ValueError("mixed corner formats within one 'f' record")
+
+    line_of_triangle = np.repeat(np.arange(len(corners)), np.maximum(corners - 2, 0))
+    results = [np.full((len(line_of_triangle), 3), -1, dtype=np.int32) for _ in range(3)]
+    given = [True, False, False]
+    for layout in np.unique(formats):
+        has_texcoord, has_normal = bool(layout & 1), layout >= 2
+        lines = formats == layout
+        group = _parse_face_group(chars[np.repeat(lines, line_lengths)].tobytes(),
+                                  [before[lines] for before in preceding], corners[lines],
+                                  has_texcoord, has_normal)
+        triangles = lines[line_of_triangle]
+        for field, indices in enumerate(group):
+            if indices is not None:
+                results[field][triangles] = indices
+                given[field] = True
+    return tuple(indices if present else None for indices, present in zip(results, given))
+
+
+def _count_corners(text, count):
+    """ number of whitespace separated values per line of a record block """
+    chars = np.frombuffer(text, dtype=np.uint8)
+    space = chars <= ord(' ')
+    token_starts = np.flatnonzero(~space[1:] & space[:-1]) + 1
+    if len(chars) and not space[0]:
+        token_starts = np.concatenate(([0], token_starts))
+    # Zeilenende jeder Zeile -> Anzahl der Werte davor
+    line_ends = np.flatnonzero(chars == ord('\n'))
+    if len(line_ends) < count:
+        line_ends = np.append(line_ends, len(chars))
+    return np.diff(np.searchsorted(token_starts, line_ends[:count]), prepend=0)
+
+
+def calculate_vertex_normals(vertices, faces, mode='uniform'):
+    """
+    calculate the normals of the vertices from the normals of the adjacent faces,
+    weighted equally ('uniform'), by face area ('area') or by corner angle ('angle')
+    """
+    if mode not in NORMAL_MODES:
+        raise ValueError("unknown normal mode '%s', expected one of %s" % (mode, ', '.join(NORMAL_MODES)))
+
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
 
+    # Eckpunkte aller Dreiecke auf einmal holen: (F, 3, 3)
+    corners = vertices[faces]
 
-def calculate_vertex_normals(vertices, faces):
-    """ calculate the normals of the vertices """
-    # np.zeros erstellt neues Array und initialisiert alle seine Elemente auf 0
-    normals = np.zeros((len(vertices), 3), dtype=np.float32)
+    # Kreuzprodukt der Kantenvektoren ergibt die Flächennormale (Länge = doppelte Fläche)
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(face_normals, axis=1, keepdims=True)
 
-    for face in faces:
-        # Indizes der drei Eckpunkte der Fläche
-        a_index, b_index, c_index = face
+    # entartete Dreiecke (Fläche 0) tragen nichts bei
+    valid = lengths[:, 0] > 0
+    unit_normals = np.zeros_like(face_normals)
+    unit_normals[valid] = face_normals[valid] / lengths[valid]
 
-        # Koordinaten der drei Eckpunkte holen
-        a = np.array(vertices[a_index])
-        b = np.array(vertices[b_index])
-        c = np.array(vertices[c_index])
+    if mode == 'uniform':
+        weights = np.broadcast_to(valid[:, None], faces.shape).astype(np.float64)
+    elif mode == 'area':
+        weights = np.broadcast_to(lengths, faces.shape)
+    else:
+        weights = _corner_angles(corners) * valid[:, None]
 
-        # zwei Vektoren entlang der Kanten der Fläche berechnen
-        vec1 = b - a
-        vec2 = c - a
+    # gewichtete Flächennormalen auf die Vertices aufsummieren
+    contributions = unit_normals[:, None, :] * weights[:, :, None]
+    flat_faces = faces.ravel()
+    normals = np.stack([np.bincount(flat_faces, contributions[:, :, axis].ravel(), minlength=len(vertices))
+                        for axis in range(3)], axis=1)
 
-        # Kreuzprodukt der beiden Vektoren, um Flächennormale zu erhalten
-        normal = np.cross(vec1, vec2)
-        # Normale normalisieren (Einheitsvektor)
-        normal /= np.linalg.norm(normal)
+    # alle Vertex-Normalen normalisieren, isolierte Vertices behalten (0, 0, 0)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
 
-        # berechnete Normale den Vertices hinzufügen
-        normals[a_index] += normal
-        normals[b_index] += normal
-        normals[c_index] += normal
+    return normals.astype(np.float32)
 
-    # alle Vertex-Normalen normalisieren
-    normals = np.array([normal / np.linalg.norm(normal) for normal in normals])
 
-    return normals
+def _corner_angles(corners):
+    """ interior angle at each corner of the triangles, shape (F, 3) """
+    angles = np.empty(corners.shape[:2])
+    for corner in range(3):
+        edge1 = corners[:, (corner + 1) % 3] - corners[:, corner]
+        edge2 = corners[:, (corner + 2) % 3] - corners[:, corner]
+        # atan2(|a x b|, a . b) ist auch für sehr spitze Winkel stabil
+        sine = np.linalg.norm(np.cross(edge1, edge2), axis=1)
+        cosine = np.einsum('ij,ij->i', edge1, edge2)
+        angles[:, corner] = np.arctan2(sine, cosine)
+    return angles
 
 
 def calculate_center(vertices):
@@ -91,7 +456,7 @@ def calculate_center(vertices):
     if len(vertices) == 0:
         return [0.0, 0.0, 0.0]
 
-    vertices = np.array(vertices)
+    vertices = np.asarray(vertices)
 
     # Mittelwert jeder Spalte (x, y, z) berechnen mit np.mean()
     center = np.mean(vertices, axis=0)
@@ -101,18 +466,18 @@ def calculate_center(vertices):
 
 def translate_to_center(vertices, center):
     """ is used to translate a 3D object so that it is located at the origin of the coordinate system (0, 0, 0) """
-    vertices = np.array(vertices)
-    center = np.array(center)
+    vertices = np.asarray(vertices)
+    center = np.asarray(center)
 
     # Vertices zum Mittelpunkt verschieben
     translated_vertices = vertices - center
 
-    return translated_vertices.tolist()
+    return translated_vertices
 
 
 def scale(vertices):
     """ Scale the vertices so that they are close to 1.0 """
-    vertices = np.array(vertices)
+    vertices = np.asarray(vertices)
 
     # maximalen absoluten Koordinatenwert zur Skalierung finden mit np.abs()
     # -> berechnet absoluten Wert eines Arrays, unabhängig vom Vorzeichen
@@ -124,4 +489,4 @@ def scale(vertices):
     # Vertices skalieren
     scaled_vertices = vertices / scaling_factor
 
-    return scaled_vertices.tolist()
+    return scaled_vertices
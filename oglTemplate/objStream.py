@@ -0,0 +1,126 @@
+"""
+Streaming OBJ loader with bounded memory.
+
+The file is read in fixed-size byte chunks that end on a line break. Each
+chunk is parsed with objReader.parse_obj and appended to growable NumPy
+arrays, so no Python lists of the whole mesh are ever built.
+"""
+import os
+
+import numpy as np
+
+from objReader import ObjData, parse_obj
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024    # 4 MB
+
+
+class GrowableArray:
+    """
+        2D array with a fixed number of columns that grows by doubling its
+        capacity, so appending n rows costs amortized O(n).
+    """
+
+    def __init__(self, columns, dtype, capacity=1024):
+        self._data = np.empty((max(capacity, 1), columns), dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def array(self):
+        """ view of the rows appended so far """
+        return self._data[:self._size]
+
+    def append(self, rows):
+        rows = np.asarray(rows).reshape(-1, self._data.shape[1])
+        needed = self._size + len(rows)
+        if needed > len(self._data):
+            capacity = len(self._data)
+            while capacity < needed:
+                capacity *= 2
+            data = np.empty((capacity, self._data.shape[1]), dtype=self._data.dtype)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size:needed] = rows
+        self._size = needed
+
+    def trim(self):
+        """ release the unused capacity and return the final array """
+        if len(self._data) != self._size:
+            self._data = self._data[:self._size].copy()
+        return self._data
+
+
+def iter_obj_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Yield the OBJ file as a sequence of ObjData chunks. Face indices refer to
+    the whole file (0-based), so chunks can be uploaded one after another.
+    progress(bytes_read, total_bytes) is called after every chunk.
+    """
+    total = os.path.getsize(file_path)
+    counts = [0, 0, 0]      # bisher gelesene v/vt/vn-Sätze
+    bytes_read = 0
+    rest = b''
+
+    with open(file_path, 'rb') as file:
+        while True:
+            block = file.read(chunk_size)
+            bytes_read += len(block)
+            data = rest + block
+            if block:
+                # nur vollständige Zeilen parsen, den Rest an den nächsten Block hängen
+                cut = data.rfind(b'\n') + 1
+                if cut == 0:
+                    rest = data
+                    continue
+                data, rest = data[:cut], data[cut:]
+            else:
+                rest = b''
+
+            if data:
+                chunk = parse_obj(data, tuple(counts))
+                counts[0] += len(chunk.positions)
+                counts[1] += len(chunk.texcoords)
+                counts[2] += len(chunk.normals)
+                yield chunk
+            if progress is not None:
+                progress(bytes_read, total)
+            if not block:
+                break
+
+
+def load_obj_streaming(file_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """ load the whole OBJ file chunk by chunk into one ObjData """
+    positions = GrowableArray(3, np.float32)
+    texcoords = GrowableArray(2, np.float32)
+    normals = GrowableArray(3, np.float32)
+    face_positions = GrowableArray(3, np.int32)
+    # Indizes für vt/vn werden erst angelegt, wenn eine Fläche sie verwendet
+    face_texcoords = face_normals = None
+
+    for chunk in iter_obj_chunks(file_path, chunk_size, progress):
+        faces_before = len(face_positions)
+        positions.append(chunk.positions)
+        texcoords.append(chunk.texcoords)
+        normals.append(chunk.normals)
+        face_positions.append(chunk.face_positions)
+        face_texcoords = _append_indices(face_texcoords, chunk.face_texcoords, faces_before, len(face_positions))
+        face_normals = _append_indices(face_normals, chunk.face_normals, faces_before, len(face_positions))
+
+    return ObjData(positions.trim(), texcoords.trim(), normals.trim(), face_positions.trim(),
+                   face_texcoords.trim() if face_texcoords is not None else None,
+                   face_normals.trim() if face_normals is not None else None)
+
+
+def _append_indices(target, indices, faces_before, faces_after):
+    """ append optional vt/vn indices, faces without them get -1 """
+    if indices is None and target is None:
+        return None
+    if target is None:
+        target = GrowableArray(3, np.int32, capacity=faces_after)
+        target.append(np.full((faces_before, 3), -1, dtype=np.int32))
+    if indices is None:
+        indices = np.full((faces_after - faces_before, 3), -1, dtype=np.int32)
+    target.append(indices)
+    return target
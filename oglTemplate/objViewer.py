@@ -23,24 +23,67 @@
  *          OpenGL 3.2 core profile context and animate a colored triangle.
  ****
 """
+import argparse
+import ctypes
 import sys
+import time
 
 import glfw
 from OpenGL.GL import *
 from OpenGL.GL.shaders import *
 
 from mat4 import *
-from objReader import load_obj, calculate_vertex_normals
+from camera import MatrixBuffers, pixels_per_unit, model_view_projection, pivot_offset_for
+from objReader import VERTEX_COLOR, NORMAL_MODES
+from meshCache import MeshCache, DEFAULT_CACHE_DIR, DEFAULT_SIZE_LIMIT
+from profiler import PROFILER
+from simplify import select_lod
+from asyncLoader import AsyncLoader, prepare_mesh, DEFAULT_WORKERS
+from bvh import pick as pick_triangle
+from meshlets import cull, visible_ranges, gather_indices, CullStatistics
+from shaderManager import ShaderManager, DEFAULT_CACHE_DIR as DEFAULT_SHADER_CACHE_DIR
+from glState import GLState
+from framePacing import FramePacer, Inertia, frame_budget, DEFAULT_REFRESH_RATE
 
 EXIT_FAILURE = -1
 
+# maximale Wartezeit auf Ereignisse, wenn nichts neu gezeichnet werden muss (Sekunden)
+IDLE_TIMEOUT = 0.5
+
+# erlaubter RMS-Fehler einer LOD-Stufe auf dem Bildschirm in Pixeln (siehe simplify.Lod); die
+# maximale Abweichung ist meist 2- bis 4-mal so groß, so bleibt sie bei etwa einem Pixel
+LOD_TOLERANCE = 0.3
+
+# Zeit pro Frame für das Hochladen eines im Hintergrund geladenen Modells (Sekunden)
+UPLOAD_BUDGET = 0.004
+# Größe der Stücke, in denen Buffer hochgeladen werden (Bytes)
+UPLOAD_CHUNK = 1024 * 1024
+
+# Drehgeschwindigkeit der Animation in Grad pro Sekunde (bisher 5 Grad pro Frame bei 60 Hz)
+ANIMATION_SPEED = 300.0
+
+# Meshlet-Culling pro Frame: aus, nur Sichtkörper, Sichtkörper und Rückseiten (mit GL_CULL_FACE)
+CULL_MODES = ('off', 'frustum', 'backface')
+
+# Shading-Modi, jeder mit eigenem Shader-Paar <Modus>.vert / <Modus>.frag, alle lesen denselben Vertex-Buffer
+SHADING_MODES = ('wireframe', 'flat', 'gouraud', 'phong')
+
 
 class Scene:
     """
         OpenGL scene class
     """
 
-    def __init__(self, width, height, objectPath, scenetitle="Computergrafik"):
+    # Zustand, dessen Änderung neue Matrizen bzw. ein neues Bild erfordert
+    PROJECTION_ATTRIBUTES = frozenset(('fovy', 'projection_type', 'width', 'height'))
+    MODEL_ATTRIBUTES = frozenset(('rot_angle_x', 'rot_angle_y', 'rot_angle_z',
+                                  'translation_x', 'rotation_alpha', 'rotation_v', 'pivot', 'pivot_offset'))
+    REDRAW_ATTRIBUTES = PROJECTION_ATTRIBUTES | MODEL_ATTRIBUTES | {'animate'}
+
+    def __init__(self, width, height, objectPath, scenetitle="Computergrafik", mesh_cache=None,
+                 normal_mode='uniform', lod=True, lod_tolerance=LOD_TOLERANCE, optimize=True, compact=False,
+                 async_loader=None, upload_budget=UPLOAD_BUDGET, picking=True, culling='frustum',
+                 shader_manager=None, gl_state=None, cleanup=False, shading='wireframe'):
         # Allgemeine Einstellungen
         self.scenetitle = scenetitle
         self.width = width
@@ -48,8 +91,50 @@ class Scene:
 
         # Objekt-spezifische Einstellungen
         self.objectPath = objectPath    # Pfad zur Objektdatei
+        self.mesh_cache = mesh_cache if mesh_cache is not None else MeshCache(enabled=False)
+        self.normal_mode = normal_mode  # Gewichtung der berechneten Vertex-Normalen
+        self.optimize = optimize        # Dreiecke und Vertices für die Vertex-Caches umsortieren
+        self.cleanup = cleanup          # Vertices verschweißen, entartete und doppelte Dreiecke entfernen
+        self.compact = compact          # int16-Positionen, 2_10_10_10-Normalen, uint16-Indizes
+        self.index_type = GL_UNSIGNED_INT
         self.indices = None             # Indizes der Dreiecke
         self.vertex_array = None        # Vertex-Array-Objekt
+        self.shader_manager = shader_manager    # lädt und cacht die Shader-Programme
+        self.shader = None                      # ShaderProgram (Programm und Uniform-Locations)
+        self.shaders = {}                       # Shading-Modus -> ShaderProgram
+        self.shading = shading                  # einer von SHADING_MODES
+        self.gl_state = gl_state if gl_state is not None else GLState()    # überspringt redundante GL-Aufrufe
+        self.mesh_buffers = []          # Buffer des aktuellen Modells
+
+        # Laden im Hintergrund (siehe asyncLoader.py), bis dahin wird ein Platzhalter gezeichnet
+        self.async_loader = async_loader
+        self.upload_budget = upload_budget      # Sekunden pro Frame für den Upload
+        self.loading = False                    # Modell wird geladen oder hochgeladen
+        self.upload = None                      # Generator des laufenden Uploads
+        self.placeholder = None                 # Vertex-Array der Bounding-Box
+        self.placeholder_count = 0
+
+        # Picking auf der Oberfläche (siehe bvh.py)
+        self.picking = picking                  # BVH beim Laden erzeugen
+        self.bvh = None
+        self.hover = False                      # Dreieck unter dem Mauszeiger im Fenstertitel anzeigen
+        self.hover_face = -1
+
+        # Meshlets (siehe meshlets.py), werden nur für culling != 'off' erzeugt
+        self.culling = culling
+        self.meshlets = None
+        self.quantize_matrix = np.identity(4)   # Inverse der Dequantisierung, für Meshlets in Modellkoordinaten
+        self.index_buffer = None                # Element-Buffer des Modells
+        self.stream_buffer = None               # Element-Buffer für zusammengesetzte Indizes
+        self.cull_statistics = CullStatistics()
+
+        # Detailstufen (LOD): alle Stufen liegen hintereinander im Index-Buffer
+        self.lod = lod                          # LODs erzeugen und pro Frame auswählen
+        self.lod_tolerance = lod_tolerance      # erlaubter RMS-Fehler in Pixeln
+        self.lod_ranges = []                    # (erster Index, Anzahl Indizes) pro Stufe
+        self.lod_draws = []                     # [(erster Index, Anzahl, Basis-Vertex), ...] pro Stufe
+        self.lod_errors = []                    # geschätzter Fehler pro Stufe (Modelleinheiten)
+        self.lod_level = 0                      # zuletzt gezeichnete Stufe
 
         # Kamera- und Blickrichtung
         self.fovy = 45.0                # Sichtfeld (field of view) in Grad
@@ -57,7 +142,7 @@ class Scene:
 
         # Animationseinstellungen
         self.angle_rotation_increment = 30       # Inkrement für die Rotationswinkel
-        self.angle_increment = 5                 # hier die Schnelligkeit der Rotation einstellen
+        self.rotation_speed = ANIMATION_SPEED    # hier die Schnelligkeit der Rotation einstellen (Grad/s)
         self.angle = 0
         self.rot_angle_x = 0                     # Rotationswinkel um die X-Achse
         self.rot_angle_y = 0                     # Rotationswinkel um die Y-Achse
@@ -71,73 +156,229 @@ class Scene:
         self.rotation_v = np.array([1, 1, 1])   # Rotationsachse für Mausrotation
         self.rotation_alpha = 0.0               # Rotationswinkel für Mausrotation
         self.first_click_done = False           # Flag, ob erster Klick erfolgt ist
+        self.inertia = Inertia()                # Nachdrehen nach dem Loslassen
+        self.pivot = np.zeros(3)                # Drehpunkt in Modellkoordinaten
+        self.pivot_offset = np.zeros(3)         # Ausgleich, damit das Modell beim Setzen des Drehpunkts bleibt
 
         # Projektionstyp (perspektivisch oder orthographisch)
         self.projection_type = 'perspective'    # Aktueller Projektionstyp
 
+        # vorab angelegte float32-Matrizen für die MVP-Berechnung pro Frame
+        self.matrix_buffers = MatrixBuffers()
+
+        # neu zeichnen bzw. Matrizen neu berechnen nur nach Änderungen (siehe __setattr__)
+        self.dirty = True
+        self.projection_valid = False
+        self.model_valid = False
+
+    def __setattr__(self, name, value):
+        # denselben Wert erneut zuweisen (z. B. bei gedrückter Maustaste ohne Bewegung) zeichnet nicht neu
+        redraw = name in Scene.REDRAW_ATTRIBUTES and not (name in self.__dict__
+                                                          and _same_value(self.__dict__[name], value))
+        object.__setattr__(self, name, value)
+        if redraw:
+            object.__setattr__(self, 'dirty', True)
+            if name in Scene.PROJECTION_ATTRIBUTES:
+                object.__setattr__(self, 'projection_valid', False)
+            elif name in Scene.MODEL_ATTRIBUTES:
+                object.__setattr__(self, 'model_valid', False)
+
     def init_GL(self):
+        self.set_culling(self.culling)
         # setup buffer (vertices, colors, normals, ...)
         self.gen_buffers()  # erzeugt und initialisiert die Pufferobjekte
-        # setup shader
-        glBindVertexArray(self.vertex_array)
-        vertex_shader = open("shader.vert", "r").read()
-        fragment_shader = open("shader.frag", "r").read()
-        # compileShader() liest und kompiliert die Shader und erstellt ein Shader-Programm
-        vertex_prog = compileShader(vertex_shader, GL_VERTEX_SHADER)
-        frag_prog = compileShader(fragment_shader, GL_FRAGMENT_SHADER)
-        self.shader_program = compileProgram(vertex_prog, frag_prog)
-
-        # unbind vertex array to bind it again in method draw
-        glBindVertexArray(0)
+        # setup shader: aus dem Programm-Cache oder kompiliert, Änderungen an den Dateien werden neu geladen
+        if self.shader_manager is None:
+            self.shader_manager = ShaderManager()
+        # alle Modi vorab laden, Umschalten tauscht dann nur das Programm
+        self.shaders = {mode: self.shader_manager.load(mode + ".vert", mode + ".frag") for mode in SHADING_MODES}
+        self.shader = self.shaders[self.shading]
+        # Flat-Shading: die Normale des ersten Vertex gilt für das ganze Dreieck
+        self.gl_state.glProvokingVertex(GL_FIRST_VERTEX_CONVENTION)
+
+    def poll_shaders(self):
+        """ reload changed shader files, redraw when a new program is active """
+        if self.shader_manager is not None and self.shader_manager.poll():
+            # neue Programm-Namen, gespeicherte Uniforms gelten nicht mehr
+            self.gl_state.invalidate()
+            self.dirty = True
 
     def gen_buffers(self):
-        vertices, faces, normals, colors = load_obj(self, self.objectPath)
-        if len(normals) == 0:
-            normals = calculate_vertex_normals(vertices, faces)
-
-        vertices = np.array(vertices, dtype=np.float32)
-        normals = np.array(normals, dtype=np.float32)
-
-        indices = []
-        for face in faces:
-            for idx in face:
-                indices.append(idx)
-
-        # generate vertex array object
-        self.vertex_array = glGenVertexArrays(1)
-        glBindVertexArray(self.vertex_array)
-
-        # Vertex positions
+        if self.async_loader is not None:
+            # Platzhalter zeichnen, bis das Modell im Hintergrund geladen und hochgeladen ist
+            self.request_model(self.objectPath)
+            return
+        prepared = prepare_mesh(self.objectPath, self.mesh_cache, self.normal_mode, self.optimize,
+                                self.lod, self.compact, self.picking, self.culling != 'off', self.cleanup)
+        for _ in self.upload_mesh(prepared):
+            pass
+
+    def request_model(self, objectPath):
+        """ load objectPath in the background (or right away without loader), replaces a running load """
+        self.objectPath = objectPath
+        if self.async_loader is None:
+            self.gen_buffers()
+            self.dirty = True
+            return
+        if self.upload is not None:
+            # halb hochgeladenes Modell verwerfen, close() gibt seine Buffer frei
+            self.upload.close()
+            self.upload = None
+        if self.placeholder is None:
+            self.gen_placeholder()
+        self.async_loader.submit('model', prepare_mesh, objectPath, self.mesh_cache, self.normal_mode,
+                                 self.optimize, self.lod, self.compact, self.picking, self.culling != 'off',
+                                 self.cleanup)
+        self.loading = True
+        # Platzhalter in Modellkoordinaten, ohne Dequantisierung
+        self.matrix_buffers.dequantize[0] = np.identity(4, dtype=np.float32)
+        self.model_valid = False
+        self.dirty = True
+
+    def gen_placeholder(self):
+        """ wireframe box around [-1/1.5, 1/1.5]^3, the bounds of every model after objReader.scale """
+        corners = (np.indices((2, 2, 2)).reshape(3, -1).T * 2.0 - 1.0) / 1.5
+        corners = np.ascontiguousarray(corners, dtype=np.float32)
+        # Kanten verbinden Ecken, die sich in genau einem Bit unterscheiden
+        edges = np.array([(corner, corner | bit) for corner in range(8) for bit in (1, 2, 4)
+                          if not corner & bit], dtype=np.uint32).ravel()
+
+        self.placeholder = glGenVertexArrays(1)
+        # über den State-Cache, damit er das gebundene Vertex-Array kennt
+        self.gl_state.glBindVertexArray(self.placeholder)
         pos_buffer = glGenBuffers(1)
         glBindBuffer(GL_ARRAY_BUFFER, pos_buffer)
-        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBufferData(GL_ARRAY_BUFFER, corners.nbytes, corners, GL_STATIC_DRAW)
         glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
         glEnableVertexAttribArray(0)
+        ind_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ind_buffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, edges.nbytes, edges, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.gl_state.glBindVertexArray(0)
+        self.placeholder_count = len(edges)
 
-        # Vertex normals
-        farben = np.array(colors, dtype=np.float32).flatten()  # nicht Listen in Listen sondern nur eine Liste insg.
-        norm_buffer = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, norm_buffer)
-        glBufferData(GL_ARRAY_BUFFER, farben.nbytes, farben, GL_STATIC_DRAW)
-        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 0, None)
-        glEnableVertexAttribArray(1)
+    def upload_buffer(self, stage, buffer, array):
+        """
+        generator: copies array into buffer in pieces of UPLOAD_CHUNK bytes and
+        yields after each piece; uses GL_COPY_WRITE_BUFFER, so no vertex array
+        has to be bound between two frames
+        """
+        data = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, buffer)
+        glBufferData(GL_COPY_WRITE_BUFFER, data.nbytes, None, GL_STATIC_DRAW)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+        PROFILER.add_bytes(stage, data.nbytes)
+        for offset in range(0, data.nbytes, UPLOAD_CHUNK):
+            chunk = data[offset:offset + UPLOAD_CHUNK]
+            glBindBuffer(GL_COPY_WRITE_BUFFER, buffer)
+            with PROFILER.stage(stage):
+                glBufferSubData(GL_COPY_WRITE_BUFFER, offset, chunk.nbytes, chunk)
+            glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+            yield
+
+    def upload_mesh(self, prepared):
+        """
+        generator: uploads a PreparedMesh (see asyncLoader) piece by piece and
+        replaces the current mesh once everything is on the GPU
+        """
+        mesh = prepared.gpu_mesh
+        uploads = [('upload.vertices', prepared.vertices), ('upload.indices', mesh.indices)]
+        buffers = [glGenBuffers(1) for _ in uploads]
+        try:
+            for (stage, array), buffer in zip(uploads, buffers):
+                yield from self.upload_buffer(stage, buffer, array)
+        except GeneratorExit:
+            # abgebrochen, bevor das Modell fertig war
+            glDeleteBuffers(len(buffers), buffers)
+            raise
+        vertex_buffer, ind_buffer = buffers
 
-        # Index buffer
-        # self.indices = np.array([0, 1, 2, 3, 0, 1], dtype=np.int32)
-        # self.indices = np.array(faces, dtype=np.int32)
-        # ind_buffer = glGenBuffers(1)
-        # glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ind_buffer)
-        # glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
+        # generate vertex array object
+        vertex_array = glGenVertexArrays(1)
+        self.gl_state.glBindVertexArray(vertex_array)
+
+        # Position und Normale liegen abwechselnd in einem Buffer (siehe quantize.interleave)
+        glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+        layout = prepared.vertices.dtype
+        stride = layout.itemsize
+        # int16 nicht normalisiert, 1/32767 steckt in der Dequantisierungsmatrix
+        glVertexAttribPointer(0, mesh.positions.shape[1], GL_SHORT if self.compact else GL_FLOAT, GL_FALSE, stride,
+                              ctypes.c_void_p(layout.fields['position'][1]))
+        glEnableVertexAttribArray(0)
+        normal_offset = ctypes.c_void_p(layout.fields['normal'][1])
+        if self.compact:
+            # 2_10_10_10 mit Vorzeichen, normalisiert auf [-1, 1]
+            glVertexAttribPointer(1, 4, GL_INT_2_10_10_10_REV, GL_TRUE, stride, normal_offset)
+        else:
+            glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, normal_offset)
+        glEnableVertexAttribArray(1)
 
         # Index buffer
-        self.indices = np.array(indices, dtype=np.int32)
-        ind_buffer = glGenBuffers(1)
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ind_buffer)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
 
         # unbind buffers to bind again in draw()
         glBindBuffer(GL_ARRAY_BUFFER, 0)
-        glBindVertexArray(0)
+        self.gl_state.glBindVertexArray(0)
+
+        # vorheriges Modell freigeben und ersetzen
+        self.release_buffers()
+        self.vertex_array = vertex_array
+        self.mesh_buffers = buffers
+        self.index_buffer = ind_buffer
+        self.indices = mesh.indices
+        self.index_type = GL_UNSIGNED_SHORT if self.indices.dtype == np.uint16 else GL_UNSIGNED_INT
+        self.lod_ranges = prepared.lod_ranges
+        self.lod_errors = prepared.lod_errors
+        self.lod_draws = mesh.draws
+        self.lod_level = 0
+        self.matrix_buffers.dequantize[0] = mesh.matrix
+        self.model_valid = False
+
+        self.meshlets = prepared.meshlets
+        self.quantize_matrix = np.linalg.inv(mesh.matrix.astype(np.float64))
+
+        # neues Modell dreht sich wieder um seinen Mittelpunkt
+        self.bvh = prepared.bvh
+        self.hover_face = -1
+        self.pivot = np.zeros(3)
+        self.pivot_offset = np.zeros(3)
+
+    def release_buffers(self):
+        """ delete the vertex array and buffers of the current mesh """
+        if self.vertex_array is not None:
+            self.gl_state.glDeleteVertexArrays(1, [self.vertex_array])
+            self.vertex_array = None
+        if self.mesh_buffers:
+            glDeleteBuffers(len(self.mesh_buffers), self.mesh_buffers)
+            self.mesh_buffers = []
+
+    def poll_loading(self):
+        """ take finished meshes from the loader and upload them for at most upload_budget seconds """
+        if self.upload is None:
+            for result in self.async_loader.poll():
+                if result.error is not None:
+                    print("Laden von %s fehlgeschlagen: %s" % (self.objectPath, result.error))
+                    self.loading = False
+                    if self.vertex_array is not None:
+                        # vorheriges Modell bleibt, wieder mit seiner Dequantisierung zeichnen
+                        self.matrix_buffers.dequantize[0] = np.linalg.inv(self.quantize_matrix)
+                        self.model_valid = False
+                else:
+                    self.upload = self.upload_mesh(result.value)
+        if self.upload is None:
+            return
+
+        # mindestens ein Stück pro Frame, dann bis das Zeitbudget aufgebraucht ist
+        deadline = time.perf_counter() + self.upload_budget
+        for _ in self.upload:
+            if time.perf_counter() >= deadline:
+                break
+        else:
+            self.upload = None
+            self.loading = False
+            print("%s geladen" % self.objectPath)
+        self.dirty = True
 
     def set_size(self, width, height):
         self.width = width
@@ -171,7 +412,6 @@ class Scene:
             dx = x - self.prev_mouse_pos
             self.translation_x += dx * 0.002
             self.prev_mouse_pos = x
-            self.draw()
 
             # Klausurrelevant
             # jeder 3D-Punkt hat eine 3D-Normale!
@@ -187,6 +427,7 @@ class Scene:
                 self.p1 = np.array([px, py, pz])
                 self.p1 /= np.linalg.norm(self.p1)
                 self.first_click_done = True
+                self.inertia.stop()
 
             else:  # Weitere Bewegungen nach dem ersten Klick
                 self.p2 = np.array([px, py, pz])
@@ -200,6 +441,7 @@ class Scene:
                     alpha = np.arccos(dot_product)
                     if not np.isnan(alpha):
                         self.rotation_alpha = alpha * 100
+                self.inertia.track(self.rotation_alpha)
                 self.p2 = np.array([px, py, pz])
 
         if glfw.get_mouse_button(win, glfw.MOUSE_BUTTON_LEFT) == glfw.RELEASE:
@@ -208,51 +450,179 @@ class Scene:
             self.p1 /= np.linalg.norm(self.p1)
             self.first_click_done = False
 
-    def draw(self):
-        # Buffer löschen (da werden die Informationen reingeladen)
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
+    def advance(self, dt):
+        """ move the animation and the arcball inertia dt seconds forward """
         if self.animate:
-            # increment rotation angle in each frame
-            self.rot_angle_x += self.angle_increment
-
-        # Perspektivische bzw orthographische Projektion einstellen
-        if self.projection_type == 'perspective':
-            projection = perspective(self.fovy, self.width / self.height, 1.0, 5.0)
+            self.rot_angle_x += self.rotation_speed * dt
+        if not self.first_click_done and self.inertia.active:
+            self.rotation_alpha += self.inertia.step(dt)
+
+    def pick(self, x, y):
+        """ Hit (see bvh.py) of the full mesh under the window position x, y or None """
+        if self.bvh is None:
+            return None
+        mvp = model_view_projection(self, self.width / self.height)
+        return pick_triangle(self.bvh, mvp, x, y, self.width, self.height)
+
+    def set_pivot(self, point):
+        """ rotate around point (model coordinates) from now on, without moving the model """
+        self.pivot_offset = pivot_offset_for(self, point)
+        self.pivot = np.asarray(point, dtype=np.float64)
+
+    def set_shading(self, mode):
+        """ one of SHADING_MODES; only the program changes, the buffers stay """
+        self.shading = mode
+        self.shader = self.shaders[mode]
+        self.dirty = True
+
+    def set_culling(self, mode):
+        """ one of CULL_MODES; back faces are also culled by OpenGL in mode 'backface' """
+        gl = self.gl_state
+        self.culling = mode
+        if mode == 'backface':
+            gl.glEnable(GL_CULL_FACE)
         else:
-            projection = ortho(-1.0, 1.0, -1.0, 1.0, -1.0, 5.0)
-
-        # View Matrix einstellen
-        view = look_at(0, 0, 2, 0, 0, 0, 0, 1, 0)
-
-        # Modell-Rotations-Transformationen
-        model_rotation_x_y_z = rotate_x(self.rot_angle_x) @ rotate_y(self.rot_angle_y) @ rotate_z(self.rot_angle_z)
-
-        # Modell Translation und Rotation basierend auf Mausbewegungen → Matrixmanipulation für die Rotation
-        model = translate(self.translation_x, 0, 0) @ rotate(self.rotation_alpha,
-                                                             self.rotation_v) @ model_rotation_x_y_z
-
-        # Model-View-Projection Matrix berechnen
-        mvp_matrix = projection @ view @ model
-
-        # enable shader & set uniforms
-        glUseProgram(self.shader_program)
-
-        # determine location of uniform variable varName
-        varLocation = glGetUniformLocation(self.shader_program, 'modelview_projection_matrix')
-        # pass value to shader
-        glUniformMatrix4fv(varLocation, 1, GL_TRUE, mvp_matrix)
-
-        # Vertex-Array binden und Linien zeichnen
-        glBindVertexArray(self.vertex_array)
-        # es gibt statt GL_TRIANGLES noch zusätzlich GL_LINE_STRIP (stand vorher drin) und GL_TRIANGLE_STRIP
-        glDrawElements(GL_TRIANGLES, len(self.indices), GL_UNSIGNED_INT, None)
-        glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)           # auskommentieren, wenn man die gefüllten Dreiecke erstellen will
-        # glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+            gl.glDisable(GL_CULL_FACE)
+        self.dirty = True
+
+    def draw_visible(self, level, mvp_matrix):
+        """ cull the meshlets of level with the current MVP matrix and draw the visible index ranges """
+        gl = self.gl_state
+        start = time.perf_counter()
+        with PROFILER.stage('frame.cull'):
+            selection = self.meshlets.level(level)
+            # Meshlets liegen in Modellkoordinaten, ohne Dequantisierung
+            visible = cull(self.meshlets, mvp_matrix @ self.quantize_matrix, selection, self.culling == 'backface')
+            first, count, base_vertex = visible_ranges(self.meshlets, visible, selection)
+        self.cull_statistics.add(len(visible), len(visible) - np.count_nonzero(visible),
+                                 time.perf_counter() - start)
+        if len(first) == 0:
+            return
+
+        if not bool(glMultiDrawElements):
+            self.draw_compacted(first, count, base_vertex)
+            return
+        # Array mit den Byte-Offsets der Bereiche als const void **
+        offsets = (first * self.indices.itemsize).astype(np.intp)
+        pointers = offsets.ctypes.data_as(ctypes.POINTER(ctypes.c_void_p))
+        count = count.astype(np.int32)
+        if np.any(base_vertex):
+            gl.glMultiDrawElementsBaseVertex(GL_TRIANGLES, count, self.index_type, pointers, len(count),
+                                          base_vertex.astype(np.int32))
+        else:
+            gl.glMultiDrawElements(GL_TRIANGLES, count, self.index_type, pointers, len(count))
+
+    def draw_compacted(self, first, count, base_vertex):
+        """ without glMultiDrawElements: copy the visible index ranges into a stream buffer and draw that """
+        gl = self.gl_state
+        indices = gather_indices(self.indices, first, count)
+        if self.stream_buffer is None:
+            self.stream_buffer = gl.glGenBuffers(1)
+        # Element-Buffer des VAO vorübergehend austauschen
+        gl.glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.stream_buffer)
+        gl.glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STREAM_DRAW)
+
+        # ein Aufruf pro Teilnetz, die Bereiche sind nach Basis-Vertex geordnet
+        groups = np.flatnonzero(np.diff(base_vertex, prepend=-1))
+        ends = np.append(groups[1:], len(base_vertex))
+        starts = np.cumsum(count) - count
+        for group, end in zip(groups, ends):
+            offset = ctypes.c_void_p(int(starts[group]) * indices.itemsize)
+            total = int(count[group:end].sum())
+            if base_vertex[group]:
+                gl.glDrawElementsBaseVertex(GL_TRIANGLES, total, self.index_type, offset, int(base_vertex[group]))
+            else:
+                gl.glDrawElements(GL_TRIANGLES, total, self.index_type, offset)
+        gl.glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+
+    def update_matrices(self):
+        """ MVP matrix of the current state, projection and model are only rebuilt after changes """
+        if not self.projection_valid:
+            self.matrix_buffers.update_projection(self, self.width / self.height)
+            self.projection_valid = True
+        if not self.model_valid:
+            self.matrix_buffers.update_model(self)
+            self.model_valid = True
+        return self.matrix_buffers.combine()
 
-        # unbind the shader and vertex array state
-        glUseProgram(0)
-        glBindVertexArray(0)
+    def draw(self):
+        gl = self.gl_state
+        # Buffer löschen (da werden die Informationen reingeladen)
+        gl.glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        if self.loading:
+            with PROFILER.stage('frame.upload'):
+                self.poll_loading()
+
+        # Model-View-Projection Matrix berechnen (Projektion, Kamera, Modell-Transformationen)
+        with PROFILER.stage('frame.matrices'):
+            mvp_matrix = self.update_matrices()
+
+        # Platzhalter beim Laden und wenn noch kein Modell hochgeladen ist (erstes Laden fehlgeschlagen)
+        placeholder = self.loading or self.vertex_array is None
+
+        with PROFILER.stage('frame.uniforms'):
+            # enable shader & set uniforms, unveränderte Werte erreichen den Treiber nicht;
+            # der Platzhalter hat keine Normalen und wird immer als Drahtgitter gezeichnet
+            shader = self.shaders['wireframe'] if placeholder else self.shader
+            gl.set_uniforms(shader, {'modelview_projection_matrix': mvp_matrix,
+                                     'modelview_matrix': self.matrix_buffers.modelview[0],
+                                     'normal_matrix': self.matrix_buffers.normal[0],
+                                     # gleiche Farbe für alle Vertices, ohne Buffer
+                                     'base_color': VERTEX_COLOR[:3]})
+
+        if placeholder:
+            # Bounding-Box, bis das Modell auf der GPU ist
+            with PROFILER.stage('frame.draw'):
+                gl.glBindVertexArray(self.placeholder)
+                gl.glDrawElements(GL_LINES, self.placeholder_count, GL_UNSIGNED_INT, None)
+            self.end_frame()
+            return
+
+        with PROFILER.stage('frame.draw'):
+            # gröbste Detailstufe, deren Fehler auf dem Bildschirm unter der Toleranz bleibt
+            level = select_lod(self.lod_errors, pixels_per_unit(self, self.height), self.lod_tolerance)
+            if level != self.lod_level:
+                print("LOD %d: %d Dreiecke" % (level, self.lod_ranges[level][1] // 3))
+                self.lod_level = level
+
+            # Vertex-Array binden, Linien nur im Drahtgitter-Modus
+            gl.glPolygonMode(GL_FRONT_AND_BACK, GL_LINE if self.shading == 'wireframe' else GL_FILL)
+            gl.glBindVertexArray(self.vertex_array)
+            # es gibt statt GL_TRIANGLES noch zusätzlich GL_LINE_STRIP (stand vorher drin) und GL_TRIANGLE_STRIP
+            # Teilnetze mit mehr als 65536 Vertices bei uint16-Indizes über den Basis-Vertex
+            if self.meshlets is not None and self.culling != 'off':
+                # nur die sichtbaren Meshlets
+                self.draw_visible(level, mvp_matrix)
+            else:
+                for first, count, base_vertex in self.lod_draws[level]:
+                    offset = ctypes.c_void_p(first * self.indices.itemsize)
+                    if base_vertex:
+                        gl.glDrawElementsBaseVertex(GL_TRIANGLES, count, self.index_type, offset, base_vertex)
+                    else:
+                        gl.glDrawElements(GL_TRIANGLES, count, self.index_type, offset)
+
+        self.end_frame()
+
+    def end_frame(self):
+        """ count the GL calls of the frame, the picture is up to date now """
+        gl = self.gl_state
+        if not gl.enabled:
+            # unbind the shader and vertex array state; mit State-Cache bleiben sie für den nächsten Frame gebunden
+            gl.glUseProgram(0)
+            gl.glBindVertexArray(0)
+        gl.end_frame()
+
+        # Bild entspricht jetzt dem aktuellen Zustand
+        self.dirty = False
+
+
+def _same_value(previous, value):
+    """ whether an attribute keeps its value, arrays are compared element-wise """
+    if isinstance(previous, np.ndarray) or isinstance(value, np.ndarray):
+        # dasselbe Array-Objekt kann an Ort und Stelle geändert worden sein (+=)
+        return previous is not value and np.array_equal(previous, value)
+    return type(previous) is type(value) and bool(previous == value)
 
 
 def switch_projection_type():
@@ -282,7 +652,7 @@ class RenderWindow:
         GLFW Rendering window class
     """
 
-    def __init__(self, scene):
+    def __init__(self, scene, on_demand=True, profile_interval=0, swap_interval=1, fps_cap=0, budget=None):
         # initialize GLFW
         if not glfw.init():
             sys.exit(EXIT_FAILURE)
@@ -304,6 +674,15 @@ class RenderWindow:
         # Make the window's context current
         glfw.make_context_current(self.window)
 
+        # 1 = auf den Bildaufbau des Monitors warten (vsync), 0 = sofort tauschen
+        glfw.swap_interval(swap_interval)
+        if budget is None:
+            mode = glfw.get_video_mode(glfw.get_primary_monitor())
+            refresh_rate = mode.refresh_rate if mode and mode.refresh_rate else DEFAULT_REFRESH_RATE
+            budget = frame_budget(refresh_rate, swap_interval, fps_cap)
+        # Zeitschritt pro Frame, FPS-Begrenzung und Prüfung des Frame-Budgets
+        self.pacer = FramePacer(fps_cap, budget)
+
         # initialize GL
         self.init_GL()
 
@@ -311,6 +690,9 @@ class RenderWindow:
         glfw.set_mouse_button_callback(self.window, self.on_mouse_button)
         glfw.set_key_callback(self.window, self.on_keyboard)
         glfw.set_window_size_callback(self.window, self.on_size)
+        glfw.set_window_refresh_callback(self.window, self.on_refresh)
+        glfw.set_drop_callback(self.window, self.on_drop)
+        glfw.set_cursor_pos_callback(self.window, self.on_cursor)
 
         # set scroll callback
         glfw.set_scroll_callback(self.window, self.on_mouse_scroll)
@@ -326,6 +708,14 @@ class RenderWindow:
         # exit flag
         self.exitNow = False
 
+        # nur neu zeichnen, wenn sich die Szene geändert hat oder animiert wird
+        self.on_demand = on_demand
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+
+        # Abstand der Profiling-Ausgaben auf der Konsole in Sekunden (0 = aus)
+        self.profile_interval = profile_interval
+
     def init_GL(self):
         # debug: print GL and GLS version
         # print('Vendor       : %s' % glGetString(GL_VENDOR))
@@ -343,13 +733,11 @@ class RenderWindow:
         """ Zoom in """
         if self.scene.fovy - zoomFactor > 0:
             self.scene.fovy -= zoomFactor
-        self.scene.draw()
 
     def enlarge_field_of_vision(self, zoomFactor):
         """ Zoom out """
         if self.scene.fovy < 180:
             self.scene.fovy += zoomFactor
-            self.scene.draw()
         else:
             print("Verhindern, dass das Objekt gespiegelt und wieder größer wird")
 
@@ -374,6 +762,18 @@ class RenderWindow:
             # elif button == glfw.MOUSE_BUTTON_MIDDLE and action == glfw.RELEASE:
             #     self.scene.prev_mouse_pos = None
 
+        if button == glfw.MOUSE_BUTTON_MIDDLE and action == glfw.PRESS:
+            # Dreieck unter dem Mauszeiger anzeigen und als Drehpunkt setzen
+            x, y = glfw.get_cursor_pos(win)
+            hit = self.scene.pick(x, y)
+            if hit is None:
+                print("kein Dreieck getroffen")
+            else:
+                vertex = self.scene.bvh.vertices[hit.vertex]
+                print("Dreieck %d, Punkt (%.4f, %.4f, %.4f), Abstand %.4f, nächster Vertex %d (%.4f, %.4f, %.4f)" % (
+                    hit.face, *hit.point, hit.distance, hit.vertex, *vertex))
+                self.scene.set_pivot(hit.point)
+
     def on_keyboard(self, win, key, scancode, action, mods):
         print("keyboard: ", win, key, scancode, action, mods)
         if action == glfw.PRESS:
@@ -385,20 +785,39 @@ class RenderWindow:
             if key == glfw.KEY_P:
                 switch_projection_type()
             if key == glfw.KEY_S:
-                # TODO:
-                print("toggle shading: wireframe, grouraud, phong")
+                if not self.scene.shaders:
+                    print("keine Shading-Modi in dieser Szene")
+                else:
+                    mode = SHADING_MODES[(SHADING_MODES.index(self.scene.shading) + 1) % len(SHADING_MODES)]
+                    self.scene.set_shading(mode)
+                    print("Shading: %s" % mode)
             if key == glfw.KEY_X:
                 self.scene.rot_angle_x += self.scene.angle_rotation_increment
-                self.scene.draw()
                 print("Rotiere um die x-Achse")
             if key == glfw.KEY_Y:
                 self.scene.rot_angle_y += self.scene.angle_rotation_increment
-                self.scene.draw()
                 print("Rotiere um die y-Achse")
             if key == glfw.KEY_Z:
                 self.scene.rot_angle_z += self.scene.angle_rotation_increment
-                self.scene.draw()
                 print("Rotiere um die Z-Achse")
+            if key == glfw.KEY_C:
+                if self.scene.meshlets is None:
+                    print("keine Meshlets, Viewer mit --culling frustum oder backface starten")
+                else:
+                    # Statistik des bisherigen Modus ausgeben und neu beginnen
+                    print(self.scene.cull_statistics.summary())
+                    self.scene.cull_statistics = CullStatistics()
+                    mode = CULL_MODES[(CULL_MODES.index(self.scene.culling) + 1) % len(CULL_MODES)]
+                    self.scene.set_culling(mode)
+                    print("Culling: %s" % mode)
+            if key == glfw.KEY_G:
+                # Zählung des bisherigen Modus ausgeben und mit dem anderen neu beginnen
+                print(self.scene.gl_state.summary())
+                self.scene.gl_state.set_enabled(not self.scene.gl_state.enabled)
+                self.scene.dirty = True
+            if key == glfw.KEY_H:
+                self.scene.hover = not self.scene.hover
+                print("Dreieck unter dem Mauszeiger anzeigen: %s" % self.scene.hover)
             if key == glfw.KEY_I:
                 self.reduce_field_of_vision(5)
             if key == glfw.KEY_O:
@@ -407,23 +826,76 @@ class RenderWindow:
     def on_size(self, win, width, height):
         self.scene.set_size(width, height)
 
+    def on_cursor(self, win, x, y):
+        if not self.scene.hover:
+            return
+        hit = self.scene.pick(x, y)
+        face = hit.face if hit is not None else -1
+        if face != self.scene.hover_face:
+            self.scene.hover_face = face
+            title = self.scene.scenetitle if face < 0 else "%s - Dreieck %d" % (self.scene.scenetitle, face)
+            glfw.set_window_title(win, title)
+
+    def on_refresh(self, win):
+        # Fensterinhalt wurde verdeckt oder beschädigt
+        self.scene.dirty = True
+
+    def on_drop(self, win, paths):
+        # auf das Fenster gezogene Datei laden, ein noch laufender Ladevorgang wird abgebrochen
+        print("lade %s" % paths[0])
+        self.scene.request_model(paths[0])
+
+    def needs_redraw(self):
+        # während neue Shader kompiliert werden weiterzeichnen, bis sie übernommen sind
+        if self.scene.shader_manager is not None and self.scene.shader_manager.pending():
+            return True
+        # während des Ladens jeden Durchlauf zeichnen, damit Ergebnisse abgeholt werden
+        return (not self.on_demand or self.scene.dirty or self.scene.animate or self.scene.loading
+                or self.scene.inertia.active)
+
     def run(self):
         while not glfw.window_should_close(self.window) and not self.exitNow:
-            # poll for and process events
-            glfw.poll_events()
-
-            # setup viewport
-            width, height = glfw.get_framebuffer_size(self.window)
-            glViewport(0, 0, width, height)
+            # poll for and process events, im Leerlauf auf Ereignisse warten statt zu pollen
+            if self.needs_redraw():
+                glfw.poll_events()
+            else:
+                glfw.wait_events_timeout(IDLE_TIMEOUT)
 
             # Update the scene based on mouse movement
             self.scene.update_scene(self.window)
+            self.scene.poll_shaders()
+            PROFILER.report(self.profile_interval)
+
+            if not self.needs_redraw():
+                self.frames_skipped += 1
+                # die Pause zählt nicht als Zeitschritt oder verpasster Frame
+                self.pacer.idle()
+                continue
+            frame_start = time.perf_counter()
+
+            # Animation und Nachdrehen um die vergangene Zeit weiterbewegen
+            self.scene.advance(self.pacer.begin_frame())
+
+            # setup viewport
+            width, height = glfw.get_framebuffer_size(self.window)
+            self.scene.gl_state.glViewport(0, 0, width, height)
 
             # call the rendering function
             self.scene.draw()
+            self.frames_drawn += 1
 
             # swap front and back buffer
-            glfw.swap_buffers(self.window)
+            with PROFILER.stage('frame.swap'):
+                glfw.swap_buffers(self.window)
+            PROFILER.frame_done(time.perf_counter() - frame_start)
+
+            # Budget prüfen, mit --fps-cap bis zum nächsten Frame warten
+            self.pacer.end_frame()
+
+        print("Frames gezeichnet: %d, übersprungen: %d" % (self.frames_drawn, self.frames_skipped))
+        print(self.scene.cull_statistics.summary())
+        print(self.scene.gl_state.summary())
+        print(self.pacer.budget.summary())
 
         # end
         glfw.terminate()
@@ -433,22 +905,107 @@ class RenderWindow:
 
 # TODO PROGRAMM IN KONSOLE AUSFÜHREN:
 # cd CG -> cd oglTemplate -> python3 objViewer.py ../models/squirrel.obj
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Simple OBJ viewer")
+    parser.add_argument('objectPath', nargs='?', help="path to the OBJ file")
+    parser.add_argument('--no-cache', action='store_true', help="bypass the binary mesh cache")
+    parser.add_argument('--clear-cache', action='store_true', help="remove all cached meshes")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="directory of the mesh cache")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_SIZE_LIMIT // (1024 * 1024),
+                        help="size limit of the mesh cache in MB")
+    parser.add_argument('--continuous', action='store_true',
+                        help="redraw every loop iteration instead of only after changes")
+    parser.add_argument('--profile', action='store_true', help="time loading stages and frames")
+    parser.add_argument('--profile-out', metavar='FILE',
+                        help="write the profiling results to FILE (.json or .csv), implies --profile")
+    parser.add_argument('--profile-interval', type=float, default=0, metavar='SECONDS',
+                        help="print a profiling summary every SECONDS seconds")
+    parser.add_argument('--normals', choices=NORMAL_MODES, default='uniform',
+                        help="weighting of computed vertex normals")
+    parser.add_argument('--no-optimize', action='store_true',
+                        help="upload the triangles in file order instead of reordering them for the vertex cache")
+    parser.add_argument('--cleanup', action='store_true',
+                        help="weld close vertices, drop degenerate and duplicate triangles (see meshCleanup.py)")
+    parser.add_argument('--compact', action='store_true',
+                        help="upload int16 positions, 2_10_10_10 normals and uint16 indices (see quantize.py)")
+    parser.add_argument('--no-lod', action='store_true', help="always draw the full mesh")
+    parser.add_argument('--lod-tolerance', type=float, default=LOD_TOLERANCE, metavar='PIXELS',
+                        help="allowed screen-space RMS error of a level of detail")
+    parser.add_argument('--no-picking', action='store_true',
+                        help="do not build the BVH for picking with the middle mouse button")
+    parser.add_argument('--culling', choices=CULL_MODES, default='frustum',
+                        help="per-frame meshlet culling (backface also enables GL_CULL_FACE)")
+    parser.add_argument('--no-shader-cache', action='store_true', help="always compile the shaders")
+    parser.add_argument('--shader-cache-dir', default=DEFAULT_SHADER_CACHE_DIR,
+                        help="directory of the shader program binaries")
+    parser.add_argument('--shading', choices=SHADING_MODES, default='wireframe',
+                        help="initial shading mode, the S key switches between them")
+    parser.add_argument('--no-shader-reload', action='store_true',
+                        help="do not recompile the shader files when they change")
+    parser.add_argument('--no-state-cache', action='store_true',
+                        help="issue every GL state call instead of skipping redundant ones (see glState.py)")
+    parser.add_argument('--swap-interval', type=int, default=1,
+                        help="screen refreshes per buffer swap (1 = vsync, 0 = swap immediately)")
+    parser.add_argument('--fps-cap', type=float, default=0, metavar='FPS',
+                        help="limit the frame rate by sleeping between frames (0 = no limit)")
+    parser.add_argument('--frame-budget', type=float, default=None, metavar='MS',
+                        help="time per frame, longer frames are reported (default: from refresh rate and cap)")
+    parser.add_argument('--sync-load', action='store_true',
+                        help="load the model before the window shows up instead of in the background")
+    parser.add_argument('--loader-workers', type=int, default=DEFAULT_WORKERS,
+                        help="number of background loading workers")
+    parser.add_argument('--loader-processes', action='store_true',
+                        help="load in worker processes instead of threads")
+    parser.add_argument('--upload-budget', type=float, default=UPLOAD_BUDGET * 1000, metavar='MS',
+                        help="time per frame for uploading a loaded model to the GPU")
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = parse_arguments()
+
+    PROFILER.enabled = args.profile or bool(args.profile_out) or args.profile_interval > 0
+
+    mesh_cache = MeshCache(args.cache_dir, args.cache_size * 1024 * 1024, enabled=not args.no_cache)
+    if args.clear_cache:
+        mesh_cache.clear()
+        print("Mesh-Cache geleert")
 
-    if len(sys.argv) < 3:
-        objectPath = sys.argv[1]
+    if args.objectPath:
+        objectPath = args.objectPath
         print("presse 'a' to toggle animation...")
 
         # set size of render viewport
         width, height = 640, 480
 
+        # Modelle im Hintergrund laden, das Fenster bleibt währenddessen bedienbar
+        loader = None
+        if not args.sync_load:
+            loader = AsyncLoader(args.loader_workers, processes=args.loader_processes)
+
         # instantiate a scene
-        scene = Scene(width, height, objectPath)
+        scene = Scene(width, height, objectPath, mesh_cache=mesh_cache, normal_mode=args.normals,
+                      lod=not args.no_lod, lod_tolerance=args.lod_tolerance, optimize=not args.no_optimize,
+                      compact=args.compact, async_loader=loader, upload_budget=args.upload_budget / 1000,
+                      picking=not args.no_picking, culling=args.culling,
+                      shader_manager=ShaderManager(cache_dir=args.shader_cache_dir, cache=not args.no_shader_cache,
+                                                   reload=not args.no_shader_reload),
+                      gl_state=GLState(enabled=not args.no_state_cache), cleanup=args.cleanup,
+                      shading=args.shading)
 
         # pass the scene to a render window ...
-        rw = RenderWindow(scene)
+        rw = RenderWindow(scene, on_demand=not args.continuous, profile_interval=args.profile_interval,
+                          swap_interval=args.swap_interval, fps_cap=args.fps_cap,
+                          budget=args.frame_budget / 1000 if args.frame_budget else None)
 
         # ... and start main loop
         rw.run()
-    else:
+
+        if loader is not None:
+            loader.shutdown()
+
+        if args.profile_out:
+            PROFILER.export(args.profile_out)
+            print("Profiling-Ergebnisse gespeichert in %s" % args.profile_out)
+    elif not args.clear_cache:
         print("Objectpath doesn't exist")
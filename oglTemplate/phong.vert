@@ -0,0 +1,16 @@
+#version 330
+
+layout (location=0) in vec4 v_position;
+layout (location=1) in vec3 v_normal;
+uniform mat4 modelview_projection_matrix;
+uniform mat4 modelview_matrix;
+uniform mat4 normal_matrix;
+out vec3 v2f_position;
+out vec3 v2f_normal;            // interpoliert, beleuchtet wird pro Pixel
+
+void main()
+{
+    v2f_position = (modelview_matrix * v_position).xyz;
+    v2f_normal = mat3(normal_matrix) * v_normal;
+    gl_Position = modelview_projection_matrix * v_position;
+}
\ No newline at end of file
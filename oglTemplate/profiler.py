@@ -0,0 +1,138 @@
+"""
+Lightweight timing of loading stages and frames.
+
+    from profiler import PROFILER
+    with PROFILER.stage('load.parse'):
+        ...
+
+While the profiler is disabled, stage() returns a shared no-op context
+manager, so the instrumentation costs one method call per stage.
+"""
+import csv
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """
+        Collects per-stage times, uploaded bytes and a rolling window of frame times
+    """
+
+    def __init__(self, enabled=False, window=1000):
+        self.enabled = enabled
+        self.stages = {}                        # Name -> [Anzahl, Summe, Maximum, letzter Wert]
+        self.bytes = {}                         # Name -> hochgeladene Bytes
+        self.frame_times = deque(maxlen=window)
+        self.frames = 0
+        self._last_report = time.perf_counter()
+
+    def stage(self, name):
+        """ context manager that times the enclosed block as stage 'name' """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [1, seconds, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] = seconds
+
+    def add_bytes(self, name, count):
+        if self.enabled:
+            self.bytes[name] = self.bytes.get(name, 0) + int(count)
+
+    def frame_done(self, seconds):
+        if self.enabled:
+            self.frame_times.append(seconds)
+            self.frames += 1
+
+    def frame_percentiles(self):
+        """ p50/p95/p99 of the recent frame times in milliseconds """
+        if not self.frame_times:
+            return {}
+        values = np.percentile(np.array(self.frame_times) * 1000.0, [50, 95, 99])
+        return dict(zip(('p50_ms', 'p95_ms', 'p99_ms'), (float(value) for value in values)))
+
+    def summary(self):
+        return {
+            'stages': {name: {'count': count, 'total_ms': total * 1000.0, 'mean_ms': total / count * 1000.0,
+                              'max_ms': maximum * 1000.0, 'last_ms': last * 1000.0}
+                       for name, (count, total, maximum, last) in sorted(self.stages.items())},
+            'bytes_uploaded': dict(sorted(self.bytes.items())),
+            'frames': self.frames,
+            'frame_times': self.frame_percentiles(),
+        }
+
+    def export(self, file_path):
+        """ write the summary as .json or .csv (chosen by the file extension) """
+        summary = self.summary()
+        if not file_path.lower().endswith('.csv'):
+            with open(file_path, 'w') as file:
+                json.dump(summary, file, indent=2)
+            return
+
+        with open(file_path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['kind', 'name', 'count', 'total_ms', 'mean_ms', 'max_ms', 'value'])
+            for name, stage in summary['stages'].items():
+                writer.writerow(['stage', name, stage['count'], '%.4f' % stage['total_ms'],
+                                 '%.4f' % stage['mean_ms'], '%.4f' % stage['max_ms'], ''])
+            for name, count in summary['bytes_uploaded'].items():
+                writer.writerow(['bytes', name, '', '', '', '', count])
+            for name, value in summary['frame_times'].items():
+                writer.writerow(['frame', name, summary['frames'], '', '', '', '%.4f' % value])
+
+    def report(self, interval):
+        """ print a short summary to the console at most every 'interval' seconds """
+        now = time.perf_counter()
+        if not self.enabled or interval <= 0 or now - self._last_report < interval:
+            return
+        self._last_report = now
+        frame_times = self.frame_percentiles()
+        line = "frames %d" % self.frames
+        if frame_times:
+            line += ", p50 %.2f ms, p95 %.2f ms, p99 %.2f ms" % (
+                frame_times['p50_ms'], frame_times['p95_ms'], frame_times['p99_ms'])
+        stages = ", ".join("%s %.3f ms" % (name, total / count * 1000.0)
+                           for name, (count, total, _, _) in sorted(self.stages.items())
+                           if name.startswith('frame.'))
+        print(line + (" | " + stages if stages else ""))
+
+
+# gemeinsamer Profiler für Loader und Viewer, standardmäßig ausgeschaltet
+PROFILER = Profiler()
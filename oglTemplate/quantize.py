@@ -0,0 +1,271 @@
+"""
+Compact vertex formats for the GPU upload.
+
+Positions are stored as int16 within the bounds of the mesh; the
+dequantization (scale and offset) is a matrix that is multiplied into the
+model matrix, so the vertex shader stays unchanged. Normals can be packed
+into 4 bytes (octahedral 2x int16 or 2_10_10_10), and indices use uint16,
+if necessary by splitting the mesh into sub-meshes of at most 65536
+vertices that are drawn with glDrawElementsBaseVertex. interleave() puts
+position and normal of a vertex next to each other, so one buffer feeds
+every shading mode of the viewer.
+
+    python quantize.py model.obj [...]      # bytes per layout and error check
+"""
+import argparse
+import os
+from collections import namedtuple
+
+import numpy as np
+
+import mat4
+
+QUANTIZATION_LEVELS = 32767                 # größter int16-Wert
+MAX_SHORT_VERTICES = 65536                  # mit uint16 adressierbare Vertices
+
+# maximal erlaubter Winkelfehler der gepackten Normalen in Grad
+NORMAL_ERROR_BOUNDS = {'octahedral': 0.01, '2_10_10_10': 0.2}
+
+# positions: (V, 3) float32 oder (V, 4) int16 (w = 1), indices: uint32/uint16-Buffer,
+# draws[level] = [(erster Index, Anzahl, Basis-Vertex), ...], matrix: Dequantisierung (4, 4),
+# normals: (V, 3) float32 oder (V,) uint32 im 2_10_10_10-Format, None wenn nicht übergeben
+GpuMesh = namedtuple('GpuMesh', ['positions', 'indices', 'draws', 'matrix', 'normals'])
+
+
+def quantize_positions(vertices):
+    """
+    int16 positions (V, 4) with w = 1 and the matrix that maps them back to
+    model coordinates; the components are not normalized by OpenGL
+    (normalized=GL_FALSE), 1/32767 is part of the matrix
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    low, high = vertices.min(axis=0), vertices.max(axis=0)
+    center = (low + high) / 2.0
+    half = np.maximum((high - low) / 2.0, 1e-12)
+
+    quantized = np.ones((len(vertices), 4), dtype=np.int16)
+    quantized[:, :3] = np.round((vertices - center) / half * QUANTIZATION_LEVELS)
+    matrix = mat4.translate(*center) @ mat4.scale(*(half / QUANTIZATION_LEVELS))
+    return quantized, matrix.astype(np.float32)
+
+
+def dequantize_positions(quantized, matrix):
+    return (quantized.astype(np.float64) @ np.asarray(matrix, dtype=np.float64).T)[:, :3]
+
+
+def position_error_bound(vertices):
+    """ largest possible rounding error per axis: half a quantization step """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    half = np.maximum((vertices.max(axis=0) - vertices.min(axis=0)) / 2.0, 1e-12)
+    return 0.5 * half / QUANTIZATION_LEVELS
+
+
+def _sign(values):
+    """ sign with +1 for zero, as needed by the octahedral mapping """
+    return np.where(values >= 0.0, 1.0, -1.0)
+
+
+def encode_octahedral(normals):
+    """ unit normals (V, 3) -> (V, 2) int16 on the unfolded octahedron """
+    normals = np.asarray(normals, dtype=np.float64)
+    normals = normals / np.maximum(np.abs(normals).sum(axis=1, keepdims=True), 1e-30)
+    x, y, z = normals.T
+    # untere Hälfte nach außen klappen
+    folded_x = np.where(z < 0.0, (1.0 - np.abs(y)) * _sign(x), x)
+    folded_y = np.where(z < 0.0, (1.0 - np.abs(x)) * _sign(y), y)
+    return np.round(np.stack((folded_x, folded_y), axis=1) * QUANTIZATION_LEVELS).astype(np.int16)
+
+
+def decode_octahedral(encoded):
+    x, y = (np.asarray(encoded, dtype=np.float64) / QUANTIZATION_LEVELS).T
+    z = 1.0 - np.abs(x) - np.abs(y)
+    fold = np.maximum(-z, 0.0)
+    x = x - fold * _sign(x)
+    y = y - fold * _sign(y)
+    return _normalize(np.stack((x, y, z), axis=1))
+
+
+def _normalize(vectors):
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(lengths > 0.0, lengths, 1.0)
+
+
+def pack_2_10_10_10(normals):
+    """ normals (V, 3) -> uint32 in GL_INT_2_10_10_10_REV layout (x in the low bits, w = 0) """
+    normals = _normalize(np.asarray(normals, dtype=np.float64))
+    components = np.round(normals * 511).astype(np.int64) & 0x3FF
+    return (components[:, 0] | (components[:, 1] << 10) | (components[:, 2] << 20)).astype(np.uint32)
+
+
+def unpack_2_10_10_10(packed):
+    packed = np.asarray(packed, dtype=np.int64)
+    components = np.stack([(packed >> shift) & 0x3FF for shift in (0, 10, 20)], axis=1)
+    # 10-Bit-Zweierkomplement
+    return _normalize(np.where(components >= 512, components - 1024, components) / 511.0)
+
+
+def angle_error(normals, decoded):
+    """ largest angle between the normals and their decoded version in degrees """
+    normals = np.asarray(normals, dtype=np.float64)
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 0.5                   # isolierte Vertices haben Nullnormalen
+    cosine = np.einsum('ij,ij->i', normals[valid] / lengths[valid, None], decoded[valid])
+    return float(np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0))).max()) if np.any(valid) else 0.0
+
+
+def split_submeshes(indices, max_vertices=MAX_SHORT_VERTICES):
+    """
+    split a flat index buffer in order into parts that reference at most
+    max_vertices vertices; returns [(vertex ids, local uint16 indices), ...]
+    """
+    faces = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    parts = []
+    start = 0
+    while start < len(faces):
+        # größtes Ende, bei dem der Teil noch genug wenige Vertices hat (binäre Suche)
+        low, high = start + 1, len(faces)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if len(np.unique(faces[start:middle])) <= max_vertices:
+                low = middle
+            else:
+                high = middle - 1
+        vertex_ids, local = np.unique(faces[start:low], return_inverse=True)
+        parts.append((vertex_ids, local.astype(np.uint16).ravel()))
+        start = low
+    return parts
+
+
+def pack_mesh(vertices, indices, ranges, compact=True, max_vertices=MAX_SHORT_VERTICES, normals=None):
+    """
+    GpuMesh for the vertices, their normals and the flat index buffer;
+    ranges are the (first index, count) of every level of detail. Without
+    compact the float32 / uint32 buffers are used as they are.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    indices = np.asarray(indices)
+    if not compact:
+        if normals is not None:
+            normals = np.asarray(normals, dtype=np.float32)
+        return GpuMesh(vertices, indices.astype(np.uint32), [[(first, count, 0)] for first, count in ranges],
+                       np.identity(4, dtype=np.float32), normals)
+
+    quantized, matrix = quantize_positions(vertices)
+    if normals is not None:
+        normals = pack_2_10_10_10(normals)
+    if len(vertices) <= max_vertices:
+        return GpuMesh(quantized, indices.astype(np.uint16), [[(first, count, 0)] for first, count in ranges],
+                       matrix, normals)
+
+    # Teilnetze mit eigenen (teilweise doppelten) Vertices, Basis-Vertex pro Teil
+    positions, normal_parts, index_parts, draws = [], [], [], []
+    vertex_offset = index_offset = 0
+    for first, count in ranges:
+        level = []
+        for vertex_ids, local in split_submeshes(indices[first:first + count], max_vertices):
+            positions.append(quantized[vertex_ids])
+            if normals is not None:
+                normal_parts.append(normals[vertex_ids])
+            index_parts.append(local)
+            level.append((index_offset, len(local), vertex_offset))
+            vertex_offset += len(vertex_ids)
+            index_offset += len(local)
+        draws.append(level)
+    return GpuMesh(np.concatenate(positions), np.concatenate(index_parts), draws, matrix,
+                   np.concatenate(normal_parts) if normals is not None else None)
+
+
+def interleave(positions, normals):
+    """
+    structured array with position and normal of every vertex: 24 bytes
+    for float32, 12 bytes for int16 positions with 2_10_10_10 normals
+    """
+    layout = np.dtype([('position', positions.dtype, positions.shape[1:]),
+                       ('normal', normals.dtype, normals.shape[1:])])
+    vertices = np.empty(len(positions), dtype=layout)
+    vertices['position'] = positions
+    vertices['normal'] = normals
+    return vertices
+
+
+def vertex_layouts():
+    """ bytes per vertex of position, normal and color for every layout """
+    return {
+        'float32': {'position': 12, 'normal': 12, 'color': 0},
+        'compact octahedral': {'position': 8, 'normal': 4, 'color': 0},
+        'compact 2_10_10_10': {'position': 8, 'normal': 4, 'color': 0},
+    }
+
+
+def shading_memory(vertices, normals, indices):
+    """
+    GPU bytes of the shading modes (wireframe, flat, Gouraud, Phong) per
+    layout: [(layout, buffers, bytes per vertex, vertex count, index bytes), ...]
+    """
+    vertex_count, index_count = len(vertices), np.asarray(indices).size
+    float_mesh = interleave(np.asarray(vertices, dtype=np.float32), np.asarray(normals, dtype=np.float32))
+    compact = pack_mesh(vertices, indices, [(0, index_count)], normals=normals)
+    compact_mesh = interleave(compact.positions, compact.normals)
+    return [
+        # bisheriger Upload: Positionen und 9 Farbwerte pro Vertex in zwei Buffern, keine Normalen
+        ('separate (before)', 2, 12 + 36, vertex_count, index_count * 4),
+        # Flat-Shading mit eigenen Vertices pro Dreieck statt provozierendem Vertex
+        ('flat, per face', 1, float_mesh.itemsize, index_count, 0),
+        ('interleaved float32', 1, float_mesh.itemsize, vertex_count, index_count * 4),
+        ('interleaved compact', 1, compact_mesh.itemsize, len(compact_mesh), compact.indices.nbytes),
+    ]
+
+
+def report(file_path):
+    from objReader import load_mesh
+    vertices, normals, indices = load_mesh(file_path, optimize=True)
+    triangles = len(indices) // 3
+    print("%s: %d vertices, %d triangles" % (os.path.basename(file_path), len(vertices), triangles))
+
+    compact = pack_mesh(vertices, indices, [(0, len(indices))])
+    print("%-22s %12s %12s %12s" % ("layout", "bytes/vertex", "index bytes", "VRAM KB"))
+    for name, layout in vertex_layouts().items():
+        per_vertex = sum(layout.values())
+        if name == 'float32':
+            vertex_count, index_bytes = len(vertices), indices.size * 4
+        else:
+            vertex_count, index_bytes = len(compact.positions), compact.indices.nbytes
+        print("%-22s %12d %12d %12.1f" % (name, per_vertex, index_bytes,
+                                         (vertex_count * per_vertex + index_bytes) / 1024))
+    # alle Shading-Modi lesen denselben Buffer, der Speicher hängt nur vom Layout ab
+    print("%-22s %8s %12s %12s %12s" % ("shading memory", "buffers", "bytes/vertex", "index bytes", "VRAM KB"))
+    for name, buffers, per_vertex, vertex_count, index_bytes in shading_memory(vertices, normals, indices):
+        print("%-22s %8d %12d %12d %12.1f" % (name, buffers, per_vertex, index_bytes,
+                                              (vertex_count * per_vertex + index_bytes) / 1024))
+    if len(compact.draws[0]) > 1:
+        print("uint16 indices in %d sub-meshes, %d duplicated vertices" % (
+            len(compact.draws[0]), len(compact.positions) - len(vertices)))
+
+    # Fehler gegen die Schranken prüfen
+    quantized, matrix = quantize_positions(vertices)
+    error = np.abs(dequantize_positions(quantized, matrix) - vertices).max(axis=0)
+    bound = position_error_bound(vertices)
+    # Rundung der float32-Matrix zulassen
+    positions_ok = np.all(error <= bound + np.finfo(np.float32).eps * np.abs(vertices).max())
+    print("position error %s <= bound %s: %s" % (np.array2string(error, precision=2),
+                                                 np.array2string(bound, precision=2), positions_ok))
+    results = [positions_ok]
+    for name, decoded in (('octahedral', decode_octahedral(encode_octahedral(normals))),
+                          ('2_10_10_10', unpack_2_10_10_10(pack_2_10_10_10(normals)))):
+        degrees = angle_error(normals, decoded)
+        print("%s normal error %.4f deg <= %.2f deg: %s" % (name, degrees, NORMAL_ERROR_BOUNDS[name],
+                                                          degrees <= NORMAL_ERROR_BOUNDS[name]))
+        results.append(degrees <= NORMAL_ERROR_BOUNDS[name])
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="memory of the vertex layouts and quantization error")
+    parser.add_argument('models', nargs='+')
+    args = parser.parse_args()
+    ok = all([report(path) for path in args.models])
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
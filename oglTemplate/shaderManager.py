@@ -0,0 +1,293 @@
+"""
+Shader programs with a binary cache, hot reload and cached uniform locations.
+
+Linked programs are stored with glGetProgramBinary under a hash of the
+sources and the driver (vendor, renderer, version); the next start loads
+them with glProgramBinary and only compiles when the cache entry is missing
+or rejected. poll(), called once per loop iteration on the GL thread,
+checks the modification times of the shader files and recompiles changed
+programs. With KHR_parallel_shader_compile the driver compiles in the
+background and the old program is drawn until the new one has linked; a
+program that fails to compile is reported and the old one is kept.
+
+    shaders = ShaderManager()
+    program = shaders.load('shader.vert', 'shader.frag')
+    glUseProgram(program.program)
+    glUniformMatrix4fv(program.location('modelview_projection_matrix'), ...)
+    ...
+    if shaders.poll():          # every loop iteration
+        redraw()
+
+Paths are relative to this directory, not to the working directory. The
+OpenGL module is passed in (default: OpenGL.GL) as in instancing.py.
+"""
+import hashlib
+import os
+import time
+
+import numpy as np
+
+SHADER_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.environ.get('OGL_SHADER_CACHE',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'oglTemplate', 'shaders'))
+
+# Abstand der Prüfungen auf geänderte Shader-Dateien (Sekunden)
+POLL_INTERVAL = 0.25
+
+# Konstanten aus GL 4.1 / KHR_parallel_shader_compile, die ein 3.2-Kontext nicht kennen muss
+PROGRAM_BINARY_RETRIEVABLE_HINT = 0x8257
+PROGRAM_BINARY_LENGTH = 0x8741
+NUM_PROGRAM_BINARY_FORMATS = 0x87FE
+COMPLETION_STATUS = 0x91B1
+
+
+def _text(value):
+    """ PyOpenGL returns GL strings as bytes """
+    return value.decode('ascii', 'replace') if isinstance(value, bytes) else str(value)
+
+
+class ShaderProgram:
+    """
+        A linked program of a vertex and a fragment shader file. program is
+        replaced on reload; locations are looked up once per program.
+    """
+
+    def __init__(self, manager, vertex_path, fragment_path):
+        self.manager = manager
+        self.paths = (vertex_path, fragment_path)
+        self.program = 0
+        self.uniforms = {}              # Name -> Location im aktuellen Programm
+        self.mtimes = None              # Änderungszeiten der Quellen des aktuellen bzw. neuesten Versuchs
+        self.pending = None             # Kompilierung, die noch nicht fertig ist
+
+    def location(self, name):
+        """ location of the uniform name, cached until the program is replaced """
+        location = self.uniforms.get(name)
+        if location is None:
+            location = self.manager.gl.glGetUniformLocation(self.program, name)
+            self.uniforms[name] = location
+        return location
+
+    def replace(self, program):
+        if self.program:
+            self.manager.gl.glDeleteProgram(self.program)
+        self.program = program
+        self.uniforms = {}
+
+
+class PendingProgram:
+    """
+        Program whose shaders are compiled and linked by the driver, the
+        status is only queried once it has finished
+    """
+
+    def __init__(self, program, shaders, key):
+        self.program = program
+        self.shaders = shaders
+        self.key = key
+
+
+class ShaderManager:
+    """
+        Loads, caches and reloads the shader programs of a GL context
+    """
+
+    def __init__(self, gl=None, cache_dir=DEFAULT_CACHE_DIR, cache=True, reload=True):
+        if gl is None:
+            from OpenGL import GL as gl
+        self.gl = gl
+        self.cache_dir = cache_dir
+        self.cache = cache
+        self.reload = reload
+        self.programs = []
+        self.driver = None              # Treiberkennung für den Cache-Schlüssel
+        self.binary_support = None
+        self.parallel_compile = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._last_poll = 0.0
+
+    def _init_driver(self):
+        gl = self.gl
+        self.driver = '|'.join(_text(gl.glGetString(name)) for name in (gl.GL_VENDOR, gl.GL_RENDERER, gl.GL_VERSION))
+        # glProgramBinary gibt es erst ab GL 4.1 bzw. mit ARB_get_program_binary
+        self.binary_support = bool(gl.glProgramBinary) and int(gl.glGetIntegerv(NUM_PROGRAM_BINARY_FORMATS)) > 0
+        extensions = {_text(gl.glGetStringi(gl.GL_EXTENSIONS, i))
+                      for i in range(int(gl.glGetIntegerv(gl.GL_NUM_EXTENSIONS)))}
+        self.parallel_compile = bool({'GL_KHR_parallel_shader_compile', 'GL_ARB_parallel_shader_compile'}
+                                     & extensions)
+
+    def load(self, vertex_path, fragment_path):
+        """ ShaderProgram of the two files, from the binary cache if possible; raises RuntimeError """
+        if self.driver is None:
+            self._init_driver()
+        paths = tuple(os.path.join(SHADER_DIR, path) for path in (vertex_path, fragment_path))
+        shader_program = ShaderProgram(self, *paths)
+        shader_program.mtimes = self._mtimes(paths)
+        sources = self._read(paths)
+        key = self._key(sources)
+
+        program = self._load_binary(key)
+        if program:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            program = self._finish(self._start(sources, key))
+        shader_program.replace(program)
+        self.programs.append(shader_program)
+        return shader_program
+
+    def poll(self):
+        """ recompile changed shader files; True if a program was replaced (redraw) """
+        if not self.reload:
+            return False
+        replaced = False
+        now = time.perf_counter()
+        check_files = now - self._last_poll >= POLL_INTERVAL
+        if check_files:
+            self._last_poll = now
+        for shader_program in self.programs:
+            if shader_program.pending is None and check_files:
+                mtimes = self._mtimes(shader_program.paths)
+                if mtimes != shader_program.mtimes:
+                    # auch bei Fehlern erst nach der nächsten Änderung erneut versuchen
+                    shader_program.mtimes = mtimes
+                    try:
+                        sources = self._read(shader_program.paths)
+                    except OSError as error:
+                        # Editoren ersetzen Dateien, kurz kann die Datei fehlen
+                        print("Shader nicht gelesen: %s" % error)
+                        shader_program.mtimes = None
+                        continue
+                    key = self._key(sources)
+                    program = self._load_binary(key)
+                    if program:
+                        # Stand, der schon einmal kompiliert wurde (z. B. rückgängig gemachte Änderung)
+                        shader_program.replace(program)
+                        replaced = True
+                        continue
+                    shader_program.pending = self._start(sources, key)
+            if shader_program.pending is not None and self._ready(shader_program.pending):
+                pending, shader_program.pending = shader_program.pending, None
+                try:
+                    program = self._finish(pending)
+                except RuntimeError as error:
+                    print("Shader nicht übernommen, altes Programm bleibt aktiv:\n%s" % error)
+                    continue
+                shader_program.replace(program)
+                print("Shader neu geladen: %s" % ', '.join(os.path.basename(path) for path in shader_program.paths))
+                replaced = True
+        return replaced
+
+    def pending(self):
+        """ whether a recompilation is still running """
+        return any(shader_program.pending is not None for shader_program in self.programs)
+
+    @staticmethod
+    def _mtimes(paths):
+        try:
+            return tuple(os.stat(path).st_mtime_ns for path in paths)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read(paths):
+        sources = []
+        for path in paths:
+            with open(path) as file:
+                sources.append(file.read())
+        return sources
+
+    def _key(self, sources):
+        digest = hashlib.sha1(self.driver.encode('utf-8'))
+        for source in sources:
+            digest.update(b'\0' + source.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _start(self, sources, key):
+        """ hand both shaders and the link to the driver without waiting for the result """
+        gl = self.gl
+        program = gl.glCreateProgram()
+        shaders = []
+        for source, kind in zip(sources, (gl.GL_VERTEX_SHADER, gl.GL_FRAGMENT_SHADER)):
+            shader = gl.glCreateShader(kind)
+            gl.glShaderSource(shader, source)
+            gl.glCompileShader(shader)
+            gl.glAttachShader(program, shader)
+            shaders.append(shader)
+        if self.binary_support:
+            gl.glProgramParameteri(program, PROGRAM_BINARY_RETRIEVABLE_HINT, gl.GL_TRUE)
+        gl.glLinkProgram(program)
+        return PendingProgram(program, shaders, key)
+
+    def _ready(self, pending):
+        # ohne Parallel-Compile blockiert die Statusabfrage bis zum Ende, das Ergebnis ist dann sofort da
+        if not self.parallel_compile:
+            return True
+        return bool(self.gl.glGetProgramiv(pending.program, COMPLETION_STATUS))
+
+    def _finish(self, pending):
+        """ check compile and link status; returns the program or raises RuntimeError with the info log """
+        gl = self.gl
+        error = None
+        for shader in pending.shaders:
+            if error is None and not gl.glGetShaderiv(shader, gl.GL_COMPILE_STATUS):
+                error = "shader compile error: %s" % _text(gl.glGetShaderInfoLog(shader))
+        if error is None and not gl.glGetProgramiv(pending.program, gl.GL_LINK_STATUS):
+            error = "shader link error: %s" % _text(gl.glGetProgramInfoLog(pending.program))
+
+        # Shader-Objekte werden neben dem gelinkten Programm nicht mehr gebraucht
+        for shader in pending.shaders:
+            gl.glDetachShader(pending.program, shader)
+            gl.glDeleteShader(shader)
+        if error is not None:
+            gl.glDeleteProgram(pending.program)
+            raise RuntimeError(error)
+        self._store_binary(pending.key, pending.program)
+        return pending.program
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key + '.bin')
+
+    def _load_binary(self, key):
+        """ program from the binary cache or 0 if missing or rejected by the driver """
+        if not (self.cache and self.binary_support):
+            return 0
+        try:
+            with open(self._cache_path(key), 'rb') as file:
+                data = file.read()
+        except OSError:
+            return 0
+        gl = self.gl
+        # 4 Bytes Binärformat, danach die Daten des Treibers
+        binary_format = int.from_bytes(data[:4], 'little')
+        binary = np.frombuffer(data, dtype=np.uint8, offset=4)
+        program = gl.glCreateProgram()
+        gl.glProgramBinary(program, binary_format, binary, len(binary))
+        if not gl.glGetProgramiv(program, gl.GL_LINK_STATUS):
+            # z. B. nach einem Treiber-Update
+            gl.glDeleteProgram(program)
+            return 0
+        return program
+
+    def _store_binary(self, key, program):
+        if not (self.cache and self.binary_support):
+            return
+        gl = self.gl
+        length = int(gl.glGetProgramiv(program, PROGRAM_BINARY_LENGTH))
+        if length <= 0:
+            return
+        binary = np.empty(length, dtype=np.uint8)
+        written = np.zeros(1, dtype=np.int32)
+        binary_format = np.zeros(1, dtype=np.uint32)
+        gl.glGetProgramBinary(program, length, written, binary_format, binary)
+        path = self._cache_path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + '.tmp', 'wb') as file:
+                file.write(int(binary_format[0]).to_bytes(4, 'little'))
+                file.write(binary[:written[0]].tobytes())
+            os.replace(path + '.tmp', path)
+        except OSError as error:
+            # Cache ist nur eine Beschleunigung
+            print("shader cache not written: %s" % error)
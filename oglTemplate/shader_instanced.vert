@@ -0,0 +1,13 @@
+#version 330
+
+layout (location=0) in vec4 v_position;
+layout (location=1) in vec3 v_color;
+layout (location=2) in mat4 instance_matrix;     // belegt die Locations 2 bis 5
+uniform mat4 modelview_projection_matrix;
+out vec3 v2f_color;
+
+void main()
+{
+    v2f_color = v_color;
+    gl_Position = modelview_projection_matrix * instance_matrix * v_position;
+}
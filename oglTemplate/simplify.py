@@ -0,0 +1,418 @@
+"""
+Quadric error metric (QEM) mesh simplification and levels of detail.
+
+Edges are collapsed in rounds: every round computes the collapse costs of
+all edges at once and collapses a set of cheapest edges whose neighbourhoods
+do not overlap, so the collapses of one round are independent of each other.
+
+    lods = load_lods(file_path, vertices, faces)    # builds or reads <mesh>.lod.npz
+    python simplify.py model.obj [--ratios 0.5 0.25 0.1 0.02] [--save] [--no-optimize] [--normals MODE] [--cleanup]
+"""
+import argparse
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from objReader import NORMAL_MODES, load_mesh
+from vertexCache import optimize_mesh
+
+DEFAULT_RATIOS = (0.5, 0.25, 0.1, 0.02)
+
+# Gewicht der Ebenen senkrecht zu Randkanten, damit offene Ränder erhalten bleiben
+BOUNDARY_WEIGHT = 100.0
+
+# pro Runde wird unter dem billigsten 1/CANDIDATE_DIVISOR der Kanten ausgewählt
+CANDIDATE_DIVISOR = 4
+
+# Version des .lod.npz-Formats, bei Änderungen am Algorithmus erhöhen
+LOD_VERSION = 3
+
+# vertices (V, 3) float32, faces (F, 3) int32, error = mittlerer (RMS) Ebenenabstand in Modelleinheiten:
+# Wurzel des größten flächengewichteten Quadrik-Fehlers einer Zusammenfassung, keine obere Schranke;
+# die maximale Abweichung von der Originalfläche liegt meist beim 2- bis 4-fachen
+Lod = namedtuple('Lod', ['vertices', 'faces', 'error'])
+
+
+class Simplifier:
+    """
+        Collapses edges of a triangle mesh by increasing quadric error; the
+        quadrics are kept between calls, so a LOD chain is built by calling
+        simplify_to with decreasing face counts
+    """
+
+    def __init__(self, vertices, faces, boundary_weight=BOUNDARY_WEIGHT):
+        self.vertices = np.array(vertices, dtype=np.float64)
+        self.faces = np.array(faces, dtype=np.int64).reshape(-1, 3)
+        self.faces = self.faces[_valid_faces(self.faces, len(self.vertices))]
+        self.quadrics, self.weights = vertex_quadrics(self.vertices, self.faces, boundary_weight)
+        self.error = 0.0            # größter bisher akzeptierter mittlerer quadratischer Ebenenabstand
+
+    def simplify_to(self, target_faces, max_error=np.inf):
+        """ collapse edges until at most target_faces remain, returns the compacted Lod """
+        while len(self.faces) > target_faces:
+            if not self._collapse_round(len(self.faces) - target_faces, max_error):
+                break
+        return self.lod()
+
+    def lod(self):
+        used, faces = np.unique(self.faces, return_inverse=True)
+        return Lod(self.vertices[used].astype(np.float32), faces.reshape(-1, 3).astype(np.int32),
+                   float(np.sqrt(self.error)))
+
+    def _collapse_round(self, excess_faces, max_error):
+        """ one round of independent collapses, returns False if nothing could be collapsed """
+        edges = unique_edges(self.faces, len(self.vertices))
+        if len(edges) == 0:
+            return False
+        costs, targets = collapse_costs(self.quadrics, self.vertices, edges)
+
+        # nur das billigste Viertel der Kanten kommt in Frage, so bleibt die Reihenfolge
+        # nahe an der des sequentiellen Algorithmus
+        candidates = np.argsort(costs, kind='stable')[:max(len(edges) // CANDIDATE_DIVISOR, 1)]
+        candidates = candidates[costs[candidates] <= max_error]
+        candidates = candidates[_link_condition(edges, self.faces, candidates)]
+        edges, costs, targets = edges[candidates], costs[candidates], targets[candidates]
+
+        # Kanten, deren Zusammenfassen Dreiecke umklappt, fallen weg
+        allowed = ~self._flips(edges, targets)
+        edges, costs, targets = edges[allowed], costs[allowed], targets[allowed]
+        if len(edges) == 0:
+            return False
+
+        selected = independent_edges(edges, costs, self.faces, len(self.vertices))
+        # jede Kante entfernt (meist) zwei Dreiecke, nicht mehr als nötig zusammenfassen
+        selected = selected[np.argsort(costs[selected], kind='stable')][:excess_faces // 2 + 1]
+
+        keep, remove = edges[selected, 0], edges[selected, 1]
+        self.vertices[keep] = targets[selected]
+        # Quadrik-Fehler durch die Flächengewichte teilen -> mittlerer quadratischer Abstand zu den Ebenen
+        weights = self.weights[keep] + self.weights[remove]
+        self.error = max(self.error, float(np.max(costs[selected] / np.maximum(weights, 1e-300))))
+        self.quadrics[keep] += self.quadrics[remove]
+        self.weights[keep] = weights
+
+        mapping = np.arange(len(self.vertices))
+        mapping[remove] = keep
+        faces = mapping[self.faces]
+        self.faces = faces[_valid_faces(faces, len(self.vertices))]
+        return True
+
+    def _flips(self, edges, targets):
+        """ True for edges whose collapse turns a remaining neighbour triangle upside down """
+        order, starts, counts = _incidence(self.faces.ravel(), len(self.vertices))
+        flipped = np.zeros(len(edges), dtype=bool)
+        for end in (0, 1):
+            # alle Paare (Kante, Dreieck an diesem Endpunkt)
+            edge_ids, offsets = _expand(counts[edges[:, end]])
+            corners = order[starts[edges[edge_ids, end]] + offsets]
+            faces = self.faces[corners // 3]
+
+            # Dreiecke, die beide Endpunkte enthalten, verschwinden beim Zusammenfassen
+            surviving = ~np.any(faces == edges[edge_ids, 1 - end][:, None], axis=1)
+            points = self.vertices[faces]
+            before = np.cross(points[:, 1] - points[:, 0], points[:, 2] - points[:, 0])
+            points[np.arange(len(points)), corners % 3] = targets[edge_ids]
+            after = np.cross(points[:, 1] - points[:, 0], points[:, 2] - points[:, 0])
+            flipped[edge_ids[surviving & (np.einsum('ij,ij->i', before, after) <= 0.0)]] = True
+        return flipped
+
+
+def _incidence(indices, count):
+    """ positions of every value 0..count-1 in indices: order[starts[v]:starts[v] + counts[v]] """
+    order = np.argsort(indices, kind='stable')
+    counts = np.bincount(indices, minlength=count)
+    return order, np.cumsum(counts) - counts, counts
+
+
+def _expand(counts):
+    """ row id and position within the row for rows with the given lengths """
+    ids = np.repeat(np.arange(len(counts)), counts)
+    return ids, np.arange(len(ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
+def _link_condition(edges, faces, subset):
+    """
+    True for the edges[subset] whose end points share no neighbours besides the
+    opposite vertices of the triangles on the edge; other collapses make the
+    mesh non-manifold. edges must be sorted (see unique_edges).
+    """
+    count = int(edges.max()) + 1
+    keys = edges[:, 0] * count + edges[:, 1]
+    # Nachbarschaft in beide Richtungen
+    both = np.concatenate((edges, edges[:, ::-1]))
+    order, starts, counts = _incidence(both[:, 0], count)
+    neighbours = both[order, 1]
+
+    # gemeinsame Nachbarn: x mit x in N(a) und (b, x) ist Kante
+    checked = edges[subset]
+    edge_ids, offsets = _expand(counts[checked[:, 0]])
+    a_neighbours = neighbours[starts[checked[edge_ids, 0]] + offsets]
+    b = checked[edge_ids, 1]
+    pairs = np.sort(np.stack((b, a_neighbours), axis=1), axis=1)
+    pair_keys = pairs[:, 0] * count + pairs[:, 1]
+    position = np.minimum(np.searchsorted(keys, pair_keys), len(keys) - 1)
+    common = np.bincount(edge_ids[(keys[position] == pair_keys) & (a_neighbours != b)], minlength=len(subset))
+
+    # Dreiecke an jeder Kante
+    face_edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    position = np.searchsorted(keys, face_edges[:, 0] * count + face_edges[:, 1])
+    return common <= np.bincount(position, minlength=len(edges))[subset]
+
+
+def _valid_faces(faces, vertex_count):
+    """ mask of faces with three different vertices, without repeated faces of the same orientation """
+    valid = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])
+    # Dreiecke so rotieren, dass der kleinste Index vorne steht (Orientierung bleibt erhalten)
+    shift = np.argmin(faces, axis=1)
+    rotated = faces[np.arange(len(faces))[:, None], (shift[:, None] + np.arange(3)) % 3]
+    if vertex_count ** 3 < 2 ** 63:
+        _, first = np.unique((rotated[:, 0] * vertex_count + rotated[:, 1]) * vertex_count + rotated[:, 2],
+                             return_index=True)
+    else:
+        _, first = np.unique(rotated, axis=0, return_index=True)
+    unique = np.zeros(len(faces), dtype=bool)
+    unique[first] = True
+    return valid & unique
+
+
+def unique_edges(faces, vertex_count):
+    """ undirected edges (E, 2) of the faces, sorted, smaller index first """
+    edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    keys = np.unique(edges[:, 0] * vertex_count + edges[:, 1])
+    return np.stack((keys // vertex_count, keys % vertex_count), axis=1)
+
+
+def vertex_quadrics(vertices, faces, boundary_weight=BOUNDARY_WEIGHT):
+    """
+    area-weighted sum of the plane quadrics (V, 4, 4) of the faces around every
+    vertex and the summed weights (V,)
+    """
+    a, b, c = (vertices[faces[:, i]] for i in range(3))
+    normals = np.cross(b - a, c - a)
+    lengths = np.linalg.norm(normals, axis=1)
+    areas = 0.5 * lengths
+    normals /= np.maximum(lengths, 1e-300)[:, None]
+    planes = np.concatenate((normals, -np.einsum('ij,ij->i', normals, a)[:, None]), axis=1)
+    face_quadrics = np.einsum('fi,fj->fij', planes, planes) * areas[:, None, None]
+
+    quadrics = _accumulate(face_quadrics, faces, len(vertices))
+    weights = np.bincount(faces.ravel(), weights=np.repeat(areas, 3), minlength=len(vertices))
+
+    # Randkanten gehören nur zu einem Dreieck: Ebene durch die Kante, senkrecht zum Dreieck
+    directed = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    _, inverse, counts = np.unique(np.sort(directed, axis=1), axis=0, return_inverse=True, return_counts=True)
+    boundary = counts[inverse.ravel()] == 1
+    if np.any(boundary):
+        edges = directed[boundary]
+        face_normals = np.repeat(normals, 3, axis=0)[boundary]
+        direction = vertices[edges[:, 1]] - vertices[edges[:, 0]]
+        side = np.cross(direction, face_normals)
+        length = np.linalg.norm(side, axis=1)
+        side /= np.maximum(length, 1e-300)[:, None]
+        side_planes = np.concatenate((side, -np.einsum('ij,ij->i', side, vertices[edges[:, 0]])[:, None]), axis=1)
+        edge_weights = boundary_weight * np.einsum('ij,ij->i', direction, direction)
+        edge_quadrics = np.einsum('fi,fj->fij', side_planes, side_planes) * edge_weights[:, None, None]
+        quadrics += _accumulate(edge_quadrics, edges, len(vertices))
+    return quadrics, weights
+
+
+def _accumulate(quadrics, indices, count):
+    """ add the (N, 4, 4) quadrics to all vertices listed in the rows of indices """
+    corners = indices.shape[1]
+    weights = np.repeat(quadrics.reshape(-1, 16), corners, axis=0)
+    flat = indices.ravel()
+    return np.stack([np.bincount(flat, weights=weights[:, i], minlength=count) for i in range(16)],
+                    axis=1).reshape(count, 4, 4)
+
+
+def collapse_costs(quadrics, vertices, edges):
+    """
+    quadric error and target position of every edge collapse; the target is the
+    minimizer of the summed quadric, or the best of both ends and the midpoint
+    """
+    q = quadrics[edges[:, 0]] + quadrics[edges[:, 1]]
+    a, b = vertices[edges[:, 0]], vertices[edges[:, 1]]
+    candidates = [a, b, 0.5 * (a + b)]
+
+    # optimaler Punkt: Q[:3, :3] x = -Q[:3, 3], nur bei gut konditionierten Matrizen
+    system = q[:, :3, :3]
+    solvable = np.abs(np.linalg.det(system)) > 1e-12 * np.maximum(np.abs(system).max(axis=(1, 2)) ** 3, 1e-300)
+    optimal = candidates[2].copy()
+    if np.any(solvable):
+        optimal[solvable] = np.linalg.solve(system[solvable], -q[solvable, :3, 3:])[..., 0]
+    candidates.append(optimal)
+
+    costs = np.stack([_quadric_error(q, point) for point in candidates], axis=1)
+    best = np.argmin(costs, axis=1)
+    rows = np.arange(len(edges))
+    targets = np.stack(candidates, axis=1)[rows, best]
+    return np.maximum(costs[rows, best], 0.0), targets
+
+
+def _quadric_error(q, points):
+    """ v^T Q v for homogeneous points v = (x, y, z, 1) """
+    homogeneous = np.concatenate((points, np.ones((len(points), 1))), axis=1)
+    return np.einsum('ei,eij,ej->e', homogeneous, q, homogeneous)
+
+
+def independent_edges(edges, costs, faces, vertex_count):
+    """
+    indices of edges that are the cheapest edge in the neighbourhood of both
+    their ends; no triangle touches two of these edges, so they can be
+    collapsed at the same time
+    """
+    rank = np.empty(len(edges), dtype=np.int64)
+    rank[np.argsort(costs, kind='stable')] = np.arange(len(edges))
+
+    # billigste Kante an jedem Vertex, dann über die Dreiecke an die Nachbarn weitergeben
+    cheapest = np.full(vertex_count, len(edges), dtype=np.int64)
+    np.minimum.at(cheapest, edges[:, 0], rank)
+    np.minimum.at(cheapest, edges[:, 1], rank)
+    face_cheapest = cheapest[faces].min(axis=1)
+    neighbourhood = np.full(vertex_count, len(edges), dtype=np.int64)
+    np.minimum.at(neighbourhood, faces.ravel(), np.repeat(face_cheapest, 3))
+
+    return np.flatnonzero((neighbourhood[edges[:, 0]] == rank) & (neighbourhood[edges[:, 1]] == rank))
+
+
+def build_lods(vertices, faces, ratios=DEFAULT_RATIOS, optimize=False):
+    """
+    LOD chain for the given ratios of the face count; level 0 is the input mesh.
+    Vertices at the same position are merged first, so seams of split normals
+    or texture coordinates are not treated as open borders. With optimize the
+    simplified levels are reordered for the vertex caches (see vertexCache).
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    lods = [Lod(vertices, faces.astype(np.int32), 0.0)]
+
+    positions, inverse = np.unique(vertices, axis=0, return_inverse=True)
+    simplifier = Simplifier(positions, inverse.ravel()[faces])
+    for ratio in sorted(ratios, reverse=True):
+        lod = simplifier.simplify_to(max(int(len(faces) * ratio), 1))
+        if optimize:
+            lod_vertices, _, indices = optimize_mesh(lod.vertices, np.zeros((0, 3)), lod.faces)
+            lod = lod._replace(vertices=lod_vertices, faces=indices.reshape(-1, 3))
+        lods.append(lod)
+    return lods
+
+
+def lod_path(file_path):
+    """ LOD file stored next to the mesh: model.obj -> model.obj.lod.npz (model.omesh gets its own) """
+    return file_path + '.lod.npz'
+
+
+def save_lods(file_path, lods, ratios, optimize=False, cleanup=False, normal_mode='uniform'):
+    """ store LOD 1..n next to the mesh, silently skipped if the directory is read-only """
+    stat = os.stat(file_path)
+    arrays = {'version': LOD_VERSION, 'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns,
+              'optimize': optimize, 'cleanup': cleanup, 'normal_mode': normal_mode,
+              'ratios': np.asarray(ratios, dtype=np.float64), 'base_faces': len(lods[0].faces),
+              'errors': np.array([lod.error for lod in lods[1:]])}
+    for level, lod in enumerate(lods[1:], 1):
+        arrays['vertices_%d' % level] = lod.vertices
+        arrays['faces_%d' % level] = lod.faces
+    try:
+        # erst vollständig schreiben, dann umbenennen
+        tmp_path = lod_path(file_path) + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, lod_path(file_path))
+    except OSError:
+        pass
+
+
+def read_lods(file_path, vertices, faces, ratios=DEFAULT_RATIOS, optimize=False, cleanup=False,
+              normal_mode='uniform'):
+    """ LODs from the .lod.npz file, or None if missing or outdated """
+    try:
+        data = np.load(lod_path(file_path))
+    except (OSError, ValueError):
+        return None
+    with data:
+        stat = os.stat(file_path)
+        if (int(data['version']) != LOD_VERSION or int(data['source_size']) != stat.st_size
+                or int(data['source_mtime_ns']) != stat.st_mtime_ns or int(data['base_faces']) != len(faces)
+                or bool(data['optimize']) != optimize or bool(data['cleanup']) != cleanup
+                or str(data['normal_mode']) != normal_mode
+                or not np.array_equal(data['ratios'], np.asarray(ratios, dtype=np.float64))):
+            return None
+        lods = [Lod(np.asarray(vertices, dtype=np.float32), np.asarray(faces, dtype=np.int32).reshape(-1, 3), 0.0)]
+        for level, error in enumerate(data['errors'], 1):
+            lods.append(Lod(data['vertices_%d' % level], data['faces_%d' % level], float(error)))
+    return lods
+
+
+def load_lods(file_path, vertices, faces, ratios=DEFAULT_RATIOS, optimize=False, cleanup=False,
+              normal_mode='uniform'):
+    """
+    LOD chain of the mesh, read from next to the mesh or built and stored
+    there; cleanup and normal_mode are the load_mesh options of vertices/faces
+    """
+    lods = read_lods(file_path, vertices, faces, ratios, optimize, cleanup, normal_mode)
+    if lods is None:
+        lods = build_lods(vertices, faces, ratios, optimize)
+        save_lods(file_path, lods, ratios, optimize, cleanup, normal_mode)
+    return lods
+
+
+def concatenate_lods(lods):
+    """
+    vertices and flat int32 indices of all levels in one buffer each, indices
+    already offset to their vertices; ranges[level] = (first index, index count)
+    """
+    vertex_offsets = np.cumsum([0] + [len(lod.vertices) for lod in lods[:-1]])
+    index_counts = [lod.faces.size for lod in lods]
+    index_offsets = np.cumsum([0] + index_counts[:-1])
+    vertices = np.concatenate([lod.vertices for lod in lods]).astype(np.float32, copy=False)
+    indices = np.concatenate([lod.faces.ravel() + offset for lod, offset in zip(lods, vertex_offsets)])
+    return vertices, indices.astype(np.int32), [(int(first), count) for first, count in zip(index_offsets, index_counts)]
+
+
+def select_lod(errors, pixels_per_unit, tolerance=1.0):
+    """
+    coarsest level whose RMS error (Lod.error, ascending) projects to at most
+    'tolerance' pixels; single points deviate more, so the tolerance has to
+    be smaller than the largest acceptable deviation
+    """
+    visible = np.asarray(errors) * pixels_per_unit <= tolerance
+    return int(np.flatnonzero(visible)[-1]) if np.any(visible) else 0
+
+
+def report(lods):
+    """ triangle count, vertex count and RMS error of every level """
+    base = len(lods[0].faces)
+    print("%5s %10s %10s %8s %12s" % ("level", "triangles", "vertices", "ratio", "rms error"))
+    for level, lod in enumerate(lods):
+        print("%5d %10d %10d %7.1f%% %12.6f" % (level, len(lod.faces), len(lod.vertices),
+                                                 100.0 * len(lod.faces) / max(base, 1), lod.error))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="build the LOD chain of an OBJ file")
+    parser.add_argument('objectPath')
+    parser.add_argument('--ratios', type=float, nargs='+', default=list(DEFAULT_RATIOS))
+    parser.add_argument('--save', action='store_true', help="store the LODs next to the mesh")
+    # dieselben Ladeoptionen wie objViewer, sonst verwirft der Viewer die gespeicherten Stufen
+    parser.add_argument('--no-optimize', action='store_true',
+                        help="keep the file order of the triangles (objViewer --no-optimize)")
+    parser.add_argument('--normals', choices=NORMAL_MODES, default='uniform',
+                        help="weighting of computed vertex normals (objViewer --normals)")
+    parser.add_argument('--cleanup', action='store_true',
+                        help="weld close vertices, drop degenerate and duplicate triangles (objViewer --cleanup)")
+    args = parser.parse_args()
+
+    optimize = not args.no_optimize
+    vertices, _, indices = load_mesh(args.objectPath, normal_mode=args.normals, optimize=optimize,
+                                     cleanup=args.cleanup)
+    start = time.perf_counter()
+    lods = build_lods(vertices, indices.reshape(-1, 3), args.ratios, optimize)
+    print("%s: %.2f s" % (os.path.basename(args.objectPath), time.perf_counter() - start))
+    report(lods)
+    if args.save:
+        save_lods(args.objectPath, lods, args.ratios, optimize, args.cleanup, args.normals)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Headless NumPy software rasterizer.
+
+Renders the indexed triangles of a mesh with the same MVP matrices as
+Scene.draw (see camera.py) into a z-buffered framebuffer, without GPU or
+display. Vertex colors are interpolated like shader.vert/shader.frag pass
+them through. Triangles are rasterized in batches of equal bounding-box
+size, edges of the wireframe in batches of line samples.
+
+    python softRenderer.py [--mode fill|wireframe] [--out DIR] [model.obj ...]
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from camera import ViewState, model_view_projection
+from objReader import load_mesh
+
+# maximale Anzahl Kandidatenpixel pro Batch (begrenzt den Speicher)
+BATCH_PIXELS = 1 << 20
+
+DEFAULT_COLOR = (0.0, 1.0, 1.0)     # cyan, wie VERTEX_COLOR im Viewer
+
+
+class SoftwareRenderer:
+    """
+        z-buffered framebuffer with vectorized triangle and line rasterization
+    """
+
+    def __init__(self, width, height, clear_color=(0.0, 0.0, 0.0)):
+        self.width = width
+        self.height = height
+        self.clear_color = np.array(clear_color, dtype=np.float32)
+        self.color = np.empty((height, width, 3), dtype=np.float32)
+        self.depth = np.empty((height, width), dtype=np.float32)
+        self.clear()
+
+    def clear(self):
+        self.color[...] = self.clear_color
+        self.depth[...] = np.inf
+
+    def draw(self, vertices, indices, mvp, colors=None, mode='wireframe'):
+        """
+        draw the triangles 'indices' (flat, 3 per triangle) of 'vertices' (V, 3)
+        transformed by mvp; colors are per-vertex RGB values
+        """
+        vertices = np.asarray(vertices, dtype=np.float64)
+        triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        if colors is None:
+            colors = np.broadcast_to(np.array(DEFAULT_COLOR), vertices.shape)
+        colors = np.asarray(colors, dtype=np.float32)
+
+        # Vertex-Shader: in den Clip-Space transformieren
+        clip = np.hstack((vertices, np.ones((len(vertices), 1)))) @ np.asarray(mvp, dtype=np.float64).T
+        w = clip[:, 3]
+
+        # Dreiecke mit Ecken hinter der Kamera werden verworfen (kein Clipping)
+        visible = np.all(w[triangles] > 1e-9, axis=1)
+        triangles = triangles[visible]
+        safe_w = np.where(w > 1e-9, w, 1.0)
+        ndc = clip[:, :3] / safe_w[:, None]
+
+        # Viewport-Transformation, Pixelzeile 0 ist oben
+        screen = np.empty((len(vertices), 3))
+        screen[:, 0] = (ndc[:, 0] + 1.0) * 0.5 * self.width
+        screen[:, 1] = (1.0 - ndc[:, 1]) * 0.5 * self.height
+        screen[:, 2] = (ndc[:, 2] + 1.0) * 0.5
+        inv_w = 1.0 / safe_w
+
+        if mode == 'fill':
+            self._fill_triangles(screen, inv_w, colors, triangles)
+        elif mode == 'wireframe':
+            self._draw_edges(screen, colors, triangles)
+        else:
+            raise ValueError("unknown mode '%s', expected 'fill' or 'wireframe'" % mode)
+        return len(triangles)
+
+    def _fill_triangles(self, screen, inv_w, colors, triangles):
+        corners = screen[triangles]                                     # (T, 3, 3)
+        lower = np.floor(corners[:, :, :2].min(axis=1)).astype(np.int64)
+        upper = np.floor(corners[:, :, :2].max(axis=1)).astype(np.int64)
+        lower = np.maximum(lower, 0)
+        upper = np.minimum(upper, [self.width - 1, self.height - 1])
+        extent = upper - lower + 1
+        on_screen = np.all(extent > 0, axis=1)
+
+        # Dreiecke nach Größe der Bounding Box (Zweierpotenz) gruppieren
+        size = np.maximum(extent.max(axis=1), 1)
+        size_class = np.ceil(np.log2(size)).astype(np.int64)
+        for cls in np.unique(size_class[on_screen]):
+            selected = np.flatnonzero(on_screen & (size_class == cls))
+            box = 1 << int(cls)
+            per_batch = max(1, BATCH_PIXELS // (box * box))
+            for start in range(0, len(selected), per_batch):
+                batch = selected[start:start + per_batch]
+                self._fill_batch(corners[batch], lower[batch], upper[batch], box,
+                                 inv_w[triangles[batch]], colors[triangles[batch]])
+
+    def _fill_batch(self, corners, lower, upper, box, inv_w, colors):
+        offset_y, offset_x = np.divmod(np.arange(box * box), box)
+        px = lower[:, 0:1] + offset_x[None, :]                          # (K, box*box)
+        py = lower[:, 1:2] + offset_y[None, :]
+        candidate = (px <= upper[:, 0:1]) & (py <= upper[:, 1:2])
+
+        # baryzentrische Koordinaten der Pixelmittelpunkte über Kantenfunktionen
+        cx, cy = px + 0.5, py + 0.5
+        x, y = corners[:, :, 0], corners[:, :, 1]
+        area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (y[:, 1] - y[:, 0]) * (x[:, 2] - x[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv_area = np.where(area != 0, 1.0 / area, 0.0)[:, None]
+        bary = np.empty((3,) + px.shape)
+        for i in range(3):
+            j, k = (i + 1) % 3, (i + 2) % 3
+            bary[i] = ((x[:, j:j + 1] - cx) * (y[:, k:k + 1] - cy) -
+                       (y[:, j:j + 1] - cy) * (x[:, k:k + 1] - cx)) * inv_area
+        inside = candidate & np.all(bary >= 0, axis=0) & (inv_area != 0)
+
+        triangle, pixel = np.nonzero(inside)
+        bary = bary[:, triangle, pixel].T                               # (N, 3)
+        depth = np.einsum('ij,ij->i', bary, corners[triangle, :, 2])
+
+        # perspektivisch korrekte Interpolation der Farben
+        weights = bary * inv_w[triangle]
+        weights /= weights.sum(axis=1, keepdims=True)
+        color = np.einsum('ij,ijk->ik', weights, colors[triangle])
+
+        self._write(px[triangle, pixel], py[triangle, pixel], depth, color)
+
+    def _draw_edges(self, screen, colors, triangles):
+        # jede Kante nur einmal zeichnen
+        edges = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        edges = np.unique(edges, axis=0)
+
+        start, end = screen[edges[:, 0]], screen[edges[:, 1]]
+        steps = np.ceil(np.abs(end[:, :2] - start[:, :2]).max(axis=1)).astype(np.int64) + 1
+
+        # Kanten so in Batches aufteilen, dass jeder Batch höchstens BATCH_PIXELS Punkte hat
+        total = np.cumsum(steps)
+        bounds = np.searchsorted(total, np.arange(BATCH_PIXELS, total[-1] if len(total) else 0, BATCH_PIXELS))
+        for batch in np.split(np.arange(len(edges)), bounds):
+            if len(batch) == 0:
+                continue
+            samples = steps[batch]
+            edge = np.repeat(batch, samples)
+            first = np.repeat(np.cumsum(samples) - samples, samples)
+            t = (np.arange(len(edge)) - first) / np.maximum(steps[edge] - 1, 1)
+            point = start[edge] + t[:, None] * (end[edge] - start[edge])
+            color = colors[edges[edge, 0]] + t[:, None] * (colors[edges[edge, 1]] - colors[edges[edge, 0]])
+
+            px = np.floor(point[:, 0]).astype(np.int64)
+            py = np.floor(point[:, 1]).astype(np.int64)
+            on_screen = (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+            self._write(px[on_screen], py[on_screen], point[on_screen, 2], color[on_screen])
+
+    def _write(self, px, py, depth, color):
+        """ depth test and write of fragments, the nearest fragment per pixel wins """
+        in_range = (depth >= 0.0) & (depth <= 1.0)
+        pixel = (py * self.width + px)[in_range]
+        depth, color = depth[in_range], color[in_range]
+
+        order = np.lexsort((depth, pixel))
+        pixel = pixel[order]
+        nearest = np.concatenate(([True], pixel[1:] != pixel[:-1])) if len(pixel) else np.zeros(0, bool)
+        pixel, depth, color = pixel[nearest], depth[order][nearest], color[order][nearest]
+
+        depth_buffer = self.depth.reshape(-1)
+        passed = depth < depth_buffer[pixel]
+        depth_buffer[pixel[passed]] = depth[passed]
+        self.color.reshape(-1, 3)[pixel[passed]] = color[passed]
+
+    def image(self):
+        """ framebuffer as (height, width, 3) uint8 array """
+        return (np.clip(self.color, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+
+    def save(self, file_path):
+        """ write the framebuffer as .png or .ppm """
+        if file_path.lower().endswith('.ppm'):
+            write_ppm(file_path, self.image())
+        else:
+            write_png(file_path, self.image())
+
+
+def write_ppm(file_path, image):
+    height, width, _ = image.shape
+    with open(file_path, 'wb') as file:
+        file.write(b'P6\n%d %d\n255\n' % (width, height))
+        file.write(np.ascontiguousarray(image).tobytes())
+
+
+def write_png(file_path, image):
+    """ minimal RGB PNG writer (zlib only, no imaging library needed) """
+    height, width, _ = image.shape
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    # jede Zeile beginnt mit Filtertyp 0
+    rows = np.hstack((np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)))
+    with open(file_path, 'wb') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+        file.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        file.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)))
+        file.write(chunk(b'IEND', b''))
+
+
+def render_model(file_path, width=640, height=480, mode='wireframe', state=None, frames=5):
+    """ render a model like the viewer does; returns renderer, triangles and the best frame time """
+    vertices, _, indices = load_mesh(file_path)
+    state = state if state is not None else ViewState()
+    mvp = model_view_projection(state, width / height)
+
+    renderer = SoftwareRenderer(width, height)
+    best = float('inf')
+    triangles = 0
+    for _ in range(frames):
+        start = time.perf_counter()
+        renderer.clear()
+        triangles = renderer.draw(vertices, indices, mvp, mode=mode)
+        best = min(best, time.perf_counter() - start)
+    return renderer, triangles, best
+
+
+def main():
+    models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+    parser = argparse.ArgumentParser(description="headless software rendering of OBJ models")
+    parser.add_argument('models', nargs='*', help="OBJ files (default: all files in ../models)")
+    parser.add_argument('--mode', choices=('fill', 'wireframe'), default='wireframe')
+    parser.add_argument('--size', type=int, nargs=2, default=(640, 480), metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--rot', type=float, nargs=3, default=(0, 0, 0), metavar=('X', 'Y', 'Z'),
+                        help="rotation angles around the x, y and z axis in degrees")
+    parser.add_argument('--ortho', action='store_true', help="orthographic instead of perspective projection")
+    parser.add_argument('--frames', type=int, default=5, help="frames per model for the timing")
+    parser.add_argument('--out', help="directory for the rendered images")
+    parser.add_argument('--format', choices=('png', 'ppm'), default='png')
+    args = parser.parse_args()
+
+    models = args.models or sorted(os.path.join(models_dir, name) for name in os.listdir(models_dir)
+                                   if name.endswith('.obj'))
+    state = ViewState(rot_angle_x=args.rot[0], rot_angle_y=args.rot[1], rot_angle_z=args.rot[2],
+                      projection_type='orthographic' if args.ortho else 'perspective')
+
+    print("%-18s %10s %10s %14s" % ("model", "triangles", "ms/frame", "triangles/s"))
+    for path in models:
+        renderer, triangles, seconds = render_model(path, args.size[0], args.size[1], args.mode, state, args.frames)
+        print("%-18s %10d %10.1f %14.0f" % (os.path.basename(path), triangles, seconds * 1000, triangles / seconds))
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+            name = os.path.splitext(os.path.basename(path))[0]
+            renderer.save(os.path.join(args.out, '%s_%s.%s' % (name, args.mode, args.format)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import importlib
+import os
+import re
+import sys
+import types
+
+import numpy as np
+import pytest
+
+# die Module liegen flach in oglTemplate und werden ohne Paket importiert
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'models')
+
+from glState import RecordingGL
+from shaderManager import COMPLETION_STATUS, NUM_PROGRAM_BINARY_FORMATS, PROGRAM_BINARY_LENGTH
+
+
+class ShaderGL(RecordingGL):
+    """
+        RecordingGL that answers the queries of shaderManager: shaders whose
+        source contains 'syntax error' fail to compile, program binaries are
+        the concatenated sources
+    """
+
+    def __init__(self, driver=('Vendor', 'Renderer', '3.2 Core')):
+        super().__init__()
+        self.driver = dict(zip((self.GL_VENDOR, self.GL_RENDERER, self.GL_VERSION), driver))
+        self.sources = {}               # Shader -> Quelltext
+        self.attached = {}              # Programm -> [Shader, ...]
+        self.binaries = {}              # Programm -> mit glProgramBinary geladene Daten
+        self.locations = {}             # (Programm, Uniform) -> Location
+
+    def glGetString(self, name):
+        return self.driver[name].encode('ascii')
+
+    def glGetIntegerv(self, name):
+        return 1 if name == NUM_PROGRAM_BINARY_FORMATS else 0
+
+    def glShaderSource(self, shader, source):
+        self.log.append(('glShaderSource', (shader, source)))
+        self.sources[shader] = source
+
+    def glAttachShader(self, program, shader):
+        self.log.append(('glAttachShader', (program, shader)))
+        self.attached.setdefault(program, []).append(shader)
+
+    def glGetShaderiv(self, shader, name):
+        return 'syntax error' not in self.sources[shader]
+
+    def glGetShaderInfoLog(self, shader):
+        return b'0:1: syntax error'
+
+    def glGetProgramiv(self, program, name):
+        if name == PROGRAM_BINARY_LENGTH:
+            return len(self.binary(program))
+        return name in (self.GL_LINK_STATUS, COMPLETION_STATUS)
+
+    def glGetUniformLocation(self, program, name):
+        return self.locations.setdefault((program, name), len(self.locations))
+
+    def binary(self, program):
+        """ program binary: the sources of the linked shaders """
+        return '\0'.join(self.sources[shader] for shader in self.attached[program]).encode('utf-8')
+
+    def glGetProgramBinary(self, program, length, written, binary_format, binary):
+        data = np.frombuffer(self.binary(program), dtype=np.uint8)
+        binary[:len(data)] = data
+        written[0] = len(data)
+        binary_format[0] = 1
+
+    def glProgramBinary(self, program, binary_format, binary, length):
+        self.log.append(('glProgramBinary', (program, binary_format, length)))
+        self.binaries[program] = bytes(binary)
+
+
+@pytest.fixture
+def models_dir():
+    return MODELS_DIR
+
+
+@pytest.fixture
+def recording_gl():
+    return RecordingGL()
+
+
+@pytest.fixture
+def shader_gl():
+    return ShaderGL()
+
+
+@pytest.fixture
+def viewer(monkeypatch, shader_gl):
+    """ objViewer whose module level GL functions and constants go to shader_gl, without GLFW and OpenGL """
+    for name in ('glfw', 'OpenGL', 'OpenGL.GL', 'OpenGL.GL.shaders'):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            sys.modules[name] = types.ModuleType(name)
+    import objViewer
+    with open(objViewer.__file__, encoding='utf-8') as file:
+        names = set(re.findall(r'\b(gl[A-Z]\w*(?=\()|GL_\w+)', file.read()))
+    for name in names:
+        monkeypatch.setattr(objViewer, name, getattr(shader_gl, name), raising=False)
+    return objViewer
@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from framePacing import FakeClock, FrameLimiter, FramePacer, Inertia, simulate
+
+
+@pytest.mark.parametrize('fps', [30, 60, 144, 1000])
+def test_animation_speed_does_not_depend_on_the_frame_rate(fps):
+    frames, angle, _, _ = simulate(1.0 / fps, budget=1.0 / fps, speed=300.0)
+    assert frames == pytest.approx(fps, abs=1)
+    # der letzte Frame beginnt höchstens einen Frame vor dem Ende der Sekunde
+    assert 300.0 - 300.0 / fps - 1e-6 <= angle <= 300.0 + 1e-6
+
+
+def test_limiter_with_an_injected_clock_does_not_spin():
+    # Standard-spin_margin: ohne eigenen Zeitfortschritt würde das aktive Warten nie enden
+    clock = FakeClock()
+    limiter = FrameLimiter(60, clock, clock.sleep)
+    starts = []
+    for _ in range(5):
+        limiter.wait()
+        starts.append(clock())
+        clock.advance(0.002)
+    assert starts == pytest.approx([frame / 60.0 for frame in range(5)])
+
+
+def test_cap_keeps_its_grid_when_sleep_oversleeps():
+    clock = FakeClock(oversleep=0.004)
+    pacer = FramePacer(fps_cap=60, clock=clock, sleep=clock.sleep)
+    starts = []
+    for _ in range(60):
+        pacer.begin_frame()
+        starts.append(clock())
+        clock.advance(0.002)
+        pacer.end_frame()
+    # das Verschlafen verschiebt jeden Frame um 4 ms, summiert sich aber nicht auf: gleiche Abstände
+    intervals = [later - earlier for earlier, later in zip(starts[2:], starts[3:])]
+    assert intervals == pytest.approx([1.0 / 60] * 57)
+    assert starts[-1] - starts[1] == pytest.approx(58 / 60.0 + 0.004)
+    assert simulate(0.002, fps_cap=60, oversleep=0.004)[0] == simulate(0.002, fps_cap=60)[0]
+
+
+def test_only_frames_over_the_budget_are_missed():
+    frames, _, missed, _ = simulate(lambda frame: 0.05 if frame % 20 == 0 else 0.01, fps_cap=60)
+    # der letzte Frame wird nicht mehr gemessen
+    assert missed == len(range(0, frames - 1, 20))
+    assert simulate(0.01, fps_cap=60)[2] == 0
+
+
+def test_inertia_decays_with_its_half_life():
+    clock = FakeClock()
+    inertia = Inertia(clock, half_life=0.5, smoothing=0.001, min_speed=1.0)
+    for angle in range(0, 100, 10):
+        inertia.track(float(angle))
+        clock.advance(0.1)
+    assert inertia.velocity == pytest.approx(100.0)
+
+    # eine Halbwertszeit: halbe Geschwindigkeit, Winkel = Integral der Geschwindigkeit
+    turned = inertia.step(0.5)
+    assert inertia.velocity == pytest.approx(50.0)
+    assert turned == pytest.approx(50.0 * inertia.time_constant)
+
+    steps = 0
+    while inertia.active:
+        turned += inertia.step(1.0 / 60)
+        steps += 1
+    assert inertia.step(1.0 / 60) == 0.0 and inertia.velocity == 0.0
+    assert turned == pytest.approx(100.0 * inertia.time_constant, abs=1.0 * inertia.time_constant)
+    # von 50 auf min_speed 1: log2(50) Halbwertszeiten
+    assert steps / 60.0 == pytest.approx(0.5 * math.log2(50.0), abs=1.0 / 60)
@@ -0,0 +1,51 @@
+import os
+
+from glState import GLState
+from shaderManager import ShaderManager
+
+STATIC_FRAME = ['glClear', 'glDrawElements']
+UNCACHED_FRAME = ['glClear', 'glUseProgram', 'glUniformMatrix4fv', 'glUniformMatrix4fv', 'glUniformMatrix4fv',
+                  'glUniform3fv', 'glPolygonMode', 'glBindVertexArray', 'glDrawElements',
+                  'glUseProgram', 'glBindVertexArray']
+
+
+def test_redundant_state_calls_are_skipped(recording_gl):
+    gl = GLState(recording_gl)
+    for _ in range(2):
+        gl.glBindVertexArray(3)
+        gl.glEnable(recording_gl.GL_CULL_FACE)
+        gl.glDrawArrays(recording_gl.GL_TRIANGLES, 0, 3)
+    assert [name for name, _ in recording_gl.log] == ['glBindVertexArray', 'glEnable', 'glDrawArrays',
+                                                      'glDrawArrays']
+    assert gl.skipped == 2
+    assert gl.end_frame() == 4
+
+
+def draw_frames(viewer, gl, models_dir, enabled, frames=2):
+    """ recorded calls of each frame of a static scene """
+    scene = viewer.Scene(640, 480, os.path.join(models_dir, 'squirrel.obj'), gl_state=GLState(gl, enabled=enabled),
+                         shader_manager=ShaderManager(gl, cache=False, reload=False),
+                         lod=False, culling='off', picking=False)
+    scene.init_GL()
+    # Zähler ohne die Aufrufe beim Hochladen
+    scene.gl_state.set_enabled(enabled)
+    recorded = []
+    for _ in range(frames):
+        gl.log = []
+        scene.draw()
+        recorded.append([name for name, _ in gl.log])
+    return scene, recorded
+
+
+def test_static_frame_issues_only_clear_and_draw(viewer, shader_gl, models_dir):
+    scene, (first, second) = draw_frames(viewer, shader_gl, models_dir, enabled=True)
+    assert first[0] == 'glClear' and first[-1] == 'glDrawElements' and 'glUseProgram' in first
+    assert second == STATIC_FRAME
+    assert scene.gl_state.total_calls == len(first) + len(STATIC_FRAME)
+    assert scene.gl_state.frames == 2
+
+
+def test_uncached_frames_repeat_every_call(viewer, shader_gl, models_dir):
+    scene, frames = draw_frames(viewer, shader_gl, models_dir, enabled=False)
+    assert frames == [UNCACHED_FRAME, UNCACHED_FRAME]
+    assert scene.gl_state.total_calls == 2 * len(UNCACHED_FRAME)
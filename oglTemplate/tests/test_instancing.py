@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from instancing import INSTANCE_LOCATION, InstanceRenderer, grid_transforms
+from shaderManager import ShaderManager
+
+TRIANGLE = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32)
+
+
+@pytest.fixture
+def renderer(shader_gl):
+    renderer = InstanceRenderer(gl=shader_gl, shader_manager=ShaderManager(shader_gl, cache=False, reload=False))
+    renderer.init_GL()
+    return renderer
+
+
+def test_instance_matrix_attributes(renderer, shader_gl):
+    renderer.add_mesh('triangle', TRIANGLE, [0, 1, 2])
+    gl = shader_gl
+    pointers = [args for args in gl.called('glVertexAttribPointer') if args[0] >= INSTANCE_LOCATION]
+    # vier vec4-Spalten im Abstand von 16 Bytes, Stride eine mat4
+    assert [args[:5] for args in pointers] == [(INSTANCE_LOCATION + column, 4, gl.GL_FLOAT, gl.GL_FALSE, 64)
+                                               for column in range(4)]
+    assert [args[5].value or 0 for args in pointers] == [0, 16, 32, 48]
+    assert gl.called('glVertexAttribDivisor') == [(INSTANCE_LOCATION + column, 1) for column in range(4)]
+
+
+def test_instance_buffer_grows_with_buffer_data_and_updates_with_sub_data(renderer, shader_gl):
+    renderer.add_mesh('triangle', TRIANGLE, [0, 1, 2])
+    shader_gl.log = []
+
+    def uploads():
+        calls = [(name, args) for name, args in shader_gl.log if name in ('glBufferData', 'glBufferSubData')]
+        shader_gl.log = []
+        return calls
+
+    renderer.set_instances('triangle', grid_transforms(4))
+    (name, args), = uploads()
+    assert name == 'glBufferData' and args[1] == 4 * 64 and args[3] == shader_gl.GL_DYNAMIC_DRAW
+
+    renderer.set_instances('triangle', grid_transforms(3))
+    (name, args), = uploads()
+    assert name == 'glBufferSubData' and args[1:3] == (0, 3 * 64)
+
+    renderer.set_instances('triangle', grid_transforms(9))
+    (name, args), = uploads()
+    assert name == 'glBufferData' and args[1] == 9 * 64
+    assert renderer.meshes['triangle'].capacity == 9
+
+
+def test_one_instanced_draw_per_non_empty_mesh(renderer, shader_gl):
+    for name in ('a', 'b', 'c'):
+        renderer.add_mesh(name, TRIANGLE, [0, 1, 2])
+    renderer.set_instances('a', grid_transforms(5))
+    renderer.set_instances('c', grid_transforms(2))
+    shader_gl.log = []
+
+    assert renderer.draw(np.identity(4, dtype=np.float32)) == 2
+    draws = shader_gl.called('glDrawElementsInstanced')
+    assert [(args[1], args[4]) for args in draws] == [(3, 5), (3, 2)]
+    assert renderer.instance_count() == 7
+    # das Lösen der Bindungen ist Sache von Scene.end_frame
+    assert (0,) not in shader_gl.called('glUseProgram') + shader_gl.called('glBindVertexArray')
+
+
+class RecordingCache:
+    """ MeshCache stand-in that records the loader options of every load """
+
+    def __init__(self):
+        self.options = []
+
+    def load(self, file_path, **options):
+        self.options.append(options)
+        return TRIANGLE, TRIANGLE, np.arange(3, dtype=np.int32)
+
+
+class NullRenderer:
+
+    def __getattr__(self, name):
+        return lambda *args: 0
+
+
+@pytest.mark.parametrize('cleanup', [False, True])
+def test_instanced_viewer_loads_with_the_options_of_prepare_mesh(viewer, cleanup):
+    import instancedViewer
+    from asyncLoader import prepare_mesh
+    cache = RecordingCache()
+    scene = instancedViewer.InstancedScene(640, 480, ['model.obj'], count=4, mesh_cache=cache, cleanup=cleanup)
+    scene.renderer = NullRenderer()
+    scene.gen_buffers()
+    # gleiche Optionen -> gleicher Cache-Eintrag wie im objViewer
+    prepare_mesh('model.obj', cache, scene.normal_mode, scene.optimize, lod=False, cleanup=cleanup)
+    assert cache.options[0] == cache.options[1]
+    assert cache.options[0]['cleanup'] == cleanup
@@ -0,0 +1,48 @@
+import tracemalloc
+
+import numpy as np
+
+from meshCleanup import clean_mesh, noisy_grid, weld_groups
+
+
+def brute_force_groups(vertices, epsilon):
+    """ smallest index of each connected group of vertices closer than epsilon, from all pairs """
+    distances = np.linalg.norm(vertices[:, None].astype(np.float64) - vertices[None], axis=2)
+    labels = np.arange(len(vertices))
+    close = distances <= epsilon
+    while True:
+        smaller = np.where(close, labels[None, :], len(labels)).min(axis=1)
+        if np.array_equal(smaller, labels):
+            return labels
+        labels = smaller
+
+
+def test_weld_groups_matches_all_pairs():
+    rng = np.random.default_rng(0)
+    epsilon = 0.01
+    # auf ein Raster gerundet: viele gleiche und knapp benachbarte Positionen, auch über Zellwände
+    vertices = np.round(rng.uniform(-0.6, 0.6, (500, 3)) / 0.2) * 0.2 + rng.uniform(0, 0.008, (500, 3)) * (
+        rng.random((500, 1)) < 0.5)
+    vertices[::7] = vertices[3]
+    np.testing.assert_array_equal(weld_groups(vertices, epsilon), brute_force_groups(vertices, epsilon))
+
+
+def test_large_coincident_cluster_welds_without_quadratic_pairs():
+    rng = np.random.default_rng(1)
+    vertices = rng.uniform(-0.6, 0.6, (200000, 3)).astype(np.float32)
+    vertices[1000:21000] = vertices[5]
+    tracemalloc.start()
+    labels = weld_groups(vertices)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # alle Paare des Haufens wären 2 * 10^8 Kandidaten, mehrere GB
+    assert peak < 200 * 2 ** 20
+    assert np.all(labels[1000:21000] == 5) and labels[5] == 5
+    assert np.count_nonzero(labels != np.arange(len(labels))) == 20000
+
+
+def test_clean_mesh_welds_noisy_copies():
+    vertices, faces = noisy_grid(2000)
+    cleaned = clean_mesh(vertices, faces)
+    assert cleaned.stats['welded_vertices'] == len(vertices) // 2
+    assert cleaned.stats['degenerate_faces'] == int(np.sqrt(len(vertices) / 2)) - 1
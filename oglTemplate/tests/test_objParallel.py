@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmark import write_synthetic_obj
+from objParallel import load_obj_parallel
+from objReader import parse_obj
+
+
+def shared_blocks():
+    return set(os.listdir('/dev/shm'))
+
+
+@pytest.fixture
+def synthetic(tmp_path):
+    path = str(tmp_path / 'synthetic.obj')
+    write_synthetic_obj(path, 20000)
+    return path
+
+
+def assert_matches_parse_obj(path, workers):
+    with open(path, 'rb') as file:
+        expected = parse_obj(file.read())
+    for array, reference in zip(load_obj_parallel(path, workers=workers, min_size=0), expected):
+        if reference is None:
+            assert array is None
+        else:
+            np.testing.assert_array_equal(array, reference)
+
+
+def test_parallel_matches_parse_obj(synthetic):
+    assert_matches_parse_obj(synthetic, 3)
+
+
+def test_indented_records_and_negative_indices(tmp_path):
+    # eingerückte v/vn-Sätze zählen auch für die Startindizes der folgenden Bereiche
+    path = str(tmp_path / 'indented.obj')
+    rng = np.random.default_rng(3)
+    with open(path, 'w') as file:
+        for triangle in rng.random((1000, 3, 3)):
+            for x, y, z in triangle:
+                file.write(f"  v {x:.6f} {y:.6f} {z:.6f}\n")
+            file.write(f"\tvn {triangle[0, 0]:.6f} 0 1\n")
+            file.write("f -3//-1 -2//-1 -1//-1\n")
+    obj = load_obj_parallel(path, workers=4, min_size=0)
+    assert len(obj.positions) == 3000
+    np.testing.assert_array_equal(obj.face_positions, np.arange(3000).reshape(-1, 3))
+    np.testing.assert_array_equal(obj.face_normals, np.repeat(np.arange(1000), 3).reshape(-1, 3))
+    assert_matches_parse_obj(path, 4)
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason="shared memory blocks are not visible as files")
+def test_failed_range_releases_the_shared_memory_of_the_others(synthetic):
+    # der letzte Bereich endet mit einer Fläche aus zwei Ecken und schlägt fehl
+    with open(synthetic, 'ab') as file:
+        file.write(b"f 1 2\n")
+    before = shared_blocks()
+    with pytest.raises(ValueError):
+        load_obj_parallel(synthetic, workers=3, min_size=0)
+    assert shared_blocks() - before == set()
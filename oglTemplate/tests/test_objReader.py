@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from objReader import load_mesh, load_obj, parse_obj
+
+
+def test_indented_records_keep_face_indices():
+    data = b"v 0 0 0\n  v 1 0 0\n\tv 0 1 0\nv 0 0 1\n  f 1 2 3\nf 2 3 4\n"
+    obj = parse_obj(data)
+    np.testing.assert_array_equal(obj.positions, [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]])
+    np.testing.assert_array_equal(obj.face_positions, [[0, 1, 2], [1, 2, 3]])
+
+
+VERTICES = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nv 0 0 1\nvt 0 0\nvn 0 0 1\n"
+
+
+@pytest.mark.parametrize('faces, texcoords, normals', [
+    (b"f 1 2 3\nf 2/1 3/1 4/1\n", [-1, 0], None),
+    (b"f 1/1 2/1 3/1\nf 2//1 3//1 4//1\n", [0, -1], [-1, 0]),
+    (b"f 1//1 2//1 3//1\nf 2/1/1 3/1/1 4/1/1\n", [-1, 0], [0, 0]),
+    (b"f 1/1/1 2/1/1 3/1/1\nf 2 3 4", [0, -1], [0, -1]),
+])
+def test_mixed_face_layouts_are_merged_in_file_order(faces, texcoords, normals):
+    obj = parse_obj(VERTICES + faces)
+    np.testing.assert_array_equal(obj.face_positions, [[0, 1, 2], [1, 2, 3]])
+    np.testing.assert_array_equal(obj.face_texcoords[:, 0], texcoords)
+    if normals is None:
+        assert obj.face_normals is None
+    else:
+        np.testing.assert_array_equal(obj.face_normals[:, 0], normals)
+
+
+def test_mixed_file_loads_with_computed_normals(tmp_path):
+    path = tmp_path / 'mixed.obj'
+    path.write_bytes(VERTICES + b"f 1 2 3\nf 2//1 3//1 4//1\n")
+    vertices, faces, normals, _ = load_obj(None, str(path))
+    assert len(vertices) == 4 and len(faces) == 2
+    # nicht alle Ecken haben eine Normale: wie ohne 'vn' werden die Normalen berechnet
+    assert len(normals) == 0
+    normals = load_mesh(str(path))[1]
+    np.testing.assert_allclose(np.linalg.norm(normals, axis=1), 1.0, rtol=1e-6)
+
+
+def test_mixed_formats_within_one_record_raise():
+    with pytest.raises(ValueError):
+        parse_obj(VERTICES + b"f 1 2/1 3//1\n")
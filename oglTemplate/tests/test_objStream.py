@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from benchmark import bench_streaming_memory, write_synthetic_obj
+from objReader import parse_obj
+from objStream import load_obj_streaming
+
+
+def test_streaming_matches_parse_obj(tmp_path):
+    path = str(tmp_path / 'synthetic.obj')
+    write_synthetic_obj(path, 20000)
+    with open(path, 'rb') as file:
+        expected = parse_obj(file.read())
+    # kleine Blöcke, damit Sätze und Indizes über viele Blockgrenzen laufen
+    for array, reference in zip(load_obj_streaming(path, chunk_size=64 * 1024), expected):
+        if reference is None:
+            assert array is None
+        else:
+            np.testing.assert_array_equal(array, reference)
+
+
+@pytest.mark.parametrize('triangles, chunk_size', [(200000, 1024 * 1024), (500000, 4 * 1024 * 1024)])
+def test_streaming_peak_memory_is_bounded(triangles, chunk_size):
+    # bench_streaming_memory prüft peak <= 3x Ausgabe + Arbeitsspeicher eines Blocks
+    assert bench_streaming_memory(triangles, chunk_size) > 0
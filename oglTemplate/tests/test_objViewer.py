@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+
+from asyncLoader import LoadResult
+from glState import GLState
+from shaderManager import ShaderManager
+
+
+class FailingLoader:
+    """ AsyncLoader whose jobs all fail """
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, key, function, *args):
+        self.jobs.append(key)
+
+    def poll(self):
+        results = [LoadResult(key, 1, None, "FileNotFoundError: missing.obj") for key in self.jobs]
+        self.jobs = []
+        return results
+
+
+def make_scene(viewer, gl, **options):
+    scene = viewer.Scene(640, 480, options.pop('path', 'missing.obj'), gl_state=GLState(gl),
+                         shader_manager=ShaderManager(gl, cache=False, reload=False), **options)
+    scene.init_GL()
+    return scene
+
+
+def test_failed_first_load_keeps_drawing_placeholder(viewer, shader_gl):
+    scene = make_scene(viewer, shader_gl, async_loader=FailingLoader())
+    for _ in range(3):
+        scene.draw()
+    assert not scene.loading
+    assert scene.vertex_array is None
+    draws = shader_gl.called('glDrawElements')
+    assert len(draws) == 3
+    assert all(args[:2] == (shader_gl.GL_LINES, scene.placeholder_count) for args in draws)
+
+
+def test_shading_switch_uploads_no_buffers(viewer, shader_gl, models_dir):
+    scene = make_scene(viewer, shader_gl, path=os.path.join(models_dir, 'squirrel.obj'), lod=False,
+                       culling='off', picking=False)
+    assert shader_gl.called('glBufferData')
+    scene.draw()
+    for mode in viewer.SHADING_MODES[1:] + viewer.SHADING_MODES[:1]:
+        shader_gl.log = []
+        scene.set_shading(mode)
+        scene.draw()
+        assert not shader_gl.called('glBufferData') and not shader_gl.called('glBufferSubData')
+        # nur das Programm wechselt, gezeichnet wird aus demselben Vertex-Array
+        assert shader_gl.called('glUseProgram') == [(scene.shaders[mode].program,)]
+        assert len(shader_gl.called('glDrawElements')) == 1
+
+
+def test_assigning_unchanged_values_does_not_redraw(viewer, shader_gl):
+    scene = make_scene(viewer, shader_gl, async_loader=FailingLoader())
+    scene.rotation_alpha = 12.5
+    scene.rotation_v = np.array([0.0, 1.0, 0.0])
+    scene.dirty = False
+    scene.model_valid = True
+
+    # gedrückte Maustaste ohne Bewegung: dieselben Werte, neues Array
+    scene.rotation_alpha = 12.5
+    scene.rotation_v = np.array([0.0, 1.0, 0.0])
+    assert not scene.dirty and scene.model_valid
+
+    scene.rotation_alpha = 13.0
+    assert scene.dirty and not scene.model_valid
+
+    # an Ort und Stelle geändertes Array gilt als geändert
+    scene.dirty = False
+    scene.pivot += 1.0
+    assert scene.dirty
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+import shaderManager
+from conftest import ShaderGL
+from shaderManager import ShaderManager
+
+VERTEX = "#version 330 core\nvoid main() { gl_Position = vec4(0.0); }\n"
+FRAGMENT = "#version 330 core\nout vec4 color;\nvoid main() { color = vec4(1.0); }\n"
+
+
+@pytest.fixture
+def shader_files(tmp_path):
+    paths = (str(tmp_path / 'test.vert'), str(tmp_path / 'test.frag'))
+    for path, source in zip(paths, (VERTEX, FRAGMENT)):
+        write(path, source)
+    return paths
+
+
+def write(path, source):
+    """ replace the file and move its mtime forward, also on file systems with coarse timestamps """
+    mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    with open(path, 'w') as file:
+        file.write(source)
+    os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+
+
+def test_binary_cache_store_then_hit(tmp_path, shader_files):
+    gl = ShaderGL()
+    program = ShaderManager(gl, cache_dir=str(tmp_path / 'cache')).load(*shader_files)
+    assert program.program and len(os.listdir(tmp_path / 'cache')) == 1
+
+    gl = ShaderGL()
+    manager = ShaderManager(gl, cache_dir=str(tmp_path / 'cache'))
+    program = manager.load(*shader_files)
+    assert (manager.cache_hits, manager.cache_misses) == (1, 0)
+    assert gl.called('glCompileShader') == []
+    assert gl.binaries[program.program] == (VERTEX + '\0' + FRAGMENT).encode('utf-8')
+
+
+@pytest.mark.parametrize('change', ['source', 'driver'])
+def test_changed_source_or_driver_misses_the_cache(tmp_path, shader_files, change):
+    ShaderManager(ShaderGL(), cache_dir=str(tmp_path / 'cache')).load(*shader_files)
+    gl = ShaderGL()
+    if change == 'source':
+        write(shader_files[1], FRAGMENT.replace('1.0', '0.5'))
+    else:
+        gl = ShaderGL(driver=('Vendor', 'Renderer', '3.2 Core, updated driver'))
+
+    manager = ShaderManager(gl, cache_dir=str(tmp_path / 'cache'))
+    manager.load(*shader_files)
+    assert (manager.cache_hits, manager.cache_misses) == (0, 1)
+    assert len(gl.called('glCompileShader')) == 2
+    assert len(os.listdir(tmp_path / 'cache')) == 2
+
+
+def test_hot_reload_picks_up_an_edited_file(shader_gl, shader_files, monkeypatch):
+    monkeypatch.setattr(shaderManager, 'POLL_INTERVAL', 0.0)
+    manager = ShaderManager(shader_gl, cache=False)
+    program = manager.load(*shader_files)
+    old = program.program
+    assert not manager.poll()
+
+    edited = FRAGMENT.replace('1.0', '0.5')
+    write(shader_files[1], edited)
+    assert manager.poll()
+    assert program.program != old
+    assert (program.program,) in shader_gl.called('glLinkProgram')
+    assert shader_gl.binary(program.program).endswith(edited.encode('utf-8'))
+    assert (old,) in shader_gl.called('glDeleteProgram')
+
+
+def test_failed_compile_keeps_previous_program(shader_gl, shader_files, monkeypatch):
+    monkeypatch.setattr(shaderManager, 'POLL_INTERVAL', 0.0)
+    manager = ShaderManager(shader_gl, cache=False)
+    program = manager.load(*shader_files)
+    old = program.program
+
+    write(shader_files[0], VERTEX + "syntax error\n")
+    assert not manager.poll()
+    assert program.program == old
+    assert (old,) not in shader_gl.called('glDeleteProgram')
+    # erst die nächste Änderung wird wieder kompiliert
+    compiles = len(shader_gl.called('glCompileShader'))
+    assert not manager.poll()
+    assert len(shader_gl.called('glCompileShader')) == compiles
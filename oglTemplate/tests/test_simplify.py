@@ -0,0 +1,45 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+from objReader import load_mesh, load_obj
+from simplify import load_lods, lod_path, main, read_lods
+
+RATIOS = (0.5, 0.25)
+
+
+def test_lod_path_keeps_the_source_extension():
+    assert lod_path('model.obj') == 'model.obj.lod.npz'
+    assert lod_path('model.obj') != lod_path('model.omesh')
+
+
+@pytest.fixture
+def model(tmp_path, models_dir):
+    path = str(tmp_path / 'squirrel.obj')
+    shutil.copy(os.path.join(models_dir, 'squirrel.obj'), path)
+    vertices, faces, _, _ = load_obj(None, path)
+    return path, vertices, faces
+
+
+def test_lod_file_is_reused_only_with_the_same_options(model):
+    path, vertices, faces = model
+    lods = load_lods(path, vertices, faces, RATIOS, cleanup=True, normal_mode='area')
+    assert os.path.exists(lod_path(path)) and len(lods) == 1 + len(RATIOS)
+
+    assert read_lods(path, vertices, faces, RATIOS, cleanup=True, normal_mode='area') is not None
+    assert read_lods(path, vertices, faces, RATIOS, cleanup=False, normal_mode='area') is None
+    assert read_lods(path, vertices, faces, RATIOS, cleanup=True, normal_mode='uniform') is None
+    assert read_lods(path, vertices, faces, RATIOS, optimize=True, cleanup=True, normal_mode='area') is None
+
+
+def test_saved_lods_are_read_with_the_viewer_options(model, monkeypatch):
+    path = model[0]
+    monkeypatch.setattr(sys, 'argv', ['simplify.py', path, '--ratios', *map(str, RATIOS), '--save',
+                                      '--normals', 'area', '--cleanup'])
+    main()
+    # Ladeweg und Optionen von asyncLoader.prepare_mesh (objViewer --normals area --cleanup)
+    vertices, _, indices = load_mesh(path, normal_mode='area', optimize=True, cleanup=True)
+    assert read_lods(path, vertices, indices.reshape(-1, 3), RATIOS, optimize=True, cleanup=True,
+                     normal_mode='area') is not None
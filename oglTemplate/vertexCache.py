@@ -0,0 +1,193 @@
+"""
+Triangle and vertex reordering for the GPU vertex caches.
+
+tipsify sorts the triangles so that vertices are reused while they are still
+in the post-transform cache (Sander et al., "Fast Triangle Reordering for
+Vertex Locality and Reduced Overdraw", 2007). reorder_vertices then renumbers
+the vertices in the order of their first use, so the vertex fetch reads the
+buffers almost sequentially. The cache simulation reports ACMR (cache misses
+per triangle) and ATVR (misses per vertex, 1.0 is optimal) without a GPU.
+
+    python vertexCache.py model.obj [--cache-size 16]
+"""
+import argparse
+import os
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+# typische Größe des Post-Transform-Caches in Vertices
+DEFAULT_CACHE_SIZE = 16
+
+
+def tipsify(indices, vertex_count, cache_size=DEFAULT_CACHE_SIZE):
+    """ triangle order (indices into the (F, 3) faces) with good vertex cache locality """
+    faces = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    if len(faces) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Dreiecke pro Vertex (Adjazenz als CSR)
+    corners = faces.ravel()
+    order = np.argsort(corners, kind='stable')
+    counts = np.bincount(corners, minlength=vertex_count)
+    starts = np.concatenate(([0], np.cumsum(counts))).tolist()
+    adjacency = (order // 3).tolist()
+
+    triangles = faces.tolist()
+    live = counts.tolist()                  # noch nicht ausgegebene Dreiecke pro Vertex
+    cache_time = [0] * vertex_count         # Zeitstempel des letzten Eintrags in den Cache
+    emitted = [False] * len(triangles)
+    dead_end = []                           # zuletzt benutzte Vertices für Sackgassen
+    result = []
+    time_stamp = cache_size + 1
+    cursor = 0                              # nächster Vertex für die lineare Suche
+
+    fan = 0
+    while fan >= 0:
+        candidates = []
+        # alle offenen Dreiecke um den Fächer-Vertex ausgeben
+        for triangle in adjacency[starts[fan]:starts[fan + 1]]:
+            if emitted[triangle]:
+                continue
+            emitted[triangle] = True
+            result.append(triangle)
+            for vertex in triangles[triangle]:
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
+                if time_stamp - cache_time[vertex] > cache_size:
+                    cache_time[vertex] = time_stamp
+                    time_stamp += 1
+
+        # nächster Fächer: Nachbar, der nach dem Ausgeben seiner Dreiecke noch im Cache ist
+        fan = -1
+        best = -1
+        for vertex in candidates:
+            if live[vertex] <= 0:
+                continue
+            priority = 0
+            age = time_stamp - cache_time[vertex]
+            if age + 2 * live[vertex] <= cache_size:
+                priority = age
+            if priority > best:
+                best = priority
+                fan = vertex
+
+        if fan < 0:
+            # Sackgasse: zuletzt benutzte Vertices, dann der Reihe nach
+            while dead_end:
+                vertex = dead_end.pop()
+                if live[vertex] > 0:
+                    fan = vertex
+                    break
+            while fan < 0 and cursor < vertex_count:
+                if live[cursor] > 0:
+                    fan = cursor
+                cursor += 1
+    return np.array(result, dtype=np.int64)
+
+
+def reorder_vertices(indices, vertex_count):
+    """
+    new vertex numbering in order of first use; returns (remap, order) with
+    new_indices = remap[indices] and new_vertices = vertices[order].
+    Unreferenced vertices are moved to the end.
+    """
+    indices = np.asarray(indices).ravel()
+    used, first = np.unique(indices, return_index=True)
+    order = used[np.argsort(first, kind='stable')]
+    unused = np.setdiff1d(np.arange(vertex_count), used, assume_unique=True)
+    order = np.concatenate((order, unused))
+    remap = np.empty(vertex_count, dtype=np.int64)
+    remap[order] = np.arange(vertex_count)
+    return remap, order
+
+
+def optimize_mesh(vertices, normals, indices, cache_size=DEFAULT_CACHE_SIZE):
+    """ tipsify the triangles and renumber the vertices; returns (vertices, normals, indices) """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(indices).reshape(-1, 3)
+    faces = faces[tipsify(faces, len(vertices), cache_size)]
+    remap, order = reorder_vertices(faces, len(vertices))
+    normals = np.asarray(normals)
+    if len(normals) == len(vertices):
+        normals = normals[order]
+    return vertices[order], normals, remap[faces].astype(np.int32).ravel()
+
+
+def simulate_fifo(indices, cache_size=DEFAULT_CACHE_SIZE):
+    """ number of cache misses of a FIFO post-transform cache """
+    cache = deque()
+    cached = set()
+    misses = 0
+    for vertex in np.asarray(indices).ravel().tolist():
+        if vertex in cached:
+            continue
+        misses += 1
+        cache.append(vertex)
+        cached.add(vertex)
+        if len(cache) > cache_size:
+            cached.discard(cache.popleft())
+    return misses
+
+
+def simulate_lru(indices, cache_size=DEFAULT_CACHE_SIZE):
+    """ number of cache misses of an LRU post-transform cache """
+    cache = OrderedDict()
+    misses = 0
+    for vertex in np.asarray(indices).ravel().tolist():
+        if vertex in cache:
+            cache.move_to_end(vertex)
+            continue
+        misses += 1
+        cache[vertex] = None
+        if len(cache) > cache_size:
+            cache.popitem(last=False)
+    return misses
+
+
+def cache_statistics(indices, cache_size=DEFAULT_CACHE_SIZE):
+    """ ACMR and ATVR for a FIFO and an LRU cache of cache_size vertices """
+    indices = np.asarray(indices).ravel()
+    triangles = max(len(indices) // 3, 1)
+    vertices = max(len(np.unique(indices)), 1)
+    fifo, lru = simulate_fifo(indices, cache_size), simulate_lru(indices, cache_size)
+    return {'fifo_acmr': fifo / triangles, 'fifo_atvr': fifo / vertices,
+            'lru_acmr': lru / triangles, 'lru_atvr': lru / vertices}
+
+
+def fetch_distance(indices):
+    """ mean distance between consecutive vertex indices, a measure for the vertex fetch locality """
+    indices = np.asarray(indices, dtype=np.int64).ravel()
+    return float(np.mean(np.abs(np.diff(indices)))) if len(indices) > 1 else 0.0
+
+
+def report(file_path, cache_size=DEFAULT_CACHE_SIZE):
+    from objReader import load_mesh
+    vertices, normals, indices = load_mesh(file_path)
+    start = time.perf_counter()
+    _, _, optimized = optimize_mesh(vertices, normals, indices, cache_size)
+    elapsed = time.perf_counter() - start
+
+    print("%s: %d triangles, %d vertices, optimized in %.2f s" % (
+        os.path.basename(file_path), len(indices) // 3, len(vertices), elapsed))
+    print("%-8s %10s %10s %10s %10s %14s" % ("", "FIFO ACMR", "FIFO ATVR", "LRU ACMR", "LRU ATVR", "fetch distance"))
+    for name, buffer in (("before", indices), ("after", optimized)):
+        stats = cache_statistics(buffer, cache_size)
+        print("%-8s %10.3f %10.3f %10.3f %10.3f %14.1f" % (name, stats['fifo_acmr'], stats['fifo_atvr'],
+                                                          stats['lru_acmr'], stats['lru_atvr'],
+                                                          fetch_distance(buffer)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vertex cache statistics before and after reordering")
+    parser.add_argument('models', nargs='+')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE)
+    args = parser.parse_args()
+    for path in args.models:
+        report(path, args.cache_size)
+
+
+if __name__ == '__main__':
+    main()
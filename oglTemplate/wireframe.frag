@@ -0,0 +1,9 @@
+#version 330
+
+uniform vec3 base_color;
+out vec4 f_color;
+
+void main()
+{
+    f_color = vec4(base_color, 1.0);
+}
\ No newline at end of file
@@ -0,0 +1,9 @@
+#version 330
+
+layout (location=0) in vec4 v_position;
+uniform mat4 modelview_projection_matrix;
+
+void main()
+{
+    gl_Position = modelview_projection_matrix * v_position;
+}
\ No newline at end of file